@@ -3,8 +3,12 @@ import os
 import urllib3
 from flask import Flask, session
 from flask_socketio import SocketIO
-from .utils import get_db_connection
+from .cache import get_site_settings, get_active_plugins
+from .db_pool import release_request_connection
 from .db_setup import initialize_database
+from .outbox import start_worker as start_outbox_worker
+from .metrics import init_app as init_metrics
+from .query_stats import init_app as init_query_stats
 
 # Cria a instância do SocketIO globalmente
 socketio = SocketIO()
@@ -28,10 +32,19 @@ def create_app():
         del urllib3.util.ssl_.minimum_version
     # === FIM DA CORREÇÃO ===
 
+    # Devolve ao pool a conexão emprestada pela requisição (ou pelo app_context).
+    app.teardown_appcontext(release_request_connection)
+    # Server-Timing com o tempo gasto no banco e alertas de N+1 em debug/teste.
+    init_query_stats(app)
+    # Histogramas por endpoint e a rota /metrics (formato do Prometheus).
+    init_metrics(app)
+
     with app.app_context():
         initialize_database()
 
     socketio.init_app(app)
+    # Worker que entrega as mensagens da outbox (Telegram) em segundo plano.
+    start_outbox_worker()
 
     # Importa e registra os Blueprints
     from .auth.routes import auth_bp
@@ -47,25 +60,10 @@ def create_app():
     @app.context_processor
     def inject_site_settings():
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT key, value FROM settings')
-            settings_db = cursor.fetchall()
-            settings = {row['key']: row['value'] for row in settings_db}
- 
-            cursor.execute("SELECT id, code FROM plugins WHERE is_active = 1 AND scope = 'public'")
-            public_plugins_db = cursor.fetchall()
-            public_plugins = [dict(row) for row in public_plugins_db]
-
-            admin_plugins = []
-            if session.get('is_admin'):
-                cursor.execute("SELECT id, code FROM plugins WHERE is_active = 1 AND scope = 'admin'")
-                admin_plugins_db = cursor.fetchall()
-                admin_plugins = [dict(row) for row in admin_plugins_db]
-            
-            cursor.close()
-            conn.close()
+            # Snapshot em memória: só vai ao banco quando a versão das configurações muda.
+            settings = get_site_settings()
+            public_plugins = get_active_plugins('public')
+            admin_plugins = get_active_plugins('admin') if session.get('is_admin') else []
             
             site_mode = settings.get('site_mode', 'individual')
    
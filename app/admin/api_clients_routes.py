@@ -2,8 +2,10 @@
 
 import os
 from flask import request, jsonify, session
-from werkzeug.security import generate_password_hash
 from app.utils import get_db_connection, admin_required
+from app.cache import bump_version
+from app.passwords import hash_password
+from app.search import index_user
 from .routes import admin_bp
 
 @admin_bp.route('/api/clients', methods=['GET'])
@@ -23,7 +25,7 @@ def get_clients():
 @admin_required
 def create_client():
     data = request.get_json()
-    hashed_password = generate_password_hash("senha_padrao_cliente")
+    hashed_password = hash_password("senha_padrao_cliente")
     conn = get_db_connection()
     cursor = conn.cursor()
     is_postgres = hasattr(conn, 'cursor_factory')
@@ -31,8 +33,9 @@ def create_client():
     
     try:
         # Query de inserção sem o campo 'email'
-        query = f'INSERT INTO users (username, password_hash) VALUES ({placeholder}, {placeholder})'
+        query = f'INSERT INTO users (username, password_hash) VALUES ({placeholder}, {placeholder})' + (' RETURNING id' if is_postgres else '')
         cursor.execute(query, (data['name'], hashed_password))
+        index_user(conn, cursor.fetchone()['id'] if is_postgres else cursor.lastrowid, data['name'])
         conn.commit()
     except Exception:
         conn.rollback()
@@ -77,6 +80,8 @@ def toggle_admin_status(client_id):
         # Usar 'NOT is_admin' é compatível com booleanos no PostgreSQL
         query = f'UPDATE users SET is_admin = NOT is_admin WHERE id = {placeholder}'
         cursor.execute(query, (client_id,))
+        # A lista pública de artistas mostra apenas administradores.
+        bump_version(conn, 'profiles')
         conn.commit()
         
         cursor.execute(f'SELECT is_admin FROM users WHERE id = {placeholder}', (client_id,))
@@ -1,36 +1,156 @@
 # --- Código do arquivo modificado: app/admin/api_comissoes_routes.py ---
 
 import json
-import time
+import base64
 import os
 from datetime import datetime
 from flask import request, jsonify, session
-from app import socketio
-from app.utils import get_db_connection, add_event_to_log, admin_required, add_notification, translate_status
+from app.utils import get_db_connection, add_event_to_log, admin_required
+from app.realtime import emit_commission_update
+from app.notifications import notify, admin_notification, client_notification
+from app.revenue import revenue_snapshot, update_revenue, remove_revenue
+from app.ids import new_commission_id
+from app.commission_history import commission_to_dict, attach_history, add_comment, add_preview as add_preview_entry, delete_history
+from app.search import index_commission, remove_commission_documents
+from app.commission_states import run_transition, TransitionError
+from app.commission_changes import (touch_commission, record_deletion, changes_since, current_change_seq, parse_since,
+                                    VersionConflict, check_version, retry_on_conflict, parse_if_match, etag)
 
 from .routes import admin_bp
 
+# Colunas que a listagem pode devolver. O histórico completo (comentários,
+# eventos e prévias) só vem quando pedido em 'fields' ou pela rota de detalhe.
+LIST_COLUMNS = (
+    'id', 'client', 'client_id', 'type', 'date', 'deadline', 'price', 'status', 'description',
+    'payment_status', 'payment_method', 'current_phase_index', 'revisions_used', 'current_preview',
+    'phases', 'reference_files', 'assigned_artist_ids', 'version'
+)
+HISTORY_FIELDS = ('comments', 'event_log', 'preview')
+LIST_DEFAULT_FIELDS = (
+    'id', 'client', 'client_id', 'type', 'date', 'deadline', 'price', 'status',
+    'payment_status', 'payment_method', 'current_phase_index', 'revisions_used', 'version'
+)
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 200
+
+def _encode_cursor(comissao):
+    raw = json.dumps([comissao['date'], comissao['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def _decode_cursor(cursor_value):
+    date, comissao_id = json.loads(base64.urlsafe_b64decode(cursor_value.encode('ascii')))
+    return str(date), str(comissao_id)
+
+def _parse_list_fields(fields_arg):
+    if not fields_arg:
+        return list(LIST_DEFAULT_FIELDS)
+    if fields_arg == 'all':
+        return list(LIST_COLUMNS) + list(HISTORY_FIELDS)
+    fields = [f.strip() for f in fields_arg.split(',') if f.strip()]
+    invalid = [f for f in fields if f not in LIST_COLUMNS and f not in HISTORY_FIELDS]
+    if invalid:
+        raise ValueError(f"Campos inválidos: {', '.join(invalid)}")
+    return fields
+
 @admin_bp.route('/api/comissoes', methods=['GET'])
 @admin_required
 def get_comissoes():
+    """
+    Lista as comissões em páginas (paginação por cursor sobre date/id, da mais recente para a mais antiga).
+    Parâmetros: limit, cursor, status (lista separada por vírgula), client_id, client (parte do nome),
+    q (busca em id, cliente e tipo), date_from, date_to, deadline_from, deadline_to (YYYY-MM-DD)
+    e fields (lista de campos ou 'all').
+    A resposta traz 'sync_cursor'; com 'since=<sync_cursor>' (e, opcionalmente, 'fields'),
+    devolve só as comissões alteradas ou excluídas depois dele: {'items', 'deleted', 'cursor'}.
+    """
+    try:
+        fields = _parse_list_fields(request.args.get('fields'))
+        limit = min(max(int(request.args.get('limit', LIST_DEFAULT_LIMIT)), 1), LIST_MAX_LIMIT)
+        cursor_arg = request.args.get('cursor')
+        after = _decode_cursor(cursor_arg) if cursor_arg else None
+        since_arg = request.args.get('since')
+        since = parse_since(since_arg) if since_arg is not None else None
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': f'Parâmetros inválidos: {e}'}), 400
+
     conn = get_db_connection()
+    if since is not None:
+        return _comissoes_since(conn, since, fields)
+
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM comissoes ORDER BY date DESC')
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+
+    conditions = []
+    params = []
+    statuses = [s.strip() for s in request.args.get('status', '').split(',') if s.strip()]
+    if statuses:
+        conditions.append(f"status IN ({','.join([placeholder] * len(statuses))})")
+        params.extend(statuses)
+    if request.args.get('client_id'):
+        conditions.append(f'client_id = {placeholder}')
+        params.append(request.args.get('client_id', type=int))
+    if request.args.get('client'):
+        conditions.append(f'LOWER(client) LIKE {placeholder}')
+        params.append(f"%{request.args.get('client').strip().lower()}%")
+    if request.args.get('q'):
+        term = f"%{request.args.get('q').strip().lower()}%"
+        conditions.append(f'(LOWER(id) LIKE {placeholder} OR LOWER(client) LIKE {placeholder} OR LOWER(type) LIKE {placeholder})')
+        params.extend([term, term, term])
+    if request.args.get('date_from'):
+        conditions.append(f'date >= {placeholder}')
+        params.append(request.args.get('date_from'))
+    if request.args.get('date_to'):
+        conditions.append(f'date <= {placeholder}')
+        params.append(request.args.get('date_to'))
+    if request.args.get('deadline_from'):
+        conditions.append(f'deadline >= {placeholder}')
+        params.append(request.args.get('deadline_from'))
+    if request.args.get('deadline_to'):
+        conditions.append(f'deadline <= {placeholder}')
+        params.append(request.args.get('deadline_to'))
+    if after:
+        conditions.append(f'(date < {placeholder} OR (date = {placeholder} AND id < {placeholder}))')
+        params.extend([after[0], after[0], after[1]])
+
+    # 'id' e 'date' são sempre lidos porque formam o cursor.
+    columns = ['id', 'date'] + [f for f in fields if f in LIST_COLUMNS and f not in ('id', 'date')]
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    # Lido antes da página, pelo mesmo motivo de changes_since().
+    sync_cursor = current_change_seq(conn)
+    query = f"SELECT {', '.join(columns)} FROM comissoes {where_clause} ORDER BY date DESC, id DESC LIMIT {placeholder}"
+    cursor.execute(query, tuple(params) + (limit + 1,))
     comissoes_db = cursor.fetchall()
     cursor.close()
+
+    has_more = len(comissoes_db) > limit
+    comissoes_lista = [commission_to_dict(row) for row in comissoes_db[:limit]]
+    next_cursor = _encode_cursor(comissoes_lista[-1]) if has_more else None
+
+    if any(f in HISTORY_FIELDS for f in fields):
+        attach_history(conn, comissoes_lista)
     conn.close()
-    
-    comissoes_lista = [dict(row) for row in comissoes_db]
-    for comissao in comissoes_lista:
-        for key in ['comments', 'reference_files', 'preview', 'phases', 'event_log', 'assigned_artist_ids']:
-            comissao[key] = json.loads(comissao[key]) if (comissao[key] and comissao[key] != '[]') else []
-    return jsonify(comissoes_lista)
+
+    items = [{key: comissao[key] for key in fields if key in comissao} for comissao in comissoes_lista]
+    return jsonify({'items': items, 'next_cursor': next_cursor, 'sync_cursor': str(sync_cursor)})
+
+def _comissoes_since(conn, since, fields):
+    """Modo de sincronização da listagem: só o que mudou depois de 'since', sem filtros nem páginas."""
+    columns = ['id'] + [f for f in fields if f in LIST_COLUMNS and f != 'id']
+    rows, deleted, sync_cursor = changes_since(conn, since, columns=', '.join(columns))
+    comissoes_lista = [commission_to_dict(row) for row in rows]
+    if any(f in HISTORY_FIELDS for f in fields):
+        attach_history(conn, comissoes_lista)
+    conn.close()
+
+    items = [{key: comissao[key] for key in fields if key in comissao} for comissao in comissoes_lista]
+    return jsonify({'items': items, 'deleted': deleted, 'cursor': str(sync_cursor)})
 
 @admin_bp.route('/api/comissoes', methods=['POST'])
 @admin_required
 def create_comissao():
     data = request.get_json()
-    new_id = f"ART-{int(time.time())}"
+    new_id = new_commission_id()
     today = datetime.now().strftime('%Y-%m-%d')
     
     conn = get_db_connection()
@@ -43,14 +163,15 @@ def create_comissao():
         default_phases_str = cursor.fetchone()
         default_phases = json.loads(default_phases_str['value']) if default_phases_str else []
         
-        initial_event = [{"timestamp": datetime.now().isoformat(), "actor": "Artista", "message": "Pedido criado manualmente."}]
-        
         query = f'INSERT INTO comissoes (id, client, type, date, deadline, price, status, description, preview, comments, reference_files, phases, current_phase_index, revisions_used, event_log, payment_status) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})'
-        cursor.execute(query, (new_id, data['client'], data['type'], today, data['deadline'], data['price'], 'pending_payment', data.get('description', ''), '[]', '[]', '[]', json.dumps(default_phases), 0, 0, json.dumps(initial_event), 'unpaid'))
+        cursor.execute(query, (new_id, data['client'], data['type'], today, data['deadline'], data['price'], 'pending_payment', data.get('description', ''), '[]', '[]', '[]', json.dumps(default_phases), 0, 0, '[]', 'unpaid'))
+        add_event_to_log(conn, new_id, "Artista", "Pedido criado manualmente.")
+        index_commission(conn, new_id, data['client'], data['type'], data.get('description', ''))
+        touch_commission(conn, new_id)
+        notifications = notify(conn, [admin_notification(f"Nova comissão #{new_id} para {data['client']} foi criada.")])
         conn.commit()
         
-        socketio.emit('commission_updated', {'commission_id': new_id})
-        add_notification(f"Nova comissão #{new_id} para {data['client']} foi criada.")
+        emit_commission_update(new_id, created=True, notifications=notifications)
         return jsonify({'success': True, 'message': 'Comissão criada com sucesso', 'id': new_id})
     except Exception as e:
         conn.rollback()
@@ -66,45 +187,65 @@ def get_single_comissao(comissao_id):
     cursor = conn.cursor()
     is_postgres = hasattr(conn, 'cursor_factory')
     placeholder = '%s' if is_postgres else '?'
-    
+
     query = f'SELECT * FROM comissoes WHERE id = {placeholder}'
     cursor.execute(query, (comissao_id,))
     comissao = cursor.fetchone()
     cursor.close()
-    conn.close()
-    
+
     if comissao is None:
+        conn.close()
         return jsonify({'error': 'Comissão não encontrada'}), 404
-    
-    comissao_dict = dict(comissao)
-    for key in ['comments', 'reference_files', 'preview', 'phases', 'event_log', 'assigned_artist_ids']:
-        comissao_dict[key] = json.loads(comissao_dict[key]) if (comissao_dict[key] and comissao_dict[key] != '[]') else []
-    return jsonify(comissao_dict)
+
+    comissao_dict = attach_history(conn, [commission_to_dict(comissao)])[0]
+    conn.close()
+    # O ETag é a versão do pedido; as escritas aceitam o mesmo valor em 'If-Match'.
+    response = jsonify(comissao_dict)
+    response.headers['ETag'] = etag(comissao_dict['version'])
+    return response
 
 @admin_bp.route('/api/comissoes/<string:comissao_id>', methods=['DELETE'])
 @admin_required
 def delete_comissao(comissao_id):
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
     cursor = conn.cursor()
     is_postgres = hasattr(conn, 'cursor_factory')
     placeholder = '%s' if is_postgres else '?'
-    
-    try:
-        query_select = f'SELECT client_id FROM comissoes WHERE id = {placeholder}'
+
+    def attempt():
+        query_select = f'SELECT client_id, version FROM comissoes WHERE id = {placeholder}'
         cursor.execute(query_select, (comissao_id,))
         comissao = cursor.fetchone()
-        client_id = comissao['client_id'] if comissao else None
+        if comissao is None:
+            return jsonify({'success': False, 'message': 'Comissão não encontrada'}), 404
+        client_id = comissao['client_id']
+        version = comissao['version']
+        check_version(comissao_id, version, expected_version)
 
-        query_delete = f'DELETE FROM comissoes WHERE id = {placeholder}'
-        cursor.execute(query_delete, (comissao_id,))
+        revenue_before = revenue_snapshot(conn, comissao_id)
+        query_delete = f'DELETE FROM comissoes WHERE id = {placeholder} AND version = {placeholder}'
+        cursor.execute(query_delete, (comissao_id, version))
+        if cursor.rowcount != 1:
+            raise VersionConflict(comissao_id)
+        remove_revenue(conn, revenue_before)
+        delete_history(conn, comissao_id)
+        remove_commission_documents(conn, comissao_id)
+        record_deletion(conn, comissao_id, client_id)
+        notifications = notify(conn, [
+            admin_notification(f"A comissão #{comissao_id} foi excluída."),
+            client_notification(client_id, f"Sua comissão #{comissao_id} foi removida pelo artista.", comissao_id)
+        ])
         conn.commit()
-        
-        socketio.emit('commission_updated', {'commission_id': comissao_id, 'deleted': True})
-        add_notification(f"A comissão #{comissao_id} foi excluída.")
-        if client_id:
-            add_notification(f"Sua comissão #{comissao_id} foi removida pelo artista.", commission_id=comissao_id, user_id=client_id)
-        
+
+        emit_commission_update(comissao_id, client_id, deleted=True, notifications=notifications)
+
         return jsonify({'success': True, 'message': 'Comissão excluída com sucesso'})
+
+    try:
+        return retry_on_conflict(conn, attempt, retry=expected_version is None)
+    except VersionConflict as e:
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
     except Exception as e:
         conn.rollback()
         return jsonify({'success': False, 'message': f'Erro no servidor: {e}'}), 500
@@ -117,60 +258,82 @@ def delete_comissao(comissao_id):
 def update_comissao_status(comissao_id):
     data = request.get_json()
     novo_status = data.get('status')
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
-    cursor = conn.cursor()
-    is_postgres = hasattr(conn, 'cursor_factory')
-    placeholder = '%s' if is_postgres else '?'
-    
-    try:
-        cursor.execute(f'SELECT client_id FROM comissoes WHERE id = {placeholder}', (comissao_id,))
-        comissao = cursor.fetchone()
-        client_id = comissao['client_id'] if comissao else None
 
-        cursor.execute(f'UPDATE comissoes SET status = {placeholder} WHERE id = {placeholder}', (novo_status, comissao_id))
-        
-        status_traduzido = translate_status(novo_status)
-        add_event_to_log(conn, comissao_id, "Artista", f"Alterou o status para '{status_traduzido}'.")
+    def attempt():
+        result = run_transition(conn, comissao_id, 'set_status', expected_version, status=novo_status)
+        client_id = result['order']['client_id']
+        status_traduzido = result['context']['status_label']
+        notifications = notify(conn, [
+            admin_notification(f"O status da comissão #{comissao_id} foi alterado para '{status_traduzido}'."),
+            client_notification(client_id, f"O status do seu pedido #{comissao_id} foi atualizado para '{status_traduzido}'.", comissao_id)
+        ])
         conn.commit()
-        
-        socketio.emit('commission_updated', {'commission_id': comissao_id})
-        add_notification(f"O status da comissão #{comissao_id} foi alterado para '{status_traduzido}'.")
-        if client_id:
-            add_notification(f"O status do seu pedido #{comissao_id} foi atualizado para '{status_traduzido}'.", commission_id=comissao_id, user_id=client_id)
-        
-        return jsonify({'success': True, 'message': 'Status atualizado com sucesso'})
+
+        emit_commission_update(comissao_id, client_id, changes=result['changes'], events=result['events'], notifications=notifications)
+
+        response = jsonify({'success': True, 'message': 'Status atualizado com sucesso', 'version': result['version']})
+        response.headers['ETag'] = etag(result['version'])
+        return response
+
+    try:
+        return retry_on_conflict(conn, attempt, retry=expected_version is None)
+    except VersionConflict as e:
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
+    except TransitionError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), e.status
     except Exception as e:
         conn.rollback()
         return jsonify({'success': False, 'message': f'Erro no servidor: {e}'}), 500
     finally:
-        cursor.close()
         conn.close()
 
 @admin_bp.route('/api/comissoes/<string:comissao_id>/update', methods=['POST'])
 @admin_required
 def update_comissao(comissao_id):
     data = request.get_json()
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
     cursor = conn.cursor()
     is_postgres = hasattr(conn, 'cursor_factory')
     placeholder = '%s' if is_postgres else '?'
-    
-    try:
-        cursor.execute(f'SELECT client_id FROM comissoes WHERE id = {placeholder}', (comissao_id,))
+
+    def attempt():
+        cursor.execute(f'SELECT client_id, version FROM comissoes WHERE id = {placeholder}', (comissao_id,))
         comissao = cursor.fetchone()
-        client_id = comissao['client_id'] if comissao else None
+        if comissao is None:
+            return jsonify({'success': False, 'message': 'Comissão não encontrada'}), 404
+        client_id = comissao['client_id']
+        version = comissao['version']
+        check_version(comissao_id, version, expected_version)
 
         query_update = f'UPDATE comissoes SET client = {placeholder}, type = {placeholder}, price = {placeholder}, deadline = {placeholder}, description = {placeholder} WHERE id = {placeholder}'
+        revenue_before = revenue_snapshot(conn, comissao_id)
         cursor.execute(query_update, (data['client'], data['type'], data['price'], data['deadline'], data['description'], comissao_id))
-        add_event_to_log(conn, comissao_id, "Artista", "Editou os detalhes gerais do pedido.")
+        update_revenue(conn, revenue_before, client=data['client'], type=data['type'], price=data['price'])
+        event = add_event_to_log(conn, comissao_id, "Artista", "Editou os detalhes gerais do pedido.")
+        index_commission(conn, comissao_id, data['client'], data['type'], data['description'])
+        version = touch_commission(conn, comissao_id, version)
+        notifications = notify(conn, [
+            admin_notification(f"Os dados da comissão #{comissao_id} foram atualizados."),
+            client_notification(client_id, f"Os detalhes do seu pedido #{comissao_id} foram atualizados pelo artista.", comissao_id)
+        ])
         conn.commit()
-        
-        socketio.emit('commission_updated', {'commission_id': comissao_id})
-        add_notification(f"Os dados da comissão #{comissao_id} foram atualizados.")
-        if client_id:
-            add_notification(f"Os detalhes do seu pedido #{comissao_id} foram atualizados pelo artista.", commission_id=comissao_id, user_id=client_id)
-        
-        return jsonify({'success': True, 'message': 'Comissão atualizada com sucesso'})
+
+        changes = {key: data[key] for key in ('client', 'type', 'price', 'deadline', 'description')}
+        changes['version'] = version
+        emit_commission_update(comissao_id, client_id, changes=changes, events=[event], notifications=notifications)
+
+        response = jsonify({'success': True, 'message': 'Comissão atualizada com sucesso', 'version': version})
+        response.headers['ETag'] = etag(version)
+        return response
+
+    try:
+        return retry_on_conflict(conn, attempt, retry=expected_version is None)
+    except VersionConflict as e:
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
     except Exception as e:
         conn.rollback()
         return jsonify({'success': False, 'message': f'Erro no servidor: {e}'}), 500
@@ -182,30 +345,38 @@ def update_comissao(comissao_id):
 @admin_required
 def admin_add_comment(comissao_id):
     data = request.get_json()
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
     cursor = conn.cursor()
     is_postgres = hasattr(conn, 'cursor_factory')
     placeholder = '%s' if is_postgres else '?'
-    
+
     try:
-        cursor.execute(f'SELECT comments, client_id FROM comissoes WHERE id = {placeholder}', (comissao_id,))
+        cursor.execute(f'SELECT client_id FROM comissoes WHERE id = {placeholder}', (comissao_id,))
         order = cursor.fetchone()
-        client_id = order['client_id'] if order else None
-        
-        comments = json.loads(order['comments']) if order and order['comments'] else []
-        new_comment = {"author": "Artista", "is_artist": True, "date": datetime.now().isoformat(), "text": data.get('text')}
-        comments.append(new_comment)
-        
-        cursor.execute(f'UPDATE comissoes SET comments = {placeholder} WHERE id = {placeholder}', (json.dumps(comments), comissao_id))
-        add_event_to_log(conn, comissao_id, "Artista", "Adicionou um novo comentário.")
+        if order is None:
+            return jsonify({'success': False, 'message': 'Comissão não encontrada'}), 404
+        client_id = order['client_id']
+
+        # Um comentário só acrescenta linhas: não depende do estado lido, então
+        # só confere a versão quando o navegador pede (If-Match).
+        new_comment = add_comment(conn, comissao_id, "Artista", True, data.get('text'))
+        event = add_event_to_log(conn, comissao_id, "Artista", "Adicionou um novo comentário.")
+        version = touch_commission(conn, comissao_id, expected_version)
+        notifications = notify(conn, [
+            admin_notification(f"Você respondeu ao pedido #{comissao_id}", comissao_id),
+            client_notification(client_id, f"O artista enviou uma nova mensagem no pedido #{comissao_id}.", comissao_id)
+        ])
         conn.commit()
-        
-        socketio.emit('commission_updated', {'commission_id': comissao_id})
-        add_notification(f"Você respondeu ao pedido #{comissao_id}", comissao_id)
-        if client_id:
-            add_notification(f"O artista enviou uma nova mensagem no pedido #{comissao_id}.", commission_id=comissao_id, user_id=client_id)
-            
-        return jsonify({'success': True, 'comment': new_comment})
+
+        emit_commission_update(comissao_id, client_id, changes={'version': version}, comments=[new_comment], events=[event], notifications=notifications)
+
+        response = jsonify({'success': True, 'comment': new_comment, 'version': version})
+        response.headers['ETag'] = etag(version)
+        return response
+    except VersionConflict as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
     except Exception as e:
         conn.rollback()
         return jsonify({'success': False, 'message': f'Erro no servidor: {e}'}), 500
@@ -217,70 +388,72 @@ def admin_add_comment(comissao_id):
 @admin_required
 def add_preview(comissao_id):
     data = request.get_json()
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
-    cursor = conn.cursor()
-    is_postgres = hasattr(conn, 'cursor_factory')
-    placeholder = '%s' if is_postgres else '?'
-    
-    try:
-        query_select = f'SELECT preview, phases, current_phase_index, client_id FROM comissoes WHERE id = {placeholder}'
-        cursor.execute(query_select, (comissao_id,))
-        order = cursor.fetchone()
-        client_id = order['client_id'] if order else None
-        
-        previews = json.loads(order['preview']) if order['preview'] else []
-        new_preview = {"version": f"{len(previews) + 1}.0", "date": datetime.now().isoformat(), "url": data.get('url'), "comment": data.get('comment', '')}
-        previews.append(new_preview)
-        
-        query_update = f'UPDATE comissoes SET preview = {placeholder}, current_preview = {placeholder}, status = {placeholder} WHERE id = {placeholder}'
-        cursor.execute(query_update, (json.dumps(previews), len(previews) - 1, 'waiting_approval', comissao_id))
-        
-        phases = json.loads(order['phases'])
-        current_phase_name = phases[order['current_phase_index']]['name']
-        add_event_to_log(conn, comissao_id, "Artista", f"Enviou uma prévia para a fase '{current_phase_name}'.")
+
+    def attempt():
+        # A prévia é gravada antes da transição porque o UPDATE do pedido já aponta para ela.
+        new_preview, preview_index = add_preview_entry(conn, comissao_id, data.get('url'), data.get('comment', ''))
+        result = run_transition(conn, comissao_id, 'submit_preview', expected_version, preview_index=preview_index)
+        client_id = result['order']['client_id']
+        notifications = notify(conn, [
+            admin_notification(f"Nova pré-visualização adicionada ao pedido #{comissao_id}", comissao_id),
+            client_notification(client_id, f"Uma nova pré-visualização foi enviada para o seu pedido #{comissao_id}.", comissao_id)
+        ])
         conn.commit()
-        
-        socketio.emit('commission_updated', {'commission_id': comissao_id})
-        add_notification(f"Nova pré-visualização adicionada ao pedido #{comissao_id}", comissao_id)
-        if client_id:
-            add_notification(f"Uma nova pré-visualização foi enviada para o seu pedido #{comissao_id}.", commission_id=comissao_id, user_id=client_id)
-        
-        return jsonify({'success': True, 'preview': new_preview})
+
+        emit_commission_update(
+            comissao_id, client_id, changes=result['changes'],
+            previews=[new_preview], events=result['events'], notifications=notifications
+        )
+
+        response = jsonify({'success': True, 'preview': new_preview, 'version': result['version']})
+        response.headers['ETag'] = etag(result['version'])
+        return response
+
+    try:
+        return retry_on_conflict(conn, attempt, retry=expected_version is None)
+    except VersionConflict as e:
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
+    except TransitionError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), e.status
     except Exception as e:
         conn.rollback()
         return jsonify({'success': False, 'message': f'Erro no servidor: {e}'}), 500
     finally:
-        cursor.close()
         conn.close()
 
 @admin_bp.route('/api/comissoes/<string:comissao_id>/confirm_payment', methods=['POST'])
 @admin_required
 def admin_confirm_payment(comissao_id):
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
-    cursor = conn.cursor()
-    is_postgres = hasattr(conn, 'cursor_factory')
-    placeholder = '%s' if is_postgres else '?'
-    
-    try:
-        cursor.execute(f'SELECT client_id FROM comissoes WHERE id = {placeholder}', (comissao_id,))
-        comissao = cursor.fetchone()
-        client_id = comissao['client_id'] if comissao else None
 
-        query_update = f"UPDATE comissoes SET payment_status = 'paid', status = 'in_progress' WHERE id = {placeholder}"
-        cursor.execute(query_update, (comissao_id,))
-        add_event_to_log(conn, comissao_id, "Artista", "Pagamento confirmado.")
-        add_event_to_log(conn, comissao_id, "Sistema", "Status do pedido alterado para 'Em Progresso'.")
+    def attempt():
+        result = run_transition(conn, comissao_id, 'confirm_payment', expected_version)
+        client_id = result['order']['client_id']
+        notifications = notify(conn, [
+            admin_notification(f"O pagamento do pedido #{comissao_id} foi confirmado! O trabalho foi iniciado.", comissao_id),
+            client_notification(client_id, f"O pagamento do seu pedido #{comissao_id} foi confirmado!", comissao_id)
+        ])
         conn.commit()
-        
-        socketio.emit('commission_updated', {'commission_id': comissao_id})
-        add_notification(f"O pagamento do pedido #{comissao_id} foi confirmado! O trabalho foi iniciado.", comissao_id)
-        if client_id:
-            add_notification(f"O pagamento do seu pedido #{comissao_id} foi confirmado!", commission_id=comissao_id, user_id=client_id)
-        
-        return jsonify({'success': True, 'message': 'Pagamento confirmado com sucesso.'})
+
+        emit_commission_update(comissao_id, client_id, changes=result['changes'], events=result['events'], notifications=notifications)
+
+        response = jsonify({'success': True, 'message': 'Pagamento confirmado com sucesso.', 'version': result['version']})
+        response.headers['ETag'] = etag(result['version'])
+        return response
+
+    try:
+        return retry_on_conflict(conn, attempt, retry=expected_version is None)
+    except VersionConflict as e:
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
+    except TransitionError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), e.status
     except Exception as e:
         conn.rollback()
         return jsonify({'success': False, 'message': f'Erro no servidor: {e}'}), 500
     finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        conn.close()
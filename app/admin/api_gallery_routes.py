@@ -3,6 +3,10 @@
 import os
 from flask import jsonify, request, session
 from app.utils import get_db_connection, admin_required
+from app.cache import bump_version
+from app.images import queue_gallery_image, remove_derivatives
+from app.outbox import wake_worker
+from app.portfolio import link_gallery_artists, unlink_gallery_artists
 from .routes import admin_bp
 
 @admin_bp.route('/api/gallery', methods=['GET'])
@@ -37,7 +41,7 @@ def add_to_gallery():
     placeholder = '%s' if is_postgres else '?'
     
     try:
-        query = f'INSERT INTO gallery (title, image_url, description, lineart_artist_id, color_artist_id, is_nsfw) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})'
+        query = f'INSERT INTO gallery (title, image_url, description, lineart_artist_id, color_artist_id, is_nsfw) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})' + (' RETURNING id' if is_postgres else '')
         cursor.execute(query, (
             data.get('title'), 
             data.get('image_url'), 
@@ -46,6 +50,11 @@ def add_to_gallery():
             color_artist_id, 
             data.get('is_nsfw', False)
         ))
+        art_id = cursor.fetchone()['id'] if is_postgres else cursor.lastrowid
+        link_gallery_artists(conn, art_id, (lineart_artist_id, color_artist_id))
+        # Miniaturas e placeholder são gerados em segundo plano, depois do commit.
+        image_queued = queue_gallery_image(conn, art_id)
+        bump_version(conn, 'gallery')
         conn.commit()
     except Exception as e:
         conn.rollback()
@@ -54,7 +63,9 @@ def add_to_gallery():
         cursor.close()
         conn.close()
 
-    return jsonify({'success': True})
+    if image_queued:
+        wake_worker()
+    return jsonify({'success': True, 'id': art_id})
 
 @admin_bp.route('/api/gallery/<int:art_id>', methods=['DELETE'])
 @admin_required
@@ -67,7 +78,10 @@ def delete_from_gallery(art_id):
     try:
         query = f'DELETE FROM gallery WHERE id = {placeholder}'
         cursor.execute(query, (art_id,))
+        unlink_gallery_artists(conn, art_id)
+        bump_version(conn, 'gallery')
         conn.commit()
+        remove_derivatives(art_id)
     except Exception as e:
         conn.rollback()
         return jsonify({'success': False, 'message': f'Erro no servidor: {e}'}), 500
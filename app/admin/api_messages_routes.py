@@ -2,8 +2,9 @@
 
 import os
 from flask import jsonify, request
-from app import socketio
+from app.realtime import emit_to_admins
 from app.utils import get_db_connection, admin_required
+from app.search import remove_document
 from .routes import admin_bp
 
 @admin_bp.route('/api/messages', methods=['GET'])
@@ -54,8 +55,9 @@ def delete_contact_message(message_id):
     try:
         query = f'DELETE FROM contact_messages WHERE id = {placeholder}'
         cursor.execute(query, (message_id,))
+        remove_document(conn, 'message', message_id)
         conn.commit()
-        socketio.emit('message_deleted', {'message_id': message_id})
+        emit_to_admins('message_deleted', {'message_id': message_id})
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -6,6 +6,7 @@ import json
 import os
 from flask import request, jsonify
 from app.utils import get_db_connection, admin_required
+from app.cache import bump_version
 from .routes import admin_bp
 
 def parse_plugin_code(code):
@@ -67,6 +68,7 @@ def add_plugin():
     try:
         query = f'INSERT INTO plugins (id, name, description, version, code, is_active, scope) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})'
         cursor.execute(query, (plugin_data['id'], plugin_data['name'], plugin_data['description'], plugin_data['version'], plugin_data['code'], 0, scope))
+        bump_version(conn, 'plugins')
         conn.commit()
     except Exception:
         conn.rollback()
@@ -90,6 +92,7 @@ def toggle_plugin_status(plugin_id):
     try:
         query = f'UPDATE plugins SET is_active = NOT is_active WHERE id = {placeholder}'
         cursor.execute(query, (plugin_id,))
+        bump_version(conn, 'plugins')
         conn.commit()
     except Exception as e:
         conn.rollback()
@@ -112,6 +115,7 @@ def delete_plugin(plugin_id):
     try:
         query = f'DELETE FROM plugins WHERE id = {placeholder}'
         cursor.execute(query, (plugin_id,))
+        bump_version(conn, 'plugins')
         conn.commit()
     except Exception as e:
         conn.rollback()
@@ -4,6 +4,8 @@ import json
 import os
 from flask import request, jsonify, session
 from app.utils import get_db_connection, admin_required
+from app.cache import bump_version
+from app.search import index_user
 from .routes import admin_bp
 
 @admin_bp.route('/api/profile', methods=['GET', 'POST'])
@@ -38,6 +40,8 @@ def manage_artist_profile():
             
             query = f"UPDATE users SET {set_clauses} WHERE id = {placeholder}"
             cursor.execute(query, tuple(values))
+            index_user(conn, user_id, profile_data['username'])
+            bump_version(conn, 'profiles')
             conn.commit()
             
             if 'username' in profile_data:
@@ -165,6 +169,7 @@ def sync_artist_services():
                     service_data.get('is_active', True)
                 ))
         
+        bump_version(conn, 'services')
         conn.commit()
         return jsonify({'success': True, 'message': 'Serviços sincronizados com sucesso.'})
 
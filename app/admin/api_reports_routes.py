@@ -3,10 +3,20 @@
 import os
 from flask import request, jsonify
 from datetime import datetime
-from collections import defaultdict
 from app.utils import get_db_connection, admin_required
+from app.cache import VersionedCache
 from .routes import admin_bp
 
+# Resumo do dashboard: calculado no banco e guardado em cache até a próxima
+# escrita em um pedido (versão 'commissions') ou por DASHBOARD_SUMMARY_TTL
+# segundos, já que os atrasados e a receita do mês dependem da data de hoje.
+DASHBOARD_SUMMARY_TTL = float(os.environ.get('DASHBOARD_SUMMARY_TTL', '30'))
+DASHBOARD_RECENT_LIMIT = 5
+DASHBOARD_RECENT_COLUMNS = (
+    'id', 'client', 'client_id', 'type', 'date', 'deadline', 'price', 'status',
+    'payment_status', 'payment_method', 'current_phase_index', 'revisions_used'
+)
+
 @admin_bp.route('/api/agenda/comissoes', methods=['GET'])
 @admin_required
 def get_agenda_comissoes():
@@ -22,6 +32,66 @@ def get_agenda_comissoes():
     conn.close()
     return jsonify([dict(row) for row in comissoes_db])
 
+def _load_dashboard_summary():
+    hoje = datetime.now()
+    hoje_str = hoje.strftime('%Y-%m-%d')
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+
+    cursor.execute('SELECT status, COUNT(*) AS total FROM comissoes GROUP BY status')
+    status_counts = {row['status']: int(row['total']) for row in cursor.fetchall()}
+
+    cursor.execute(
+        "SELECT COALESCE(SUM(CASE WHEN payment_status = 'paid' THEN price ELSE 0 END), 0) AS paid, "
+        "COALESCE(SUM(CASE WHEN payment_status <> 'paid' THEN price ELSE 0 END), 0) AS pending "
+        "FROM comissoes WHERE status <> 'cancelled'"
+    )
+    totais = cursor.fetchone()
+
+    cursor.execute(
+        f"SELECT COUNT(*) AS total FROM comissoes WHERE deadline < {placeholder} AND deadline <> '' AND status NOT IN ('completed', 'cancelled')",
+        (hoje_str,)
+    )
+    overdue = int(cursor.fetchone()['total'])
+
+    cursor.execute(
+        f'SELECT COALESCE(SUM(total), 0) AS total FROM revenue_daily WHERE day BETWEEN {placeholder} AND {placeholder}',
+        (hoje.strftime('%Y-%m-01'), hoje.strftime('%Y-%m-31'))
+    )
+    receita_mensal = float(cursor.fetchone()['total'])
+
+    cursor.execute(
+        f"SELECT {', '.join(DASHBOARD_RECENT_COLUMNS)} FROM comissoes ORDER BY date DESC, id DESC LIMIT {placeholder}",
+        (DASHBOARD_RECENT_LIMIT,)
+    )
+    recent = [dict(row) for row in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+
+    return {
+        'total': sum(status_counts.values()),
+        'status_counts': status_counts,
+        'paid_total': float(totais['paid']),
+        'pending_total': float(totais['pending']),
+        'overdue': overdue,
+        'monthly_revenue': receita_mensal,
+        'recent': recent,
+        'generated_at': hoje.isoformat(timespec='seconds'),
+    }
+
+
+_dashboard_summary_cache = VersionedCache('commissions', _load_dashboard_summary, ttl=DASHBOARD_SUMMARY_TTL)
+
+
+@admin_bp.route('/api/dashboard/summary', methods=['GET'])
+@admin_required
+def get_dashboard_summary():
+    """Contagens por status, totais pago/pendente, atrasados e os pedidos mais recentes, com tamanho fixo."""
+    return jsonify(_dashboard_summary_cache.get())
+
+
 @admin_bp.route('/api/financeiro/dados', methods=['GET'])
 @admin_required
 def get_dados_financeiros():
@@ -30,32 +100,37 @@ def get_dados_financeiros():
     fim_req = request.args.get('fim', hoje.strftime('%Y-%m-%d'))
     
     conn = get_db_connection()
-    # --- INÍCIO DA CORREÇÃO ---
     cursor = conn.cursor()
     is_postgres = hasattr(conn, 'cursor_factory')
     placeholder = '%s' if is_postgres else '?'
     
-    query = f"SELECT price, date FROM comissoes WHERE status = 'completed' AND date BETWEEN {placeholder} AND {placeholder}"
+    # Totais e gráfico saem do agregado diário 'revenue_daily', já somado no banco.
+    cursor.execute(
+        f'SELECT COALESCE(SUM(total), 0) AS total_receita, COALESCE(SUM(commissions), 0) AS total_comissoes FROM revenue_daily WHERE day BETWEEN {placeholder} AND {placeholder}',
+        (inicio_req, fim_req)
+    )
+    totais = cursor.fetchone()
+    cursor.execute(
+        f'SELECT SUBSTR(day, 1, 7) AS mes_ano, SUM(total) AS receita FROM revenue_daily WHERE day BETWEEN {placeholder} AND {placeholder} GROUP BY SUBSTR(day, 1, 7) ORDER BY mes_ano',
+        (inicio_req, fim_req)
+    )
+    receita_mensal = cursor.fetchall()
+
+    # A tabela de transações ainda lista pedido a pedido (usa o índice de status e data).
+    query = f"SELECT price, date FROM comissoes WHERE status = 'completed' AND date BETWEEN {placeholder} AND {placeholder} ORDER BY date"
     cursor.execute(query, (inicio_req, fim_req))
     comissoes_concluidas = cursor.fetchall()
     cursor.close()
-    # --- FIM DA CORREÇÃO ---
     conn.close()
 
-    total_receita = sum(c['price'] for c in comissoes_concluidas)
-    total_comissoes = len(comissoes_concluidas)
+    total_receita = float(totais['total_receita'])
+    total_comissoes = int(totais['total_comissoes'])
     ticket_medio = total_receita / total_comissoes if total_comissoes > 0 else 0
 
     transacoes = [{'date': c['date'], 'price': c['price']} for c in comissoes_concluidas]
     
-    receita_mensal = defaultdict(float)
-    for c in comissoes_concluidas:
-        mes_ano = datetime.strptime(c['date'], '%Y-%m-%d').strftime('%Y-%m')
-        receita_mensal[mes_ano] += c['price']
-    
-    sorted_meses = sorted(receita_mensal.keys())
-    grafico_labels = [datetime.strptime(ma, '%Y-%m').strftime('%b/%y') for ma in sorted_meses]
-    grafico_data_values = [receita_mensal[ma] for ma in sorted_meses]
+    grafico_labels = [datetime.strptime(row['mes_ano'], '%Y-%m').strftime('%b/%y') for row in receita_mensal]
+    grafico_data_values = [row['receita'] for row in receita_mensal]
 
     return jsonify({
         'kpis': {
@@ -76,47 +151,51 @@ def get_dados_financeiros():
 def get_relatorios_dados():
     year = request.args.get('ano', str(datetime.now().year))
     conn = get_db_connection()
-    # --- INÍCIO DA CORREÇÃO ---
     cursor = conn.cursor()
     is_postgres = hasattr(conn, 'cursor_factory')
     placeholder = '%s' if is_postgres else '?'
     
-    # Em PostgreSQL, o operador LIKE precisa de um placeholder
-    like_pattern = f'{year}%'
-    query = f"SELECT price, client, type, date FROM comissoes WHERE status = 'completed' AND date LIKE {placeholder}"
-    cursor.execute(query, (like_pattern,))
-    comissoes_ano = cursor.fetchall()
+    # Intervalo de datas em vez de LIKE 'ANO%', para usar a chave primária do agregado.
+    periodo = (f'{year}-01-01', f'{year}-12-31')
+
+    cursor.execute(
+        f"SELECT COALESCE(SUM(total), 0) AS receita_anual, COALESCE(SUM(commissions), 0) AS total_comissoes, COUNT(DISTINCT client) AS clientes_ativos FROM revenue_daily WHERE day BETWEEN {placeholder} AND {placeholder}",
+        periodo
+    )
+    totais = cursor.fetchone()
+
+    cursor.execute(
+        f'SELECT client, SUM(total) AS total FROM revenue_daily WHERE day BETWEEN {placeholder} AND {placeholder} GROUP BY client ORDER BY total DESC LIMIT 5',
+        periodo
+    )
+    top_clientes = [{'client': row['client'] or None, 'total': row['total']} for row in cursor.fetchall()]
+
+    cursor.execute(
+        f'SELECT type, SUM(total) AS total FROM revenue_daily WHERE day BETWEEN {placeholder} AND {placeholder} GROUP BY type',
+        periodo
+    )
+    receita_por_tipo = {row['type']: row['total'] for row in cursor.fetchall()}
+
+    cursor.execute(
+        f'SELECT SUBSTR(day, 6, 2) AS mes, SUM(commissions) AS total FROM revenue_daily WHERE day BETWEEN {placeholder} AND {placeholder} GROUP BY SUBSTR(day, 6, 2)',
+        periodo
+    )
+    comissoes_por_mes = {month: 0 for month in range(1, 13)}
+    for row in cursor.fetchall():
+        comissoes_por_mes[int(row['mes'])] = int(row['total'])
     cursor.close()
-    # --- FIM DA CORREÇÃO ---
     conn.close()
 
-    receita_anual = sum(c['price'] for c in comissoes_ano)
-    total_comissoes = len(comissoes_ano)
-    clientes_ativos = len(set(c['client'] for c in comissoes_ano))
+    receita_anual = float(totais['receita_anual'])
+    total_comissoes = int(totais['total_comissoes'])
     ticket_medio = receita_anual / total_comissoes if total_comissoes > 0 else 0
 
     kpis = {
         'receita_anual': receita_anual,
         'total_comissoes': total_comissoes,
-        'clientes_ativos': clientes_ativos,
+        'clientes_ativos': totais['clientes_ativos'],
         'ticket_medio': ticket_medio
     }
-
-    top_clientes_data = defaultdict(float)
-    for c in comissoes_ano:
-        top_clientes_data[c['client']] += c['price']
-    
-    sorted_clientes = sorted(top_clientes_data.items(), key=lambda item: item[1], reverse=True)
-    top_clientes = [{'client': client, 'total': total} for client, total in sorted_clientes[:5]]
-
-    receita_por_tipo = defaultdict(float)
-    for c in comissoes_ano:
-        receita_por_tipo[c['type']] += c['price']
-
-    comissoes_por_mes = {month: 0 for month in range(1, 13)}
-    for c in comissoes_ano:
-        mes = datetime.strptime(c['date'], '%Y-%m-%d').month
-        comissoes_por_mes[mes] += 1
     
     meses_nomes = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
     volume_mensal_grafico = {meses_nomes[mes-1]: count for mes, count in comissoes_por_mes.items()}
@@ -124,6 +203,6 @@ def get_relatorios_dados():
     return jsonify({
         'kpis': kpis,
         'top_clientes': top_clientes,
-        'receita_por_tipo': dict(receita_por_tipo),
+        'receita_por_tipo': receita_por_tipo,
         'comissoes_por_mes': volume_mensal_grafico
-    })
\ No newline at end of file
+    })
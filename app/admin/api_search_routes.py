@@ -0,0 +1,34 @@
+# Arquivo: app/admin/api_search_routes.py
+
+from flask import request, jsonify
+from app.utils import get_db_connection, admin_required
+from app.search import search, KINDS, DEFAULT_LIMIT, MAX_LIMIT
+from .routes import admin_bp
+
+@admin_bp.route('/api/search', methods=['GET'])
+@admin_required
+def search_admin():
+    """
+    Busca textual em pedidos, comentários, eventos, mensagens de contato e usuários.
+    Parâmetros: q, kinds (lista separada por vírgula, entre commission, comment,
+    event, message e user), limit e offset. Os trechos encontrados vêm em <mark>.
+    'ranked' é false quando a página passou das ocorrências ordenadas por
+    relevância e os itens seguem por data.
+    """
+    query = request.args.get('q', '').strip()
+    kinds = [k.strip() for k in request.args.get('kinds', '').split(',') if k.strip()]
+    invalid = [k for k in kinds if k not in KINDS]
+    try:
+        limit = min(max(int(request.args.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Parâmetros inválidos: {e}'}), 400
+    if invalid:
+        return jsonify({'success': False, 'message': f"Tipos inválidos: {', '.join(invalid)}"}), 400
+    if not query:
+        return jsonify({'success': False, 'message': 'Informe o texto da busca.'}), 400
+
+    conn = get_db_connection()
+    items, next_offset, ranked = search(conn, query, kinds, limit, offset)
+    conn.close()
+    return jsonify({'items': items, 'next_offset': next_offset, 'ranked': ranked})
@@ -4,6 +4,7 @@ import json
 import os
 from flask import request, jsonify, session
 from app.utils import get_db_connection, admin_required
+from app.cache import bump_version, get_site_settings
 from .routes import admin_bp
 
 @admin_bp.route('/api/settings', methods=['GET', 'POST'])
@@ -31,14 +32,13 @@ def manage_settings():
                 
                 cursor.execute(query, (key, db_value))
             
+            bump_version(conn, 'settings')
             conn.commit()
             return jsonify({'success': True, 'message': 'Configurações salvas.'})
         
         # Método GET
         else:
-            cursor.execute('SELECT key, value FROM settings')
-            settings_db = cursor.fetchall()
-            settings = {row['key']: row['value'] for row in settings_db}
+            settings = dict(get_site_settings())
             
             json_keys_from_settings = [
                 'social_links', 'commission_types', 'commission_extras', 
@@ -0,0 +1,35 @@
+# Arquivo: app/admin/api_system_routes.py
+
+from flask import jsonify
+from app.utils import admin_required
+from app.db_pool import get_pool_stats
+from app.outbox import get_outbox_stats
+from app.http_cache import get_page_cache_stats
+from app.query_stats import get_query_stats
+from .routes import admin_bp
+
+@admin_bp.route('/api/system/db_pool', methods=['GET'])
+@admin_required
+def get_db_pool_stats():
+    """Retorna as estatísticas do pool de conexões deste worker."""
+    return jsonify(get_pool_stats())
+
+@admin_bp.route('/api/system/outbox', methods=['GET'])
+@admin_required
+def get_outbox_metrics():
+    """Retorna as métricas de entrega da outbox deste worker e o tamanho da fila."""
+    return jsonify(get_outbox_stats())
+
+
+@admin_bp.route('/api/system/page_cache', methods=['GET'])
+@admin_required
+def get_page_cache_metrics():
+    """Retorna os contadores do cache de páginas públicas deste worker."""
+    return jsonify(get_page_cache_stats())
+
+
+@admin_bp.route('/api/system/queries', methods=['GET'])
+@admin_required
+def get_query_metrics():
+    """Retorna os totais de consultas SQL e as últimas consultas lentas deste worker."""
+    return jsonify(get_query_stats())
@@ -22,3 +22,5 @@ from . import api_settings_routes
 from . import api_plugins_routes
 from . import api_faqs_routes
 from . import api_profile_routes
+from . import api_system_routes
+from . import api_search_routes
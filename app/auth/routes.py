@@ -1,8 +1,9 @@
 # app/auth/routes.py - Autenticação por Usuário/Senha com Validações
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.utils import get_db_connection
+from app.passwords import hash_password, verify_password
+from app.search import index_user
 import re # Importado para validação de senha
 
 # LINHA MODIFICADA: 'template_folder' removido
@@ -22,11 +23,17 @@ def login():
         query = f'SELECT * FROM users WHERE username = {placeholder}'
         cursor.execute(query, (username,))
         user = cursor.fetchone()
+
+        password_ok, new_hash = verify_password(user['password_hash'] if user else None, password)
+        if password_ok and new_hash:
+            # Senha gravada com outro método ou custo: atualiza para o configurado.
+            cursor.execute(f'UPDATE users SET password_hash = {placeholder} WHERE id = {placeholder}', (new_hash, user['id']))
+            conn.commit()
         
         cursor.close()
         conn.close()
 
-        if user and check_password_hash(user['password_hash'], password):
+        if password_ok:
             session['user_id'] = user['id']
             session['username'] = user['username']
             session['is_admin'] = user['is_admin']
@@ -76,9 +83,10 @@ def registro():
             return render_template('registro.html')
             
         # --- Criação do Usuário (sem email) ---
-        hashed_password = generate_password_hash(password)
-        query_insert = f'INSERT INTO users (username, password_hash) VALUES ({placeholder}, {placeholder})'
+        hashed_password = hash_password(password)
+        query_insert = f'INSERT INTO users (username, password_hash) VALUES ({placeholder}, {placeholder})' + (' RETURNING id' if is_postgres else '')
         cursor.execute(query_insert, (username, hashed_password))
+        index_user(conn, cursor.fetchone()['id'] if is_postgres else cursor.lastrowid, username)
         conn.commit()
         flash('Conta criada com sucesso! Por favor, faça login.', 'success')
         
@@ -0,0 +1,22 @@
+# Arquivo: app/blocking.py
+
+# Sob o eventlet, todas as requisições de um worker dividem uma única thread do
+# sistema. Trabalho que segura a CPU ou o disco por muito tempo (hash de
+# arquivos grandes, por exemplo) trava todas elas; aqui ele vai para o pool de
+# threads nativas do eventlet (tpool) enquanto a green thread da requisição espera.
+
+try:
+    from eventlet import patcher, tpool
+except ImportError:
+    patcher = tpool = None
+
+
+def eventlet_active():
+    return patcher is not None and patcher.is_monkey_patched('thread')
+
+
+def run_blocking(func, *args, **kwargs):
+    """Executa func(*args, **kwargs) fora do loop do eventlet, quando ele está ativo."""
+    if eventlet_active():
+        return tpool.execute(func, *args, **kwargs)
+    return func(*args, **kwargs)
@@ -0,0 +1,122 @@
+# Arquivo: app/cache.py
+
+import os
+import time
+import threading
+from .metrics import count_cache
+from .utils import get_db_connection
+
+# Intervalo (segundos) entre consultas à tabela 'cache_versions'. Dentro desse
+# intervalo, ler um valor em cache não custa nenhuma ida ao banco.
+VERSION_CHECK_INTERVAL = float(os.environ.get('CACHE_VERSION_CHECK_INTERVAL', '5'))
+
+_versions = {}
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def get_versions():
+    """
+    Retorna as versões de conteúdo conhecidas, relendo a tabela 'cache_versions'
+    no máximo uma vez por intervalo. A tabela é compartilhada por todos os
+    workers, então uma escrita em um processo invalida o cache dos outros.
+    """
+    global _versions, _last_check
+    now = time.monotonic()
+    if now - _last_check < VERSION_CHECK_INTERVAL:
+        return _versions
+
+    with _lock:
+        if now - _last_check >= VERSION_CHECK_INTERVAL:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT name, version FROM cache_versions')
+            _versions = {row['name']: row['version'] for row in cursor.fetchall()}
+            cursor.close()
+            conn.close()
+            _last_check = time.monotonic()
+    return _versions
+
+
+def get_version(name):
+    return get_versions().get(name, 0)
+
+
+def bump_version(conn, *names):
+    """
+    Incrementa a versão dos conteúdos informados na transação do chamador.
+    Deve ser chamada logo antes do commit da escrita que alterou o conteúdo.
+    """
+    global _last_check
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+
+    cursor = conn.cursor()
+    query = f'INSERT INTO cache_versions (name, version) VALUES ({placeholder}, 1) ON CONFLICT (name) DO UPDATE SET version = cache_versions.version + 1'
+    for name in names:
+        cursor.execute(query, (name,))
+    cursor.close()
+    # Força este worker a reler as versões na próxima leitura.
+    _last_check = 0.0
+
+
+class VersionedCache:
+    """
+    Valor carregado sob demanda e recarregado quando a versão do conteúdo muda.
+    Com 'ttl' (segundos), também é recarregado quando fica mais velho que isso,
+    para valores que dependem do relógio (ex.: pedidos atrasados).
+    """
+
+    def __init__(self, name, loader, ttl=None):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self._entry = None
+
+    def get(self):
+        version = get_version(self.name)
+        entry = self._entry
+        expired = entry is not None and self.ttl is not None and time.monotonic() - entry[2] >= self.ttl
+        if entry is None or entry[0] != version or expired:
+            count_cache(self.name, 'miss')
+            entry = (version, self.loader(), time.monotonic())
+            self._entry = entry
+        else:
+            count_cache(self.name, 'hit')
+        return entry[1]
+
+
+def _load_settings():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT key, value FROM settings')
+    settings = {row['key']: row['value'] for row in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return settings
+
+
+def _load_active_plugins():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, code, scope FROM plugins WHERE is_active = 1 ORDER BY name')
+    plugins = {'public': [], 'admin': []}
+    for row in cursor.fetchall():
+        plugins.setdefault(row['scope'], []).append({'id': row['id'], 'code': row['code']})
+    cursor.close()
+    conn.close()
+    return plugins
+
+
+_settings_cache = VersionedCache('settings', _load_settings)
+_plugins_cache = VersionedCache('plugins', _load_active_plugins)
+
+
+def get_site_settings():
+    """Retorna o snapshot atual da tabela 'settings'. Não modifique o dicionário retornado."""
+    return _settings_cache.get()
+
+
+def get_active_plugins(scope):
+    """Retorna os plugins ativos do escopo ('public' ou 'admin')."""
+    return _plugins_cache.get().get(scope, [])
@@ -3,8 +3,10 @@
 import sqlite3
 import os
 from flask import request, jsonify, session, url_for
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.utils import get_db_connection, login_required
+from app.cache import bump_version
+from app.passwords import hash_password, verify_password
+from app.search import index_user
 from .routes import client_bp
 
 # Rota para atualizar o nome de usuário e avatar
@@ -36,6 +38,9 @@ def update_profile():
         # Atualiza apenas o nome de usuário e o avatar
         query_update = f'UPDATE users SET username = {placeholder}, artist_avatar = {placeholder} WHERE id = {placeholder}'
         cursor.execute(query_update, (new_username, new_avatar, user_id))
+        index_user(conn, user_id, new_username)
+        # O nome aparece nos créditos da galeria e nas páginas públicas dos artistas.
+        bump_version(conn, 'profiles')
         conn.commit()
 
         session['username'] = new_username
@@ -76,10 +81,10 @@ def update_password():
         cursor.execute(query_select, (user_id,))
         user = cursor.fetchone()
 
-        if not user or not check_password_hash(user['password_hash'], current_password):
+        if not verify_password(user['password_hash'] if user else None, current_password)[0]:
             return jsonify({'success': False, 'message': 'A senha atual está incorreta.'}), 403
 
-        new_password_hash = generate_password_hash(new_password)
+        new_password_hash = hash_password(new_password)
         query_update = f'UPDATE users SET password_hash = {placeholder} WHERE id = {placeholder}'
         cursor.execute(query_update, (new_password_hash, user_id))
         conn.commit()
@@ -112,7 +117,7 @@ def delete_account():
         cursor.execute(query_select, (user_id,))
         user = cursor.fetchone()
 
-        if not user or not check_password_hash(user['password_hash'], password):
+        if not verify_password(user['password_hash'] if user else None, password)[0]:
             return jsonify({'success': False, 'message': 'A senha está incorreta.'}), 403
         
         deleted_username = f"usuario_deletado_{user_id}"
@@ -120,6 +125,8 @@ def delete_account():
         # Atualiza o usuário para um estado anônimo/deletado, sem o campo de email
         query_update = f'UPDATE users SET username = {placeholder}, password_hash = {placeholder}, is_blocked = 1, is_banned = 1 WHERE id = {placeholder}'
         cursor.execute(query_update, (deleted_username, 'deleted', user_id))
+        index_user(conn, user_id, deleted_username)
+        bump_version(conn, 'profiles')
         conn.commit()
 
         session.clear()
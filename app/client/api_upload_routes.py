@@ -0,0 +1,78 @@
+# Arquivo: app/client/api_upload_routes.py
+
+import os
+from flask import request, jsonify, session, send_file
+from app.utils import get_db_connection, login_required
+from app.uploads import (UploadError, create_upload, get_upload, upload_to_dict, write_chunk,
+                         get_commission_file, blob_path)
+from .routes import client_bp
+
+# Rota para abrir um envio de arquivo de referência
+@client_bp.route('/api/client/uploads', methods=['POST'])
+@login_required
+def start_upload():
+    data = request.get_json() or {}
+    user_id = session.get('user_id')
+
+    conn = get_db_connection()
+    try:
+        upload_id = create_upload(conn, user_id, data.get('filename'), data.get('size'), data.get('mime_type'))
+        conn.commit()
+        upload = get_upload(conn, upload_id, user_id)
+        return jsonify(dict(upload_to_dict(upload), success=True)), 201
+    except UploadError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    finally:
+        conn.close()
+
+# Rota para consultar quantos bytes já chegaram (usada para retomar o envio)
+@client_bp.route('/api/client/uploads/<string:upload_id>', methods=['GET'])
+@login_required
+def get_upload_status(upload_id):
+    conn = get_db_connection()
+    upload = get_upload(conn, upload_id, session.get('user_id'))
+    conn.close()
+    if upload is None:
+        return jsonify({'success': False, 'message': 'Envio não encontrado.'}), 404
+    return jsonify(dict(upload_to_dict(upload), success=True))
+
+# Rota que recebe uma parte do arquivo. O corpo é o conteúdo bruto da parte e
+# o cabeçalho 'Upload-Offset' indica a posição dela no arquivo.
+@client_bp.route('/api/client/uploads/<string:upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id):
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Cabeçalho Upload-Offset inválido.'}), 400
+
+    try:
+        upload = write_chunk(upload_id, session.get('user_id'), offset, request.stream, request.content_length)
+    except UploadError as e:
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    return jsonify(dict(upload_to_dict(upload), success=True))
+
+# Rota para baixar um arquivo de referência (dono do pedido ou administradores)
+@client_bp.route('/api/client/orders/<string:order_id>/files/<int:file_id>')
+@login_required
+def download_commission_file(order_id, file_id):
+    conn = get_db_connection()
+    commission_file = get_commission_file(conn, order_id, file_id)
+    conn.close()
+
+    if commission_file is None or not (session.get('is_admin') or commission_file['client_id'] == session.get('user_id')):
+        return jsonify({'success': False, 'message': 'Arquivo não encontrado.'}), 404
+
+    path = blob_path(commission_file['sha256'])
+    if not os.path.exists(path):
+        return jsonify({'success': False, 'message': 'Arquivo não encontrado.'}), 404
+    # O conteúdo de um hash nunca muda, então o navegador pode guardar o arquivo por muito tempo.
+    response = send_file(path, mimetype=commission_file['mime_type'], download_name=commission_file['filename'],
+                         etag=commission_file['sha256'], conditional=True, max_age=31536000)
+    # Arquivo do cliente: só o navegador dele guarda, nunca um proxy compartilhado.
+    response.cache_control.public = False
+    response.cache_control.private = True
+    # O tipo gravado foi detectado pelo conteúdo; o navegador não deve adivinhar outro.
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
@@ -2,12 +2,22 @@
 
 import sqlite3
 import json
-import time
 import os
 from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from app import socketio
-from app.utils import get_db_connection, add_event_to_log, login_required, add_notification
+from app.utils import get_db_connection, add_event_to_log, login_required
+from app.cache import get_site_settings
+from app.realtime import emit_commission_update
+from app.notifications import notify, admin_notification
+from app.commission_history import commission_to_dict, attach_history, add_comment
+from app.search import index_commission
+from app.commission_states import run_transition, TransitionError
+from app.commission_changes import (touch_commission, changes_since, current_change_seq, parse_since,
+                                    VersionConflict, retry_on_conflict, parse_if_match, etag)
+from app.ids import new_commission_id
+from app.uploads import UploadError, attach_uploads
+from app.portfolio import (fetch_portfolios, decode_cursor as decode_portfolio_cursor,
+                           DEFAULT_LIMIT as PORTFOLIO_DEFAULT_LIMIT, MAX_LIMIT as PORTFOLIO_MAX_LIMIT)
 
 # LINHA MODIFICADA: 'template_folder' removido
 client_bp = Blueprint('client', __name__)
@@ -61,38 +71,38 @@ def ajuda_suporte():
     faqs_db = cursor.fetchall()
     faqs = [dict(row) for row in faqs_db]
     
-    cursor.execute("SELECT value FROM settings WHERE key = 'support_contacts'")
-    contacts_setting = cursor.fetchone()
+    cursor.close()
+    conn.close()
+
+    contacts_setting = get_site_settings().get('support_contacts')
     support_contacts = []
     
-    if contacts_setting and contacts_setting['value']:
+    if contacts_setting:
         try:
-            support_contacts = json.loads(contacts_setting['value'])
+            support_contacts = json.loads(contacts_setting)
         except json.JSONDecodeError:
             support_contacts = []
-
-    cursor.close()
-    conn.close()
     
     return render_template('client/ajuda_suporte.html', faqs=faqs, support_contacts=support_contacts)
 
 
 # --- API do Cliente ---
 
-@client_bp.route('/api/client/artists')
-@login_required
-def get_public_artists():
-    """Busca e retorna todos os administradores que estão marcados como artistas públicos."""
-    conn = get_db_connection()
+def load_public_artists(conn, artist_ids=None):
+    """Administradores marcados como artistas públicos (opcionalmente só os de 'artist_ids')."""
     cursor = conn.cursor()
-    # MODIFICAÇÃO: Adicionada a coluna 'social_links' na consulta SQL
-    cursor.execute(
-        'SELECT id, username, artist_avatar, artist_specialties, artist_portfolio_description, social_links FROM users WHERE is_admin = TRUE AND is_public_artist = TRUE'
-    )
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+
+    query = 'SELECT id, username, artist_avatar, artist_specialties, artist_portfolio_description, social_links FROM users WHERE is_admin = TRUE AND is_public_artist = TRUE'
+    params = ()
+    if artist_ids:
+        query += f" AND id IN ({','.join([placeholder] * len(artist_ids))})"
+        params = tuple(artist_ids)
+    cursor.execute(query + ' ORDER BY id', params)
     artists_db = cursor.fetchall()
     cursor.close()
-    conn.close()
-    
+
     artists_list = []
     for row in artists_db:
         artist_dict = dict(row)
@@ -101,31 +111,59 @@ def get_public_artists():
         except json.JSONDecodeError:
             artist_dict['artist_specialties'] = []
 
-        # MODIFICAÇÃO: Adicionado o processamento para os links sociais
         try:
             artist_dict['social_links'] = json.loads(artist_dict['social_links']) if artist_dict['social_links'] else []
         except (json.JSONDecodeError, TypeError):
             artist_dict['social_links'] = []
             
         artists_list.append(artist_dict)
-        
+    return artists_list
+
+@client_bp.route('/api/client/artists')
+@login_required
+def get_public_artists():
+    """Busca e retorna todos os administradores que estão marcados como artistas públicos."""
+    conn = get_db_connection()
+    artists_list = load_public_artists(conn)
+    conn.close()
     return jsonify(artists_list)
 
+@client_bp.route('/api/client/artists/portfolios')
+@login_required
+def get_artists_portfolios():
+    """
+    Artistas públicos junto com a primeira página do portfólio de cada um, em
+    uma única resposta (o seletor de artistas não precisa de uma requisição
+    por artista). Parâmetros: artist_ids (lista separada por vírgula), limit
+    (obras por artista) e 'cursor.<artist_id>' para a página seguinte de um artista.
+    """
+    try:
+        artist_ids = [int(a) for a in request.args.get('artist_ids', '').split(',') if a.strip()]
+        limit = min(max(int(request.args.get('limit', PORTFOLIO_DEFAULT_LIMIT)), 1), PORTFOLIO_MAX_LIMIT)
+        cursors = {
+            int(key.split('.', 1)[1]): decode_portfolio_cursor(value)
+            for key, value in request.args.items() if key.startswith('cursor.') and value
+        }
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': f'Parâmetros inválidos: {e}'}), 400
+
+    conn = get_db_connection()
+    artists_list = load_public_artists(conn, artist_ids)
+    portfolios = fetch_portfolios(conn, [artist['id'] for artist in artists_list], limit, cursors)
+    conn.close()
+
+    for artist in artists_list:
+        artist['portfolio'] = portfolios[artist['id']]
+    return jsonify({'artists': artists_list})
+
 @client_bp.route('/api/client/artists/<int:artist_id>/portfolio')
 @login_required
 def get_artist_portfolio(artist_id):
     """Busca e retorna as obras da galeria de um artista específico."""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    is_postgres = hasattr(conn, 'cursor_factory')
-    placeholder = '%s' if is_postgres else '?'
-    
-    query = f"SELECT id, title, image_url as image, description, 'fanart' as type, {placeholder} as artist_id FROM gallery WHERE lineart_artist_id = {placeholder} OR color_artist_id = {placeholder} ORDER BY created_at DESC"
-    cursor.execute(query, (artist_id, artist_id, artist_id))
-    arts_db = cursor.fetchall()
-    cursor.close()
+    arts = fetch_portfolios(conn, [artist_id])[artist_id]['items']
     conn.close()
-    return jsonify([dict(row) for row in arts_db])
+    return jsonify(arts)
 
 @client_bp.route('/api/client/artist_services/<int:artist_id>')
 @login_required
@@ -158,27 +196,7 @@ def get_artist_services(artist_id):
 @client_bp.route('/api/client/pricing')
 @login_required
 def client_get_pricing():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    is_postgres = hasattr(conn, 'cursor_factory')
-    placeholder = '%s' if is_postgres else '?'
-    keys_to_fetch = [
-        'commission_types', 'commission_extras', 
-        'refund_policy', 
-        'default_phases', 'revision_alert_text', 'pix_key',
-        'paypal_email', 'payment_currency_code', 'paypal_hosted_button_id',
-        'support_contacts'
-    ]
-
-    placeholders = ','.join([placeholder] * len(keys_to_fetch))
-    query = f'SELECT key, value FROM settings WHERE key IN ({placeholders})'
-    cursor.execute(query, tuple(keys_to_fetch))
-    settings_db = cursor.fetchall()
-    
-    cursor.close()
-    conn.close()
-    
-    settings = {row['key']: row['value'] for row in settings_db}
+    settings = get_site_settings()
     
     response_data = {
         'commission_types': json.loads(settings.get('commission_types', '[]')),
@@ -198,23 +216,41 @@ def client_get_pricing():
 @client_bp.route('/api/client/orders')
 @login_required
 def client_get_orders():
+    """
+    Pedidos do cliente com o histórico completo. O cursor de sincronização vai
+    no cabeçalho X-Sync-Cursor; com '?since=<cursor>', devolve só os pedidos
+    alterados ou excluídos depois dele: {'items', 'deleted', 'cursor'}.
+    """
     user_id = session.get('user_id')
+    since_arg = request.args.get('since')
+    try:
+        since = parse_since(since_arg) if since_arg is not None else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Cursor de sincronização inválido.'}), 400
+
     conn = get_db_connection()
+    if since is not None:
+        orders_db, deleted, sync_cursor = changes_since(conn, since, client_id=user_id)
+        orders_list = attach_history(conn, [commission_to_dict(row) for row in orders_db])
+        conn.close()
+        return jsonify({'items': orders_list, 'deleted': deleted, 'cursor': str(sync_cursor)})
+
     cursor = conn.cursor()
     is_postgres = hasattr(conn, 'cursor_factory')
     placeholder = '%s' if is_postgres else '?'
     
+    # Lido antes dos pedidos, pelo mesmo motivo de changes_since().
+    sync_cursor = current_change_seq(conn)
     query = f'SELECT * FROM comissoes WHERE client_id = {placeholder} ORDER BY date DESC'
     cursor.execute(query, (user_id,))
     orders_db = cursor.fetchall()
     cursor.close()
-    conn.close()
     
-    orders_list = [dict(row) for row in orders_db]
-    for order in orders_list:
-        for key in ['comments', 'reference_files', 'preview', 'phases', 'event_log', 'assigned_artist_ids']:
-            order[key] = json.loads(order[key]) if (order[key] and order[key] != '[]') else []
-    return jsonify(orders_list)
+    orders_list = attach_history(conn, [commission_to_dict(row) for row in orders_db])
+    conn.close()
+    response = jsonify(orders_list)
+    response.headers['X-Sync-Cursor'] = str(sync_cursor)
+    return response
 
 
 @client_bp.route('/api/client/commissions', methods=['POST'])
@@ -245,24 +281,32 @@ def client_create_commission():
             default_phases_str = cursor.fetchone()
             commission_phases = json.loads(default_phases_str['value']) if default_phases_str else []
             
-        new_id = f"ART-{int(time.time())}"
+        new_id = new_commission_id()
         today = datetime.now().strftime('%Y-%m-%d')
-        initial_event = [{"timestamp": datetime.now().isoformat(), "actor": "Cliente", "message": "Pedido criado. Aguardando pagamento."}]
+
+        # Arquivos de referência já enviados em partes por /api/client/uploads
+        reference_files = attach_uploads(conn, new_id, user_id, data.get('reference_uploads'))
         
         query_insert = f"""
-            INSERT INTO comissoes (id, client, type, date, deadline, price, status, description, preview, comments, client_id, phases, current_phase_index, revisions_used, event_log, payment_status, assigned_artist_ids) 
-            VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
+            INSERT INTO comissoes (id, client, type, date, deadline, price, status, description, preview, comments, reference_files, client_id, phases, current_phase_index, revisions_used, event_log, payment_status, assigned_artist_ids) 
+            VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
         """
-        cursor.execute(query_insert, (new_id, username, data.get('type'), today, data.get('deadline'), data.get('price'), 'pending_payment', data.get('description'), '[]', '[]', user_id, json.dumps(commission_phases), 0, 0, json.dumps(initial_event), 'unpaid', json.dumps(data.get('assigned_artist_ids'))))
-        conn.commit()
+        cursor.execute(query_insert, (new_id, username, data.get('type'), today, data.get('deadline'), data.get('price'), 'pending_payment', data.get('description'), '[]', '[]', json.dumps(reference_files), user_id, json.dumps(commission_phases), 0, 0, '[]', 'unpaid', json.dumps(data.get('assigned_artist_ids'))))
+        add_event_to_log(conn, new_id, "Cliente", "Pedido criado. Aguardando pagamento.")
+        index_commission(conn, new_id, username, data.get('type'), data.get('description'))
+        touch_commission(conn, new_id)
 
         artist_names = get_artist_names_by_ids(conn, data.get('assigned_artist_ids'))
         notification_message = f"Novo pedido #{new_id} de {username} para {artist_names} aguardando pagamento."
-        add_notification(notification_message, new_id)
+        notifications = notify(conn, [admin_notification(notification_message, new_id)])
+        conn.commit()
         
-        socketio.emit('commission_updated', {'commission_id': new_id, 'message_for_admin': notification_message})
+        emit_commission_update(new_id, user_id, created=True, notifications=notifications, message_for_admin=notification_message)
         
         return jsonify({'success': True, 'message': 'Pedido enviado com sucesso!', 'id': new_id})
+    except UploadError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), e.status
     except Exception as e:
         print(f"Erro inesperado: {e}")
         return jsonify({'success': False, 'message': f'Erro inesperado: {e}'}), 500
@@ -276,35 +320,43 @@ def client_add_comment(order_id):
     data = request.get_json()
     user_id = session.get('user_id')
     username = session.get('username')
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
     cursor = conn.cursor()
     is_postgres = hasattr(conn, 'cursor_factory')
     placeholder = '%s' if is_postgres else '?'
-    
-    query_select = f'SELECT * FROM comissoes WHERE id = {placeholder} AND client_id = {placeholder}'
-    cursor.execute(query_select, (order_id, user_id))
-    order = cursor.fetchone()
 
-    if not order:
+    try:
+        query_select = f'SELECT id FROM comissoes WHERE id = {placeholder} AND client_id = {placeholder}'
+        cursor.execute(query_select, (order_id, user_id))
+        order = cursor.fetchone()
+        if not order:
+            return jsonify({'success': False, 'message': 'Pedido não encontrado.'}), 404
+
+        new_comment = add_comment(conn, order_id, username, False, data.get('text'))
+        event = add_event_to_log(conn, order_id, "Cliente", "Adicionou um novo comentário.")
+        version = touch_commission(conn, order_id, expected_version)
+        notifications = notify(conn, [admin_notification(f"Novo comentário de {username} no pedido #{order_id}", order_id)])
+        conn.commit()
+
+        emit_commission_update(
+            order_id, user_id, changes={'version': version}, comments=[new_comment], events=[event], notifications=notifications,
+            message_for_admin=f"Novo comentário de {username} no pedido #{order_id}."
+        )
+
+        response = jsonify({'success': True, 'comment': new_comment, 'version': version})
+        response.headers['ETag'] = etag(version)
+        return response
+    except VersionConflict as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
+    except Exception as e:
+        conn.rollback()
+        print(f"Erro ao adicionar comentário do cliente: {e}")
+        return jsonify({'success': False, 'message': 'Erro no servidor ao adicionar o comentário.'}), 500
+    finally:
         cursor.close()
         conn.close()
-        return jsonify({'success': False, 'message': 'Pedido não encontrado.'}), 404
-    
-    comments = json.loads(order['comments']) if order['comments'] else []
-    new_comment = {"author": username, "is_artist": False, "date": datetime.now().isoformat(), "text": data.get('text')}
-    comments.append(new_comment)
-    
-    query_update = f'UPDATE comissoes SET comments = {placeholder} WHERE id = {placeholder}'
-    cursor.execute(query_update, (json.dumps(comments), order_id))
-    add_event_to_log(conn, order_id, "Cliente", "Adicionou um novo comentário.")
-    conn.commit()
-    
-    socketio.emit('commission_updated', {'commission_id': order_id, 'message_for_admin': f"Novo comentário de {username} no pedido #{order_id}."})
-    
-    cursor.close()
-    conn.close()
-    add_notification(f"Novo comentário de {username} no pedido #{order_id}", order_id)
-    return jsonify({'success': True, 'comment': new_comment})
 
 
 @client_bp.route('/api/client/orders/<string:order_id>/request_revision', methods=['POST'])
@@ -314,51 +366,40 @@ def request_revision(order_id):
     comment_text = data.get('comment')
     if not comment_text:
         return jsonify({'success': False, 'message': 'O comentário de revisão é obrigatório.'}), 400
-        
+
     user_id = session.get('user_id')
     username = session.get('username')
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
-    cursor = conn.cursor()
-    is_postgres = hasattr(conn, 'cursor_factory')
-    placeholder = '%s' if is_postgres else '?'
-    
-    query_select = f'SELECT * FROM comissoes WHERE id = {placeholder} AND client_id = {placeholder}'
-    cursor.execute(query_select, (order_id, user_id))
-    order = cursor.fetchone()
-    
-    if not order:
-        cursor.close()
-        conn.close()
-        return jsonify({'success': False, 'message': 'Acesso negado.'}), 403
-        
-    phases = json.loads(order['phases'])
-    current_phase_index = order['current_phase_index']
-    revisions_used = order['revisions_used']
-    current_phase = phases[current_phase_index]
-    if revisions_used >= current_phase['revisions_limit']:
-        cursor.close()
+
+    def attempt():
+        # O limite de revisões é conferido sobre o que foi lido; se outra aba
+        # pediu revisão no meio do caminho, a gravação falha e tudo é refeito.
+        result = run_transition(conn, order_id, 'request_revision', expected_version, client_id=user_id)
+        phase_name = result['context']['phase']
+        revision_comment = add_comment(conn, order_id, username, False, comment_text, is_revision_request=True, phase_name=phase_name)
+        notifications = notify(conn, [admin_notification(f"Cliente solicitou revisão para a fase '{phase_name}' do pedido #{order_id}", order_id)])
+        conn.commit()
+
+        emit_commission_update(
+            order_id, user_id, changes=result['changes'],
+            comments=[revision_comment], events=result['events'], notifications=notifications,
+            message_for_admin=f"{username} pediu revisão para a fase '{phase_name}' do pedido #{order_id}."
+        )
+
+        response = jsonify({'success': True, 'message': 'Pedido de revisão enviado.', 'comment': revision_comment, 'version': result['version']})
+        response.headers['ETag'] = etag(result['version'])
+        return response
+
+    try:
+        return retry_on_conflict(conn, attempt, retry=expected_version is None)
+    except VersionConflict as e:
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
+    except TransitionError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    finally:
         conn.close()
-        return jsonify({'success': False, 'message': 'Limite de revisões para esta fase atingido.'}), 403
-    
-    revisions_used += 1
-    comments = json.loads(order['comments']) if order['comments'] else []
-    revision_comment = {
-        "author": username, "is_artist": False, "date": datetime.now().isoformat(),
-        "text": comment_text, "is_revision_request": True, "phase_name": current_phase['name']
-    }
-    comments.append(revision_comment)
-    
-    query_update = f'UPDATE comissoes SET status = {placeholder}, revisions_used = {placeholder}, comments = {placeholder} WHERE id = {placeholder}'
-    cursor.execute(query_update, ('revisions', revisions_used, json.dumps(comments), order_id))
-    add_event_to_log(conn, order_id, "Cliente", f"Solicitou uma revisão para a fase '{current_phase['name']}'.")
-    conn.commit()
-    
-    socketio.emit('commission_updated', {'commission_id': order_id, 'message_for_admin': f"{username} pediu revisão para a fase '{current_phase['name']}' do pedido #{order_id}."})
-    
-    cursor.close()
-    conn.close()
-    add_notification(f"Cliente solicitou revisão para a fase '{current_phase['name']}' do pedido #{order_id}", order_id)
-    return jsonify({'success': True, 'message': 'Pedido de revisão enviado.', 'comment': revision_comment})
 
 
 @client_bp.route('/api/client/orders/<string:order_id>/approve_phase', methods=['POST'])
@@ -366,49 +407,32 @@ def request_revision(order_id):
 def approve_phase(order_id):
     user_id = session.get('user_id')
     username = session.get('username')
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
-    cursor = conn.cursor()
-    is_postgres = hasattr(conn, 'cursor_factory')
-    placeholder = '%s' if is_postgres else '?'
-    
-    query_select = f'SELECT * FROM comissoes WHERE id = {placeholder} AND client_id = {placeholder}'
-    cursor.execute(query_select, (order_id, user_id))
-    order = cursor.fetchone()
 
-    if not order:
-        cursor.close()
-        conn.close()
-        return jsonify({'success': False, 'message': 'Acesso negado.'}), 403
-    
-    phases = json.loads(order['phases']) if order['phases'] else []
-    current_phase_index = order['current_phase_index']
+    def attempt():
+        # Duas aprovações simultâneas leem a mesma fase; só a primeira grava.
+        result = run_transition(conn, order_id, 'approve_phase', expected_version, client_id=user_id)
+        conn.commit()
 
-    if not phases or current_phase_index >= len(phases):
-        cursor.close()
-        conn.close()
-        return jsonify({'success': False, 'message': 'Erro ao processar fases do pedido.'}), 400
+        emit_commission_update(
+            order_id, user_id, changes=result['changes'], events=result['events'],
+            message_for_admin=f"{username} aprovou a fase '{result['context']['phase']}' do pedido #{order_id}."
+        )
 
-    current_phase_name = phases[current_phase_index]['name']
-    next_phase_index = current_phase_index + 1
-    
-    add_event_to_log(conn, order_id, "Cliente", f"Aprovou a fase '{current_phase_name}'.")
-    
-    if next_phase_index >= len(phases):
-        query_update = f'UPDATE comissoes SET status = {placeholder}, current_phase_index = {placeholder} WHERE id = {placeholder}'
-        cursor.execute(query_update, ('completed', next_phase_index, order_id))
-        add_event_to_log(conn, order_id, "Sistema", "Todas as fases foram aprovadas. Pedido finalizado.")
-    else:
-        next_phase_name = phases[next_phase_index]['name']
-        query_update = f'UPDATE comissoes SET status = {placeholder}, current_phase_index = {placeholder}, revisions_used = 0 WHERE id = {placeholder}'
-        cursor.execute(query_update, ('in_progress', next_phase_index, order_id))
-        add_event_to_log(conn, order_id, "Sistema", f"Projeto avançou para a fase '{next_phase_name}'.")
-    
-    conn.commit()
-    
-    cursor.close()
-    conn.close()
-    
-    return jsonify({'success': True, 'message': 'Fase aprovada com sucesso.'})
+        response = jsonify({'success': True, 'message': 'Fase aprovada com sucesso.', 'version': result['version']})
+        response.headers['ETag'] = etag(result['version'])
+        return response
+
+    try:
+        return retry_on_conflict(conn, attempt, retry=expected_version is None)
+    except VersionConflict as e:
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
+    except TransitionError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    finally:
+        conn.close()
 
 
 @client_bp.route('/api/client/orders/<string:order_id>/payment_confirmed_by_client', methods=['POST'])
@@ -416,31 +440,32 @@ def approve_phase(order_id):
 def client_confirm_payment(order_id):
     user_id = session.get('user_id')
     username = session.get('username')
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
-    cursor = conn.cursor()
-    is_postgres = hasattr(conn, 'cursor_factory')
-    placeholder = '%s' if is_postgres else '?'
 
-    query_select = f'SELECT * FROM comissoes WHERE id = {placeholder} AND client_id = {placeholder}'
-    cursor.execute(query_select, (order_id, user_id))
-    if not cursor.fetchone():
-        cursor.close()
-        conn.close()
-        return jsonify({'success': False, 'message': 'Pedido não encontrado.'}), 404
+    def attempt():
+        result = run_transition(conn, order_id, 'report_payment', expected_version, client_id=user_id)
+        notifications = notify(conn, [admin_notification(f"O cliente {username} confirmou o pagamento para o pedido #{order_id}. Por favor, verifique.", order_id)])
+        conn.commit()
 
-    query_update = f"UPDATE comissoes SET payment_status = 'awaiting_confirmation' WHERE id = {placeholder}"
-    cursor.execute(query_update, (order_id,))
-    add_event_to_log(conn, order_id, "Cliente", "Confirmou que efetuou o pagamento.")
-    conn.commit()
-    
-    socketio.emit('commission_updated', {'commission_id': order_id, 'message_for_admin': f"{username} confirmou o pagamento do pedido #{order_id}. Por favor, verifique."})
-    
-    cursor.close()
-    conn.close()
-    
-    add_notification(f"O cliente {username} confirmou o pagamento para o pedido #{order_id}. Por favor, verifique.", order_id)
-    
-    return jsonify({'success': True, 'message': 'Confirmação de pagamento enviada ao artista.'})
+        emit_commission_update(
+            order_id, user_id, changes=result['changes'], events=result['events'], notifications=notifications,
+            message_for_admin=f"{username} confirmou o pagamento do pedido #{order_id}. Por favor, verifique."
+        )
+
+        response = jsonify({'success': True, 'message': 'Confirmação de pagamento enviada ao artista.', 'version': result['version']})
+        response.headers['ETag'] = etag(result['version'])
+        return response
+
+    try:
+        return retry_on_conflict(conn, attempt, retry=expected_version is None)
+    except VersionConflict as e:
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
+    except TransitionError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), e.status
+    finally:
+        conn.close()
 
 
 @client_bp.route('/api/client/orders/<string:order_id>/cancel', methods=['POST'])
@@ -448,39 +473,37 @@ def client_confirm_payment(order_id):
 def cancel_order(order_id):
     user_id = session.get('user_id')
     username = session.get('username')
+    expected_version = parse_if_match(request.headers.get('If-Match'))
     conn = get_db_connection()
-    cursor = conn.cursor()
-    is_postgres = hasattr(conn, 'cursor_factory')
-    placeholder = '%s' if is_postgres else '?'
-    
-    try:
-        query_select = f'SELECT status FROM comissoes WHERE id = {placeholder} AND client_id = {placeholder}'
-        cursor.execute(query_select, (order_id, user_id))
-        order = cursor.fetchone()
-        
-        if not order:
-            return jsonify({'success': False, 'message': 'Pedido não encontrado ou acesso negado.'}), 404
-
-        if order['status'] in ['completed', 'cancelled']:
-            return jsonify({'success': False, 'message': f'Este pedido já está com o status "{order["status"]}" e não pode ser cancelado.'}), 400
 
-        query_update = f"UPDATE comissoes SET status = 'cancelled' WHERE id = {placeholder}"
-        cursor.execute(query_update, (order_id,))
-        add_event_to_log(conn, order_id, "Cliente", "Pedido cancelado pelo cliente.")
+    def attempt():
+        # Se o artista concluiu o pedido enquanto isso, a nova leitura recusa o cancelamento.
+        result = run_transition(conn, order_id, 'cancel', expected_version, client_id=user_id)
+        notifications = notify(conn, [admin_notification(f"O cliente {username} cancelou o pedido #{order_id}.", order_id)])
         conn.commit()
-        
-        socketio.emit('commission_updated', {'commission_id': order_id, 'message_for_admin': f"O cliente {username} cancelou o pedido #{order_id}."})
-        add_notification(f"O cliente {username} cancelou o pedido #{order_id}.", order_id)
-    
-        return jsonify({'success': True, 'message': 'Pedido cancelado com sucesso.'})
 
+        emit_commission_update(
+            order_id, user_id, changes=result['changes'], events=result['events'], notifications=notifications,
+            message_for_admin=f"O cliente {username} cancelou o pedido #{order_id}."
+        )
+
+        response = jsonify({'success': True, 'message': 'Pedido cancelado com sucesso.', 'version': result['version']})
+        response.headers['ETag'] = etag(result['version'])
+        return response
+
+    try:
+        return retry_on_conflict(conn, attempt, retry=expected_version is None)
+    except VersionConflict as e:
+        return jsonify({'success': False, 'message': str(e), 'version': e.current_version}), e.status
+    except TransitionError as e:
+        conn.rollback()
+        return jsonify({'success': False, 'message': str(e)}), e.status
     except Exception as e:
+        conn.rollback()
         print(f"Erro de banco de dados ao cancelar pedido: {e}")
         return jsonify({'success': False, 'message': 'Erro no servidor ao tentar cancelar o pedido.'}), 500
     finally:
-        if conn:
-            cursor.close()
-            conn.close()
+        conn.close()
 
 # --- Rotas de API para Notificações do Cliente ---
 
@@ -558,3 +581,4 @@ def mark_commission_notifications_as_read(commission_id):
         conn.close()
 
 from . import api_account_routes
+from . import api_upload_routes
@@ -0,0 +1,232 @@
+# Arquivo: app/commission_changes.py
+
+import os
+import random
+import time
+from datetime import datetime
+from .cache import bump_version
+
+# Sequência de alterações dos pedidos, para a sincronização incremental
+# ("o que mudou desde o cursor X"). Toda rota que altera um pedido chama
+# touch_commission() na própria transação: o pedido recebe o próximo valor de
+# um contador global em 'change_sequences' e a exclusão deixa uma lápide em
+# 'commission_tombstones'. As mesmas funções incrementam a versão de cache
+# 'commissions', que invalida os resumos calculados sobre os pedidos.
+#
+# O contador é uma linha atualizada com UPDATE, não uma SEQUENCE do PostgreSQL:
+# a trava da linha só é liberada no commit, então os valores são confirmados
+# na mesma ordem em que são distribuídos. Assim, quem leu o cursor N já vê
+# todas as alterações <= N e nenhuma fica para trás entre duas sincronizações.
+# (No SQLite as escritas já são serializadas pelo banco.)
+#
+# Concorrência otimista: cada pedido tem uma coluna 'version', incrementada
+# por touch_commission(). Quem decide a escrita com base no que leu (limite de
+# revisões, fase atual, status) passa a versão lida como 'expected_version';
+# se outra escrita chegou antes, o UPDATE não encontra a linha, a transação é
+# desfeita e a operação é refeita sobre os dados novos (retry_on_conflict) ou
+# devolvida ao navegador como 412, quando ele enviou 'If-Match'. Nenhuma linha
+# fica travada entre a leitura e a escrita.
+
+SEQUENCE_NAME = 'comissoes'
+CONFLICT_ATTEMPTS = int(os.environ.get('COMMISSION_CONFLICT_ATTEMPTS', 3))
+CONFLICT_BACKOFF = 0.02
+
+
+class VersionConflict(Exception):
+    """O pedido foi alterado depois de lido; 'status' é o código HTTP da resposta."""
+
+    def __init__(self, commission_id, current_version=None):
+        super().__init__('Este pedido foi alterado por outra pessoa. Atualize a página e tente de novo.')
+        self.commission_id = commission_id
+        self.current_version = current_version
+        self.status = 412
+
+
+def _placeholder(conn):
+    return '%s' if hasattr(conn, 'cursor_factory') else '?'
+
+
+def next_change_seq(conn):
+    """Reserva o próximo valor da sequência, na transação do chamador."""
+    placeholder = _placeholder(conn)
+    cursor = conn.cursor()
+    cursor.execute(
+        f'INSERT INTO change_sequences (name, value) VALUES ({placeholder}, 1) ON CONFLICT (name) DO UPDATE SET value = change_sequences.value + 1',
+        (SEQUENCE_NAME,)
+    )
+    cursor.execute(f'SELECT value FROM change_sequences WHERE name = {placeholder}', (SEQUENCE_NAME,))
+    value = cursor.fetchone()['value']
+    cursor.close()
+    return value
+
+
+def current_change_seq(conn):
+    """Último valor confirmado; é o cursor devolvido às listagens."""
+    placeholder = _placeholder(conn)
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT value FROM change_sequences WHERE name = {placeholder}', (SEQUENCE_NAME,))
+    row = cursor.fetchone()
+    cursor.close()
+    return row['value'] if row else 0
+
+
+def current_version(conn, commission_id):
+    placeholder = _placeholder(conn)
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT version FROM comissoes WHERE id = {placeholder}', (commission_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    return row['version'] if row else None
+
+
+def touch_commission(conn, commission_id, expected_version=None):
+    """
+    Marca o pedido como alterado e incrementa a sua versão. Deve ser chamada
+    antes do commit de toda escrita no pedido ou no seu histórico.
+    Com 'expected_version', só grava se o pedido ainda estiver nessa versão;
+    caso contrário levanta VersionConflict e o chamador desfaz a transação.
+    Retorna a nova versão.
+    """
+    placeholder = _placeholder(conn)
+    seq = next_change_seq(conn)
+    query = f'UPDATE comissoes SET change_seq = {placeholder}, version = version + 1 WHERE id = {placeholder}'
+    params = (seq, commission_id)
+    if expected_version is not None:
+        query += f' AND version = {placeholder}'
+        params += (expected_version,)
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    updated = cursor.rowcount == 1
+    cursor.close()
+    version = current_version(conn, commission_id)
+    if not updated and expected_version is not None:
+        raise VersionConflict(commission_id, version)
+    bump_version(conn, 'commissions')
+    return version
+
+
+def write_commission(conn, commission_id, expected_version, changes):
+    """
+    Grava 'changes' (coluna -> valor; as colunas vêm sempre do código, nunca
+    da requisição), marca o pedido como alterado e incrementa a versão em um
+    único UPDATE com compare-and-swap; usado pelas transições de status
+    (commission_states). VersionConflict se o pedido não estiver mais em
+    'expected_version'. Retorna a nova versão.
+    """
+    placeholder = _placeholder(conn)
+    cursor = conn.cursor()
+    cursor.execute(
+        f'INSERT INTO change_sequences (name, value) VALUES ({placeholder}, 1) ON CONFLICT (name) DO UPDATE SET value = change_sequences.value + 1',
+        (SEQUENCE_NAME,)
+    )
+    assignments = ''.join(f'{column} = {placeholder}, ' for column in changes)
+    cursor.execute(
+        f'UPDATE comissoes SET {assignments}change_seq = (SELECT value FROM change_sequences WHERE name = {placeholder}), version = version + 1 '
+        f'WHERE id = {placeholder} AND version = {placeholder}',
+        (*changes.values(), SEQUENCE_NAME, commission_id, expected_version)
+    )
+    updated = cursor.rowcount == 1
+    cursor.close()
+    if not updated:
+        raise VersionConflict(commission_id)
+    bump_version(conn, 'commissions')
+    return expected_version + 1
+
+
+def check_version(commission_id, version, expected_version):
+    """Falha cedo, antes de qualquer escrita, quando a versão lida já não é a esperada."""
+    if expected_version is not None and version != expected_version:
+        raise VersionConflict(commission_id, version)
+
+
+def retry_on_conflict(conn, operation, retry=True):
+    """
+    Executa 'operation()' (leitura, escrita e commit) e a refaz, com os dados
+    novos, quando outra escrita no mesmo pedido chega antes (VersionConflict),
+    até CONFLICT_ATTEMPTS vezes. Com 'retry=False' (o navegador enviou
+    'If-Match'), o conflito é devolvido na primeira vez.
+    """
+    attempts = CONFLICT_ATTEMPTS if retry else 1
+    for attempt in range(1, attempts + 1):
+        try:
+            return operation()
+        except VersionConflict as e:
+            conn.rollback()
+            if attempt == attempts:
+                raise
+            print(f"Conflito de versão no pedido #{e.commission_id}; nova tentativa ({attempt + 1}/{attempts}).")
+            time.sleep(random.uniform(0, CONFLICT_BACKOFF * attempt))
+
+
+def parse_if_match(value):
+    """
+    Versão esperada a partir do cabeçalho 'If-Match' ('"3"', 'W/"3"' ou '3').
+    None sem cabeçalho ou com '*'. Um valor que não é uma versão nunca confere
+    com o pedido, então vira 0 e a escrita responde 412, como manda o HTTP.
+    """
+    if not value or value.strip() == '*':
+        return None
+    value = value.strip()
+    if value.startswith('W/'):
+        value = value[2:]
+    try:
+        return max(int(value.strip('"')), 0)
+    except ValueError:
+        return 0
+
+
+def etag(version):
+    return f'"{version}"'
+
+
+def record_deletion(conn, commission_id, client_id):
+    """Registra a exclusão do pedido, para que as abas conectadas o removam na próxima sincronização."""
+    placeholder = _placeholder(conn)
+    seq = next_change_seq(conn)
+    cursor = conn.cursor()
+    cursor.execute(f'DELETE FROM commission_tombstones WHERE commission_id = {placeholder}', (commission_id,))
+    cursor.execute(
+        f'INSERT INTO commission_tombstones (commission_id, client_id, change_seq, deleted_at) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})',
+        (commission_id, client_id, seq, datetime.now().isoformat())
+    )
+    cursor.close()
+    bump_version(conn, 'commissions')
+    return seq
+
+
+def parse_since(value):
+    """Converte o parâmetro '?since=' em inteiro; ValueError se for inválido."""
+    since = int(value)
+    if since < 0:
+        raise ValueError('cursor negativo')
+    return since
+
+
+def changes_since(conn, since, client_id=None, columns='*'):
+    """
+    Pedidos alterados e excluídos depois do cursor 'since'.
+    Com 'client_id', considera apenas os pedidos desse cliente.
+    Retorna (linhas, ids_excluidos, novo_cursor).
+    """
+    placeholder = _placeholder(conn)
+    # O cursor é lido antes das alterações: o que for confirmado entre as duas
+    # leituras volta de novo na próxima sincronização, mas nunca se perde.
+    cursor_value = current_change_seq(conn)
+
+    scope, params = '', (since, cursor_value)
+    if client_id is not None:
+        scope, params = f' AND client_id = {placeholder}', params + (client_id,)
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f'SELECT {columns} FROM comissoes WHERE change_seq > {placeholder} AND change_seq <= {placeholder}{scope} ORDER BY change_seq',
+        params
+    )
+    rows = cursor.fetchall()
+    cursor.execute(
+        f'SELECT commission_id FROM commission_tombstones WHERE change_seq > {placeholder} AND change_seq <= {placeholder}{scope} ORDER BY change_seq',
+        params
+    )
+    deleted = [row['commission_id'] for row in cursor.fetchall()]
+    cursor.close()
+    return rows, deleted, cursor_value
@@ -0,0 +1,113 @@
+# Arquivo: app/commission_history.py
+
+import json
+from datetime import datetime
+from .search import index_document
+
+# Colunas de 'comissoes' que continuam guardando JSON.
+JSON_COLUMNS = ('reference_files', 'phases', 'assigned_artist_ids')
+
+# Limite de IDs por consulta 'IN (...)' ao carregar o histórico em lote.
+_BATCH_SIZE = 500
+
+
+def _placeholder(conn):
+    return '%s' if hasattr(conn, 'cursor_factory') else '?'
+
+
+def commission_to_dict(row):
+    """Converte uma linha de 'comissoes' em dicionário, decodificando as colunas JSON."""
+    commission = dict(row)
+    for key in JSON_COLUMNS:
+        if key in commission:
+            commission[key] = json.loads(commission[key]) if (commission[key] and commission[key] != '[]') else []
+    return commission
+
+
+def add_comment(conn, commission_id, author, is_artist, text, is_revision_request=False, phase_name=None):
+    """Insere um comentário no pedido e o retorna no formato usado pela API."""
+    placeholder = _placeholder(conn)
+    comment = {"author": author, "is_artist": is_artist, "date": datetime.now().isoformat(), "text": text}
+    if is_revision_request:
+        comment.update({"is_revision_request": True, "phase_name": phase_name})
+
+    is_postgres = hasattr(conn, 'cursor_factory')
+    cursor = conn.cursor()
+    cursor.execute(
+        f'INSERT INTO commission_comments (commission_id, author, is_artist, date, text, is_revision_request, phase_name) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})' + (' RETURNING id' if is_postgres else ''),
+        (commission_id, author, 1 if is_artist else 0, comment['date'], text, 1 if is_revision_request else 0, phase_name)
+    )
+    comment_id = cursor.fetchone()['id'] if is_postgres else cursor.lastrowid
+    cursor.close()
+    index_document(conn, 'comment', comment_id, author, text, commission_id, comment['date'])
+    return comment
+
+
+def add_preview(conn, commission_id, url, comment=''):
+    """
+    Insere uma nova prévia no pedido.
+    Retorna a prévia no formato da API e o seu índice na lista de prévias.
+    """
+    placeholder = _placeholder(conn)
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT COUNT(*) AS total FROM commission_previews WHERE commission_id = {placeholder}', (commission_id,))
+    index = cursor.fetchone()['total']
+
+    preview = {"version": f"{index + 1}.0", "date": datetime.now().isoformat(), "url": url, "comment": comment}
+    cursor.execute(
+        f'INSERT INTO commission_previews (commission_id, version, date, url, comment) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})',
+        (commission_id, preview['version'], preview['date'], url, comment)
+    )
+    cursor.close()
+    return preview, index
+
+
+def delete_history(conn, commission_id):
+    placeholder = _placeholder(conn)
+    cursor = conn.cursor()
+    # Os arquivos de referência saem do disco no 'purge-uploads' do manage_db.py.
+    for table in ('commission_events', 'commission_comments', 'commission_previews', 'commission_files', 'uploads'):
+        cursor.execute(f'DELETE FROM {table} WHERE commission_id = {placeholder}', (commission_id,))
+    cursor.close()
+
+
+def load_history(conn, commission_ids):
+    """
+    Carrega eventos, comentários e prévias de vários pedidos com uma consulta
+    por tabela (em lotes), em vez de uma consulta por pedido.
+    """
+    history = {cid: {'event_log': [], 'comments': [], 'preview': []} for cid in commission_ids}
+    if not history:
+        return history
+
+    placeholder = _placeholder(conn)
+    ids = list(history.keys())
+    cursor = conn.cursor()
+    for start in range(0, len(ids), _BATCH_SIZE):
+        batch = tuple(ids[start:start + _BATCH_SIZE])
+        in_clause = ','.join([placeholder] * len(batch))
+
+        cursor.execute(f'SELECT commission_id, timestamp, actor, message FROM commission_events WHERE commission_id IN ({in_clause}) ORDER BY id', batch)
+        for row in cursor.fetchall():
+            history[row['commission_id']]['event_log'].append({"timestamp": row['timestamp'], "actor": row['actor'], "message": row['message']})
+
+        cursor.execute(f'SELECT commission_id, author, is_artist, date, text, is_revision_request, phase_name FROM commission_comments WHERE commission_id IN ({in_clause}) ORDER BY id', batch)
+        for row in cursor.fetchall():
+            comment = {"author": row['author'], "is_artist": bool(row['is_artist']), "date": row['date'], "text": row['text']}
+            if row['is_revision_request']:
+                comment.update({"is_revision_request": True, "phase_name": row['phase_name']})
+            history[row['commission_id']]['comments'].append(comment)
+
+        cursor.execute(f'SELECT commission_id, version, date, url, comment FROM commission_previews WHERE commission_id IN ({in_clause}) ORDER BY id', batch)
+        for row in cursor.fetchall():
+            history[row['commission_id']]['preview'].append({"version": row['version'], "date": row['date'], "url": row['url'], "comment": row['comment']})
+    cursor.close()
+    return history
+
+
+def attach_history(conn, commissions):
+    """Preenche 'event_log', 'comments' e 'preview' dos pedidos (dicionários), mantendo o formato antigo da API."""
+    history = load_history(conn, [c['id'] for c in commissions])
+    for commission in commissions:
+        commission.update(history[commission['id']])
+    return commissions
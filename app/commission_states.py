@@ -0,0 +1,176 @@
+# Arquivo: app/commission_states.py
+
+import json
+from .commission_changes import write_commission, check_version
+from .revenue import snapshot_from_row, update_revenue
+from .utils import add_events_to_log, translate_status
+
+# Máquina de estados dos pedidos. Cada ação (confirmar pagamento, enviar
+# prévia, aprovar fase...) é descrita em TRANSITIONS: de quais status ela
+# parte, para qual status leva, quais colunas grava, quais condições precisa
+# cumprir e quais eventos registra. run_transition() aplica qualquer uma delas
+# com o mesmo roteiro:
+#   1. um SELECT do pedido (que também serve de base para a receita);
+#   2. validação do status de origem e das condições, sem escrever nada;
+#   3. um UPDATE com status, fase, revisões, sequência de alterações e versão
+#      (compare-and-swap, ver commission_changes.write_commission);
+#   4. um INSERT com todos os eventos da transição (e um no índice de busca).
+# As rotas só acrescentam o que é próprio delas (comentário, prévia,
+# notificações) e enviam um único 'commission_updated' com o resultado.
+
+STATES = ('pending_payment', 'in_progress', 'waiting_approval', 'revisions', 'completed', 'cancelled')
+OPEN_STATES = ('pending_payment', 'in_progress', 'waiting_approval', 'revisions')
+
+
+class TransitionError(Exception):
+    """A ação não vale para o estado atual do pedido; 'status' é o código HTTP da resposta."""
+
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.status = status
+
+
+def _require_phase(order, phases, params, context):
+    if not phases or order['current_phase_index'] >= len(phases):
+        raise TransitionError('Erro ao processar fases do pedido.', 400)
+
+
+def _require_revisions_left(order, phases, params, context):
+    if order['revisions_used'] >= phases[order['current_phase_index']]['revisions_limit']:
+        raise TransitionError('Limite de revisões para esta fase atingido.', 403)
+
+
+def _require_known_status(order, phases, params, context):
+    if params.get('status') not in STATES:
+        raise TransitionError(f"Status inválido: {params.get('status')}", 400)
+
+
+def _count_revision(order, phases, params, changes, context):
+    changes['revisions_used'] = order['revisions_used'] + 1
+
+
+def _advance_phase(order, phases, params, changes, context):
+    next_index = order['current_phase_index'] + 1
+    changes['current_phase_index'] = next_index
+    if next_index >= len(phases):
+        changes['status'] = 'completed'
+        context['outcome'] = 'Todas as fases foram aprovadas. Pedido finalizado.'
+    else:
+        changes['status'] = 'in_progress'
+        changes['revisions_used'] = 0
+        context['outcome'] = f"Projeto avançou para a fase '{phases[next_index]['name']}'."
+
+
+def _set_status(order, phases, params, changes, context):
+    changes['status'] = params['status']
+    context['status_label'] = translate_status(params['status'])
+
+
+def _show_preview(order, phases, params, changes, context):
+    changes['current_preview'] = params['preview_index']
+
+
+# from: status de origem aceitos; to: status de destino; set: colunas fixas;
+# guards: condições (levantam TransitionError); apply: colunas calculadas;
+# events: (ator, mensagem) com campos de 'context' ({phase}, {outcome}...);
+# blocked: mensagem quando o status de origem não é aceito.
+TRANSITIONS = {
+    'report_payment': {
+        'from': ('pending_payment',),
+        'set': {'payment_status': 'awaiting_confirmation'},
+        'events': [('Cliente', 'Confirmou que efetuou o pagamento.')],
+        'blocked': 'O pagamento só pode ser informado enquanto o pedido aguarda pagamento.',
+    },
+    'confirm_payment': {
+        'from': ('pending_payment',),
+        'to': 'in_progress',
+        'set': {'payment_status': 'paid'},
+        'events': [('Artista', 'Pagamento confirmado.'), ('Sistema', "Status do pedido alterado para 'Em Progresso'.")],
+        'blocked': 'O pagamento deste pedido já foi confirmado.',
+    },
+    'submit_preview': {
+        'from': ('in_progress', 'waiting_approval', 'revisions'),
+        'to': 'waiting_approval',
+        'guards': (_require_phase,),
+        'apply': _show_preview,
+        'events': [('Artista', "Enviou uma prévia para a fase '{phase}'.")],
+        'blocked': 'Só é possível enviar prévias de um pedido em andamento.',
+    },
+    'request_revision': {
+        'from': ('waiting_approval',),
+        'to': 'revisions',
+        'guards': (_require_phase, _require_revisions_left),
+        'apply': _count_revision,
+        'events': [('Cliente', "Solicitou uma revisão para a fase '{phase}'.")],
+        'blocked': 'Não há prévia aguardando a sua aprovação neste pedido.',
+    },
+    'approve_phase': {
+        'from': ('waiting_approval',),
+        'guards': (_require_phase,),
+        'apply': _advance_phase,
+        'events': [('Cliente', "Aprovou a fase '{phase}'."), ('Sistema', '{outcome}')],
+        'blocked': 'Não há prévia aguardando a sua aprovação neste pedido.',
+    },
+    'cancel': {
+        'from': OPEN_STATES,
+        'to': 'cancelled',
+        'events': [('Cliente', 'Pedido cancelado pelo cliente.')],
+        'blocked': 'Este pedido já está com o status "{status}" e não pode ser cancelado.',
+    },
+    'set_status': {
+        'from': STATES,
+        'guards': (_require_known_status,),
+        'apply': _set_status,
+        'events': [('Artista', "Alterou o status para '{status_label}'.")],
+    },
+}
+
+
+def run_transition(conn, commission_id, action, expected_version=None, client_id=None, **params):
+    """
+    Valida e aplica a ação 'action' ao pedido, na transação do chamador (o
+    commit fica com a rota). Com 'client_id', só encontra pedidos desse
+    cliente. 'expected_version' é a versão enviada em 'If-Match', se houver.
+    Levanta TransitionError (ação inválida) ou VersionConflict (o pedido
+    mudou). Retorna {'order', 'changes', 'events', 'version', 'context'};
+    'changes' já inclui a nova versão, pronto para o evento em tempo real.
+    """
+    rule = TRANSITIONS[action]
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+
+    query = f'SELECT * FROM comissoes WHERE id = {placeholder}'
+    query_params = (commission_id,)
+    if client_id is not None:
+        query += f' AND client_id = {placeholder}'
+        query_params += (client_id,)
+    cursor = conn.cursor()
+    cursor.execute(query, query_params)
+    order = cursor.fetchone()
+    cursor.close()
+    if not order:
+        raise TransitionError('Pedido não encontrado.', 404)
+    check_version(commission_id, order['version'], expected_version)
+
+    if order['status'] not in rule['from']:
+        blocked = rule.get('blocked', 'Esta ação não está disponível para o status atual do pedido.')
+        raise TransitionError(blocked.format(status=order['status']))
+
+    phases = json.loads(order['phases']) if order['phases'] else []
+    current_index = order['current_phase_index']
+    context = {'phase': phases[current_index]['name'] if 0 <= current_index < len(phases) else ''}
+    for guard in rule.get('guards', ()):
+        guard(order, phases, params, context)
+
+    changes = dict(rule.get('set', {}))
+    if 'to' in rule:
+        changes['status'] = rule['to']
+    if 'apply' in rule:
+        rule['apply'](order, phases, params, changes, context)
+
+    version = write_commission(conn, commission_id, order['version'], changes)
+    update_revenue(conn, snapshot_from_row(order), **changes)
+    events = add_events_to_log(conn, commission_id, [(actor, message.format(**context)) for actor, message in rule['events']])
+
+    changes['version'] = version
+    return {'order': order, 'changes': changes, 'events': events, 'version': version, 'context': context}
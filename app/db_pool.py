@@ -0,0 +1,380 @@
+# Arquivo: app/db_pool.py
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from psycopg2.extras import DictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from flask import g, has_app_context
+from .blocking import run_blocking, eventlet_active
+from .metrics import DB_CONNECTIONS_IN_USE, DB_POOL_WAIT
+from .query_stats import instrument_cursor
+
+SQLITE_DATABASE = 'database.db'
+
+
+class PoolTimeout(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo limite configurado."""
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class _BasePool:
+    """
+    Controla quantas conexões estão emprestadas e mede as esperas.
+    'pool_size' conexões ficam abertas e ociosas entre requisições; até
+    'max_overflow' conexões extras podem ser abertas em picos e são fechadas
+    ao serem devolvidas.
+    """
+    backend = None
+
+    def __init__(self, pool_size, max_overflow, timeout):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        # Sob o eventlet (monkey_patch) a Condition vira cooperativa entre green threads.
+        self._cond = threading.Condition()
+        self._checked_out = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    @property
+    def max_connections(self):
+        return self.pool_size + self.max_overflow
+
+    def acquire(self):
+        wait_started = None
+        with self._cond:
+            while self._checked_out >= self.max_connections:
+                if wait_started is None:
+                    wait_started = time.monotonic()
+                    self._waits += 1
+                remaining = self.timeout - (time.monotonic() - wait_started)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"Nenhuma conexão livre após {self.timeout}s (máximo: {self.max_connections}).")
+                self._cond.wait(remaining)
+
+            self._checked_out += 1
+            self._checkouts += 1
+            waited = 0.0
+            if wait_started is not None:
+                waited = time.monotonic() - wait_started
+                self._wait_time_total += waited
+                self._wait_time_max = max(self._wait_time_max, waited)
+        DB_POOL_WAIT.observe(waited)
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._checked_out -= 1
+                self._cond.notify()
+            raise
+        DB_CONNECTIONS_IN_USE.inc()
+        return conn
+
+    def release(self, conn, discard=False):
+        try:
+            self._return(conn, discard)
+        except Exception as e:
+            print(f"Aviso: falha ao devolver conexão ao pool: {e}")
+        finally:
+            DB_CONNECTIONS_IN_USE.dec()
+            with self._cond:
+                self._checked_out -= 1
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'backend': self.backend,
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'timeout': self.timeout,
+                'checked_out': self._checked_out,
+                'idle': self._idle_count(),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'wait_time_total': round(self._wait_time_total, 6),
+                'wait_time_max': round(self._wait_time_max, 6),
+            }
+
+    def _connect(self):
+        raise NotImplementedError
+
+    def _return(self, conn, discard):
+        raise NotImplementedError
+
+    def _idle_count(self):
+        raise NotImplementedError
+
+
+class PostgresPool(_BasePool):
+    """Pool sobre o ThreadedConnectionPool do psycopg2 (seguro para green threads)."""
+    backend = 'postgres'
+
+    def __init__(self, database_url, pool_size, max_overflow, timeout):
+        super().__init__(pool_size, max_overflow, timeout)
+        # minconn define quantas conexões ociosas o psycopg2 mantém; acima disso ele fecha na devolução.
+        self._pool = ThreadedConnectionPool(pool_size, pool_size + max_overflow, database_url, cursor_factory=DictCursor)
+
+    def _connect(self):
+        return self._pool.getconn()
+
+    def _return(self, conn, discard):
+        self._pool.putconn(conn, close=discard or conn.closed)
+
+    def _idle_count(self):
+        return len(self._pool._pool)
+
+
+def _sqlite_offload_enabled():
+    """
+    SQLITE_OFFLOAD: 'auto' (padrão) liga a execução no tpool quando o eventlet
+    está ativo; 'on' e 'off' forçam o modo.
+    """
+    mode = os.environ.get('SQLITE_OFFLOAD', 'auto').lower()
+    if mode in ('on', '1', 'true'):
+        return True
+    if mode in ('off', '0', 'false'):
+        return False
+    return eventlet_active()
+
+
+class _OffloadedCursor:
+    """
+    Cursor do sqlite3 cujas chamadas ao banco rodam no tpool do eventlet. O
+    módulo sqlite3 é C puro e o monkey_patch não o torna cooperativo: sem isso,
+    cada consulta trava todas as green threads do worker enquanto executa.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        # rowcount, lastrowid, description, close...
+        return getattr(self._cursor, name)
+
+    def execute(self, *args):
+        run_blocking(self._cursor.execute, *args)
+        return self
+
+    def executemany(self, *args):
+        run_blocking(self._cursor.executemany, *args)
+        return self
+
+    def fetchone(self):
+        return run_blocking(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return run_blocking(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return run_blocking(self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+
+class _OffloadedConnection:
+    """Conexão sqlite3 que entrega cursores, commits e rollbacks ao tpool."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self):
+        return _OffloadedCursor(self._conn.cursor())
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def commit(self):
+        run_blocking(self._conn.commit)
+
+    def rollback(self):
+        run_blocking(self._conn.rollback)
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLitePool(_BasePool):
+    """
+    Reaproveita as conexões SQLite do worker em vez de abrir o arquivo a cada chamada.
+    Cada conexão nova recebe os PRAGMAs de desempenho configurados por ambiente
+    (SQLITE_JOURNAL_MODE, SQLITE_BUSY_TIMEOUT em ms, SQLITE_MMAP_SIZE em bytes,
+    SQLITE_SYNCHRONOUS). Em WAL, leitores não bloqueiam o escritor e vice-versa.
+    """
+    backend = 'sqlite'
+
+    def __init__(self, database_path, pool_size, max_overflow, timeout):
+        super().__init__(pool_size, max_overflow, timeout)
+        self.database_path = database_path
+        self._idle = deque()
+        self.offload = _sqlite_offload_enabled()
+        self.journal_mode = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper()
+        self.busy_timeout = max(_env_int('SQLITE_BUSY_TIMEOUT', 5000), 0)
+        self.mmap_size = max(_env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024), 0)
+        self.synchronous = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL' if self.journal_mode == 'WAL' else 'FULL').upper()
+
+    def _open(self):
+        conn = sqlite3.connect(self.database_path, check_same_thread=False, timeout=self.busy_timeout / 1000)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        conn.execute(f'PRAGMA busy_timeout = {self.busy_timeout}')
+        conn.execute(f'PRAGMA mmap_size = {self.mmap_size}')
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        return conn
+
+    def _connect(self):
+        try:
+            return self._idle.pop()
+        except IndexError:
+            conn = run_blocking(self._open) if self.offload else self._open()
+            return _OffloadedConnection(conn) if self.offload else conn
+
+    def _return(self, conn, discard):
+        if not discard:
+            try:
+                # Descarta qualquer transação deixada aberta pela rota.
+                conn.rollback()
+            except sqlite3.Error:
+                discard = True
+        if discard or len(self._idle) >= self.pool_size:
+            conn.close()
+        else:
+            self._idle.append(conn)
+
+    def _idle_count(self):
+        return len(self._idle)
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({
+            'offload': self.offload,
+            'journal_mode': self.journal_mode,
+            'busy_timeout': self.busy_timeout,
+            'mmap_size': self.mmap_size,
+            'synchronous': self.synchronous,
+        })
+        return stats
+
+
+class PooledConnection:
+    """
+    Envelope da conexão emprestada. Repassa tudo para a conexão real, mas
+    'close()' devolve a conexão ao pool. Quando a conexão pertence à requisição
+    atual, 'close()' não faz nada e a devolução acontece no teardown do Flask.
+    Os cursores saem instrumentados (ver query_stats).
+    """
+
+    def __init__(self, pool, conn, request_scoped=False):
+        self._pool = pool
+        self._conn = conn
+        self._request_scoped = request_scoped
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return instrument_cursor(self._conn.cursor(*args, **kwargs))
+
+    def close(self):
+        if not self._request_scoped:
+            self.release()
+
+    def release(self, discard=False):
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._pool.release(conn, discard)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Retorna o pool do processo atual, criando-o na primeira chamada. Após um
+    fork (gunicorn --preload) o pool herdado do processo pai é ignorado, pois
+    suas conexões não podem ser compartilhadas entre processos.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            pool_size = max(_env_int('DB_POOL_SIZE', 5), 1)
+            max_overflow = max(_env_int('DB_POOL_MAX_OVERFLOW', 10), 0)
+            timeout = _env_float('DB_POOL_TIMEOUT', 30)
+
+            database_url = os.environ.get('DATABASE_URL')
+            if database_url:
+                _pool = PostgresPool(database_url, pool_size, max_overflow, timeout)
+            else:
+                _pool = SQLitePool(SQLITE_DATABASE, pool_size, max_overflow, timeout)
+            _pool_pid = pid
+    return _pool
+
+
+def get_connection():
+    """
+    Empresta uma conexão do pool. Dentro de um contexto do Flask, todas as
+    chamadas compartilham a mesma conexão, guardada em 'g'.
+    """
+    pool = get_pool()
+    if not has_app_context():
+        return PooledConnection(pool, pool.acquire())
+
+    conn = g.get('_db_conn')
+    if conn is None or conn._conn is None:
+        conn = PooledConnection(pool, pool.acquire(), request_scoped=True)
+        g._db_conn = conn
+    return conn
+
+
+def get_separate_connection():
+    """
+    Empresta uma conexão própria, fora da transação da requisição atual, para
+    gravações que precisam de commit independente. 'close()' a devolve ao pool.
+    """
+    return PooledConnection(get_pool(), get_pool().acquire())
+
+
+def release_request_connection(exception=None):
+    """Teardown do Flask: devolve ao pool a conexão usada pela requisição."""
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.release()
+
+
+def get_pool_stats():
+    """Estatísticas do pool deste processo, para monitoramento."""
+    stats = get_pool().stats()
+    stats['pid'] = os.getpid()
+    return stats
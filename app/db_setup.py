@@ -5,6 +5,7 @@ import psycopg2
 from psycopg2.extras import DictCursor
 from werkzeug.security import generate_password_hash
 from .utils import get_db_connection
+from .migrations import run_migrations
 
 def initialize_database():
     """Verifica, cria e popula o banco de dados se necessário."""
@@ -24,7 +25,8 @@ def initialize_database():
         table_exists = cursor.fetchone()
 
         if table_exists and table_exists[0]:
-            print("Banco de dados já inicializado. Nenhuma ação necessária.")
+            print("Banco de dados já inicializado. Verificando migrações pendentes...")
+            run_migrations(conn)
             # AS LINHAS problemáticas foram REMOVIDAS daqui.
             # A função agora apenas retorna e deixa o 'finally' limpar.
             return
@@ -169,6 +171,7 @@ def initialize_database():
         print("Configurações padrão inseridas.")
         
         conn.commit()
+        run_migrations(conn)
         print("Banco de dados inicializado e populado com sucesso!")
 
     except Exception as e:
@@ -0,0 +1,138 @@
+# Arquivo: app/http_cache.py
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from email.utils import formatdate
+from flask import current_app, request, session, make_response
+from .cache import get_versions
+from .metrics import count_cache
+
+# Cache das páginas públicas já renderizadas. A chave é a rota mais a versão
+# dos conteúdos que a página exibe (tabela 'cache_versions'); quando uma rota
+# de escrita chama bump_version, a versão muda e a página é renderizada de novo.
+# O ETag também é derivado dessa versão, então um GET condicional é respondido
+# com 304 sem renderizar nem consultar o banco.
+
+# Conteúdos exibidos pelas páginas públicas (o layout usa configurações e plugins).
+PUBLIC_CONTENT = ('settings', 'plugins')
+
+MAX_PAGES = int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', '256'))
+# Tempo (segundos) em que navegadores e proxies podem reutilizar a página sem revalidar.
+MAX_AGE = int(os.environ.get('PAGE_CACHE_MAX_AGE', '0'))
+
+_pages = OrderedDict()
+_lock = threading.Lock()
+_build = None
+_stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'bypassed': 0}
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+    count_cache('page', key)
+
+
+def _template_build():
+    """
+    Identificador dos templates em uso. Entra no ETag para que um deploy com
+    templates novos não seja respondido com 304 pelo conteúdo antigo.
+    """
+    global _build
+    if _build is None:
+        digest = hashlib.sha1()
+        folder = os.path.join(current_app.root_path, current_app.template_folder)
+        for root, _, files in sorted(os.walk(folder)):
+            for name in sorted(files):
+                with open(os.path.join(root, name), 'rb') as f:
+                    digest.update(name.encode())
+                    digest.update(f.read())
+        _build = digest.hexdigest()[:12]
+    return _build
+
+
+def _cacheable_request():
+    # A página muda com o login (menu, avatar, plugins do admin) e com mensagens flash pendentes.
+    return request.method in ('GET', 'HEAD') and not session.get('user_id') and not session.get('_flashes')
+
+
+def _not_modified(entry):
+    if request.if_none_match:
+        return entry['etag'] in request.if_none_match
+    if request.if_modified_since:
+        return int(entry['last_modified']) <= request.if_modified_since.timestamp()
+    return False
+
+
+def _finish(response, entry):
+    response.set_etag(entry['etag'])
+    response.headers['Last-Modified'] = formatdate(entry['last_modified'], usegmt=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = MAX_AGE
+    return response
+
+
+def cached_page(*contents):
+    """
+    Decorator das páginas públicas que dependem apenas dos conteúdos informados
+    (além de PUBLIC_CONTENT). Só atende visitantes anônimos; respostas que não
+    sejam 200 (redirecionamentos, erros) nunca são guardadas.
+    """
+    names = PUBLIC_CONTENT + tuple(contents)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _cacheable_request():
+                _count('bypassed')
+                return view(*args, **kwargs)
+
+            versions = get_versions()
+            tag = '.'.join(str(versions.get(name, 0)) for name in names)
+            key = request.full_path
+            etag = hashlib.sha1(f'{_template_build()}|{key}|{tag}'.encode()).hexdigest()[:20]
+
+            with _lock:
+                entry = _pages.get(key)
+                if entry and entry['etag'] == etag:
+                    _pages.move_to_end(key)
+                else:
+                    entry = None
+
+            if entry is None:
+                _count('misses')
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or session.modified:
+                    return response
+                entry = {
+                    'etag': etag,
+                    'last_modified': time.time(),
+                    'body': response.get_data(),
+                    'mimetype': response.mimetype,
+                }
+                with _lock:
+                    _pages[key] = entry
+                    _pages.move_to_end(key)
+                    while len(_pages) > MAX_PAGES:
+                        _pages.popitem(last=False)
+            else:
+                _count('hits')
+
+            if _not_modified(entry):
+                _count('not_modified')
+                return _finish(current_app.response_class(status=304), entry)
+            return _finish(current_app.response_class(entry['body'], mimetype=entry['mimetype']), entry)
+        return wrapper
+    return decorator
+
+
+def get_page_cache_stats():
+    """Contadores do cache de páginas deste worker."""
+    with _lock:
+        stats = dict(_stats)
+        stats['pages'] = len(_pages)
+    stats.update({'max_pages': MAX_PAGES, 'max_age': MAX_AGE, 'pid': os.getpid()})
+    return stats
@@ -0,0 +1,126 @@
+# Arquivo: app/ids.py
+
+import os
+import socket
+import threading
+import time
+import uuid
+from .db_pool import get_separate_connection
+
+# IDs dos pedidos: 'ART-' + milissegundos (13 dígitos) + nó (4 dígitos) +
+# sequência (3 dígitos), tudo em decimal e com largura fixa.
+#
+# - Ordenar pelo ID equivale a ordenar pela criação, inclusive em relação aos
+#   IDs antigos ('ART-' + segundos): os 10 primeiros dígitos são os mesmos.
+# - O nó é uma vaga reservada no banco por processo (tabela 'id_node_slots'),
+#   então dois workers do gunicorn, mesmo em máquinas diferentes, nunca usam o
+#   mesmo. A vaga tem prazo: o processo a renova enquanto gera IDs e, se ele
+#   morrer, ela volta a ficar livre quando o prazo vence. Assim as 10.000
+#   vagas não se esgotam com reinícios.
+# - A sequência diferencia os pedidos criados no mesmo milissegundo pelo mesmo
+#   processo (até 1000; depois disso o gerador passa para o milissegundo seguinte).
+
+PREFIX = 'ART-'
+NODE_DIGITS = 4
+SEQUENCE_DIGITS = 3
+_MAX_SEQUENCE = 10 ** SEQUENCE_DIGITS
+_MAX_NODES = 10 ** NODE_DIGITS
+# Prazo da vaga. Ela é renovada quando passa de um terço do prazo, na próxima
+# geração de ID; um processo parado por mais que isso troca de vaga.
+NODE_LEASE_SECONDS = int(os.environ.get('ID_NODE_LEASE_SECONDS', 900))
+_RESERVE_ATTEMPTS = 5
+
+_lock = threading.Lock()
+_node_lock = threading.Lock()
+_node = None
+_node_pid = None
+_node_token = None
+_node_renew_at = 0
+_last_ms = 0
+_sequence = 0
+
+
+def _reserve_node(cursor, placeholder, token):
+    """Toma uma vaga vencida ou, se não houver, abre a próxima. Retorna o número da vaga."""
+    lease = (token, socket.gethostname(), os.getpid(), time.time() + NODE_LEASE_SECONDS)
+    for _ in range(_RESERVE_ATTEMPTS):
+        now = time.time()
+        cursor.execute(f'SELECT slot FROM id_node_slots WHERE expires_at < {placeholder} ORDER BY expires_at LIMIT 1', (now,))
+        row = cursor.fetchone()
+        if row is not None:
+            # Outro processo pode tomar a mesma vaga entre o SELECT e o UPDATE; o prazo decide.
+            cursor.execute(
+                f'UPDATE id_node_slots SET token = {placeholder}, host = {placeholder}, pid = {placeholder}, expires_at = {placeholder} WHERE slot = {placeholder} AND expires_at < {placeholder}',
+                lease + (row['slot'], now)
+            )
+        else:
+            cursor.execute('SELECT COALESCE(MAX(slot) + 1, 0) AS slot FROM id_node_slots')
+            row = cursor.fetchone()
+            if row['slot'] >= _MAX_NODES:
+                raise RuntimeError(f'Todas as {_MAX_NODES} vagas do gerador de IDs estão em uso.')
+            cursor.execute(
+                f'INSERT INTO id_node_slots (slot, token, host, pid, expires_at) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}) ON CONFLICT (slot) DO NOTHING',
+                (row['slot'],) + lease
+            )
+        if cursor.rowcount == 1:
+            return row['slot']
+    raise RuntimeError('Não foi possível reservar uma vaga no gerador de IDs.')
+
+
+def _renew_node(cursor, placeholder, slot, token):
+    """Estende o prazo da vaga. Retorna False se ela venceu e já foi tomada por outro processo."""
+    cursor.execute(
+        f'UPDATE id_node_slots SET expires_at = {placeholder} WHERE slot = {placeholder} AND token = {placeholder}',
+        (time.time() + NODE_LEASE_SECONDS, slot, token)
+    )
+    return cursor.rowcount == 1
+
+
+def _current_node():
+    """
+    Nó deste processo: reservado na primeira chamada (e de novo após um fork) e
+    renovado a cada terço do prazo. Se a vaga se perdeu, reserva outra.
+    """
+    global _node, _node_pid, _node_token, _node_renew_at
+    pid = os.getpid()
+    if _node is not None and _node_pid == pid and time.time() < _node_renew_at:
+        return _node
+    with _node_lock:
+        if _node is not None and _node_pid == pid and time.time() < _node_renew_at:
+            return _node
+        # Conexão própria: o commit da reserva não pode levar junto a transação da rota.
+        conn = get_separate_connection()
+        is_postgres = hasattr(conn, 'cursor_factory')
+        placeholder = '%s' if is_postgres else '?'
+        cursor = conn.cursor()
+        try:
+            if _node is None or _node_pid != pid or not _renew_node(cursor, placeholder, _node, _node_token):
+                token = uuid.uuid4().hex
+                _node = _reserve_node(cursor, placeholder, token)
+                _node_pid, _node_token = pid, token
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        _node_renew_at = time.time() + NODE_LEASE_SECONDS / 3
+    return _node
+
+
+def new_commission_id():
+    """Gera um ID de pedido único e crescente."""
+    global _last_ms, _sequence
+    node = _current_node()
+    with _lock:
+        now_ms = int(time.time() * 1000)
+        if now_ms <= _last_ms:
+            # Mesmo milissegundo (ou relógio que voltou): continua a partir do último instante usado.
+            now_ms = _last_ms
+            _sequence += 1
+            if _sequence >= _MAX_SEQUENCE:
+                now_ms += 1
+                _sequence = 0
+        else:
+            _sequence = 0
+        _last_ms = now_ms
+        sequence = _sequence
+    return f'{PREFIX}{now_ms:013d}{node:0{NODE_DIGITS}d}{sequence:0{SEQUENCE_DIGITS}d}'
@@ -0,0 +1,349 @@
+# Arquivo: app/images.py
+
+import atexit
+import base64
+import hashlib
+import io
+import ipaddress
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin, urlsplit
+import requests
+from .outbox import enqueue, register_handler, DeliveryError
+from .utils import get_db_connection
+
+# Pillow é opcional: sem ele as páginas continuam usando a imagem original.
+try:
+    from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError, features
+except ImportError:
+    Image = None
+
+# Derivados das imagens da galeria: miniaturas em algumas larguras fixas, nos
+# formatos modernos (WebP e, se o Pillow tiver suporte, AVIF), mais um
+# placeholder minúsculo e desfocado que vai embutido no HTML. A geração é
+# pesada em CPU, então roda em um pool de processos, disparada pela outbox
+# depois do commit de 'add_to_gallery' (nunca no caminho da requisição).
+#
+# O endereço da imagem vem de um formulário, então o download só aceita
+# arquivos do próprio site (/static e /media) ou hosts da lista
+# IMAGE_SOURCE_HOSTS, e nunca endereços internos da rede.
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEDIA_DIR = os.environ.get('MEDIA_DIR', os.path.join(_PROJECT_ROOT, 'media'))
+MEDIA_URL = '/media'
+
+WIDTHS = (320, 640, 1280)
+QUALITY = {'webp': 80, 'avif': 55}
+PLACEHOLDER_WIDTH = 16
+MAX_SOURCE_BYTES = int(os.environ.get('IMAGE_MAX_SOURCE_BYTES', 25 * 1024 * 1024))
+POOL_SIZE = max(int(os.environ.get('IMAGE_WORKERS', '2')), 1)
+DOWNLOAD_TIMEOUT = (5, 30)
+MAX_REDIRECTS = 3
+SOURCE_HOSTS = {
+    host.strip().lower()
+    for host in os.environ.get('IMAGE_SOURCE_HOSTS', 'i.imgur.com').split(',')
+    if host.strip()
+}
+LOCAL_SOURCES = {
+    '/static/': os.path.join(_PROJECT_ROOT, 'static'),
+    MEDIA_URL + '/': MEDIA_DIR,
+}
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def is_available():
+    return Image is not None
+
+
+def output_formats():
+    formats = ['webp']
+    if features.check('avif'):
+        formats.insert(0, 'avif')
+    return formats
+
+
+def _gallery_dir(art_id):
+    return os.path.join(MEDIA_DIR, 'gallery', str(art_id))
+
+
+def render_derivatives(art_id, data):
+    """
+    Gera os derivados de uma imagem e os grava em media/gallery/<id>/.
+    Roda nos processos do pool: recebe apenas valores simples e não usa o banco.
+    Os nomes dos arquivos levam o hash do original, então uma URL nunca muda de conteúdo.
+    """
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    width, height = image.size
+
+    folder = _gallery_dir(art_id)
+    os.makedirs(folder, exist_ok=True)
+    written = set()
+    sources = {}
+    # Sempre gera a menor largura; as maiores só se o original for grande o bastante.
+    widths = [w for w in WIDTHS if w < width] or [min(width, WIDTHS[0])]
+    for target_width in widths:
+        resized = image.resize((target_width, max(round(height * target_width / width), 1)), Image.LANCZOS)
+        for fmt in output_formats():
+            name = f'{digest}-{target_width}.{fmt}'
+            resized.save(os.path.join(folder, name), fmt.upper(), quality=QUALITY[fmt])
+            written.add(name)
+            sources.setdefault(fmt, []).append({'width': target_width, 'url': f'{MEDIA_URL}/gallery/{art_id}/{name}'})
+
+    # Remove derivados de uma versão anterior da imagem.
+    for name in os.listdir(folder):
+        if name not in written:
+            os.remove(os.path.join(folder, name))
+
+    tiny = image.resize((PLACEHOLDER_WIDTH, max(round(height * PLACEHOLDER_WIDTH / width), 1)), Image.BILINEAR)
+    tiny = tiny.filter(ImageFilter.GaussianBlur(1))
+    buffer = io.BytesIO()
+    tiny.save(buffer, 'WEBP', quality=30)
+    placeholder = 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+
+    return {'width': width, 'height': height, 'sources': sources}, placeholder
+
+
+def _get_pool():
+    """
+    Pool de processos deste worker. Usa 'spawn' para que os filhos não herdem
+    o estado do eventlet nem as conexões abertas do processo pai.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ProcessPoolExecutor(max_workers=POOL_SIZE, mp_context=multiprocessing.get_context('spawn'))
+            _pool_pid = pid
+            # Com o eventlet, o gancho de saída do concurrent.futures não roda
+            # e os processos filhos ficariam órfãos.
+            atexit.register(shutdown)
+    return _pool
+
+
+def shutdown(wait=True):
+    """Encerra o pool de processos deste worker, se houver. Pode ser chamada mais de uma vez."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        pool, owner = _pool, _pool_pid
+        _pool, _pool_pid = None, None
+    # Um processo filho do fork herda a referência, mas o pool é do processo pai.
+    if pool is not None and owner == os.getpid():
+        pool.shutdown(wait=wait, cancel_futures=True)
+
+
+def _read_local_source(path):
+    """Lê uma imagem servida pelo próprio site (/static/... ou /media/...)."""
+    for prefix, folder in LOCAL_SOURCES.items():
+        if path.startswith(prefix):
+            root = os.path.realpath(folder)
+            full_path = os.path.realpath(os.path.join(root, path[len(prefix):]))
+            if not full_path.startswith(root + os.sep):
+                break
+            try:
+                if os.path.getsize(full_path) > MAX_SOURCE_BYTES:
+                    raise DeliveryError('A imagem original passa do tamanho máximo aceito.', permanent=True)
+                with open(full_path, 'rb') as f:
+                    return f.read()
+            except OSError as e:
+                raise DeliveryError(f'A imagem não pôde ser lida: {e}', permanent=True)
+    raise DeliveryError(f'Endereço de imagem não suportado: {path}', permanent=True)
+
+
+def _check_remote_source(url):
+    """
+    Confere se o endereço aponta para um host permitido e se todos os IPs
+    resolvidos são públicos. Levanta DeliveryError (permanente) se não.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    if parts.scheme not in ('http', 'https') or not host:
+        raise DeliveryError(f'Endereço de imagem não suportado: {url}', permanent=True)
+    if host not in SOURCE_HOSTS:
+        raise DeliveryError(f"O host '{host}' não está em IMAGE_SOURCE_HOSTS.", permanent=True)
+    try:
+        addresses = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == 'https' else 80), proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise DeliveryError(f"Não foi possível resolver '{host}': {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address[4][0].split('%')[0])
+        if not ip.is_global or ip.is_multicast:
+            raise DeliveryError(f"O host '{host}' resolve para um endereço interno ({ip}).", permanent=True)
+
+
+def fetch_source(url):
+    """Baixa a imagem original, com limite de tamanho. Levanta DeliveryError em caso de falha."""
+    if url and url.startswith('/') and not url.startswith('//'):
+        return _read_local_source(urlsplit(url).path)
+    try:
+        # Os redirecionamentos são seguidos à mão para que cada destino passe pela mesma verificação.
+        for _ in range(MAX_REDIRECTS + 1):
+            _check_remote_source(url)
+            with requests.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT, allow_redirects=False) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers['Location'])
+                    continue
+                if 400 <= response.status_code < 500:
+                    raise DeliveryError(f'A imagem não pôde ser baixada (HTTP {response.status_code}).', permanent=True)
+                response.raise_for_status()
+                chunks, total = [], 0
+                for chunk in response.iter_content(64 * 1024):
+                    total += len(chunk)
+                    if total > MAX_SOURCE_BYTES:
+                        raise DeliveryError('A imagem original passa do tamanho máximo aceito.', permanent=True)
+                    chunks.append(chunk)
+                return b''.join(chunks)
+    except requests.exceptions.RequestException as e:
+        raise DeliveryError(f'Erro ao baixar a imagem: {e}')
+    raise DeliveryError('A imagem original redireciona vezes demais.', permanent=True)
+
+
+def _save_result(art_id, variants, placeholder, status):
+    from .cache import bump_version
+    conn = get_db_connection()
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder_sql = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    cursor.execute(
+        f'UPDATE gallery SET image_variants = {placeholder_sql}, image_placeholder = {placeholder_sql}, image_status = {placeholder_sql} WHERE id = {placeholder_sql}',
+        (json.dumps(variants) if variants else None, placeholder, status, art_id)
+    )
+    updated = cursor.rowcount == 1
+    if updated:
+        bump_version(conn, 'gallery')
+    conn.commit()
+    cursor.close()
+    conn.close()
+    return updated
+
+
+def process_gallery_image(art_id, payload=None):
+    """Entregador da outbox para o canal 'gallery_image': gera os derivados de uma obra."""
+    if not is_available():
+        raise DeliveryError('Pillow não está instalado; derivados de imagem desabilitados.', permanent=True)
+
+    art_id = int(art_id)
+    conn = get_db_connection()
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT image_url FROM gallery WHERE id = {placeholder}', (art_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    conn.close()
+    if row is None:
+        # A obra foi excluída antes do processamento.
+        return
+
+    try:
+        data = fetch_source(row['image_url'])
+        # O resultado é aguardado de forma cooperativa: o worker do eventlet segue atendendo.
+        variants, tiny = _get_pool().submit(render_derivatives, art_id, data).result()
+    except DeliveryError as e:
+        if e.permanent:
+            _save_result(art_id, None, None, 'failed')
+        raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        _save_result(art_id, None, None, 'failed')
+        raise DeliveryError(f'Imagem inválida: {e}', permanent=True)
+
+    if not _save_result(art_id, variants, tiny, 'ready'):
+        remove_derivatives(art_id)
+
+
+def queue_gallery_image(conn, art_id):
+    """Agenda a geração dos derivados na transação do chamador. Retorna False sem Pillow."""
+    if not is_available():
+        return False
+    enqueue(conn, 'gallery_image', str(art_id), {})
+    return True
+
+
+def remove_derivatives(art_id):
+    shutil.rmtree(_gallery_dir(art_id), ignore_errors=True)
+
+
+def image_fields(variants_json, placeholder):
+    """
+    Dados de imagem para os templates e para a API: um 'srcset' por formato,
+    as dimensões do original e o placeholder. Vazio enquanto não houver derivados.
+    """
+    if not variants_json:
+        return {}
+    try:
+        variants = json.loads(variants_json)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return {
+        'srcset': {
+            fmt: ', '.join(f"{source['url']} {source['width']}w" for source in sources)
+            for fmt, sources in variants.get('sources', {}).items()
+        },
+        'width': variants.get('width'),
+        'height': variants.get('height'),
+        'placeholder': placeholder,
+    }
+
+
+def backfill_gallery_images(only_missing=True):
+    """
+    Gera os derivados das obras já cadastradas, usando todos os processos do
+    pool em paralelo. Retorna (processadas, falhas).
+    """
+    if not is_available():
+        raise RuntimeError('Pillow não está instalado.')
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    condition = " WHERE image_status IS NULL OR image_status <> 'ready'" if only_missing else ''
+    cursor.execute(f'SELECT id, image_url FROM gallery{condition} ORDER BY id')
+    rows = cursor.fetchall()
+    cursor.close()
+    conn.close()
+
+    pool = _get_pool()
+    done, failed = 0, 0
+    pending = []
+
+    def collect(art_id, future):
+        nonlocal done, failed
+        try:
+            variants, tiny = future.result()
+        except Exception as e:
+            print(f"!!! ERRO ao gerar os derivados da obra #{art_id}: {e}")
+            _save_result(art_id, None, None, 'failed')
+            failed += 1
+            return
+        _save_result(art_id, variants, tiny, 'ready')
+        done += 1
+
+    for row in rows:
+        try:
+            data = fetch_source(row['image_url'])
+        except DeliveryError as e:
+            print(f"!!! ERRO ao baixar a imagem da obra #{row['id']}: {e}")
+            failed += 1
+            continue
+        pending.append((row['id'], pool.submit(render_derivatives, row['id'], data)))
+        # Limita quantos originais ficam na memória esperando um processo livre.
+        if len(pending) >= POOL_SIZE * 2:
+            collect(*pending.pop(0))
+    for art_id, future in pending:
+        collect(art_id, future)
+    return done, failed
+
+
+# Worker próprio: uma fila de imagens não pode atrasar as notificações do Telegram.
+register_handler('gallery_image', process_gallery_image, worker='images')
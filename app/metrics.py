@@ -0,0 +1,154 @@
+# Arquivo: app/metrics.py
+
+import hmac
+import ipaddress
+import os
+import time
+from flask import Response, g, request, session
+
+# prometheus_client é opcional: sem ele as métricas viram chamadas vazias e
+# /metrics responde 503.
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:
+    prometheus_client = None
+    Counter = Gauge = Histogram = None
+
+# Métricas no formato texto do Prometheus, expostas em /metrics.
+#
+# Com vários workers do gunicorn, cada processo tem seus próprios contadores.
+# Quando PROMETHEUS_MULTIPROC_DIR aponta para um diretório (vazio a cada
+# deploy), cada worker grava seus valores em arquivos ali e /metrics soma os
+# de todos, seja qual for o worker que atender a coleta. O gunicorn.conf.py
+# limpa o diretório na subida e descarta os medidores de workers encerrados.
+#
+# Se METRICS_TOKEN estiver definido, a coleta precisa enviar
+# 'Authorization: Bearer <token>'. Sem token, /metrics só responde a um
+# administrador logado ou a uma coleta feita da própria máquina (sem passar
+# por proxy); qualquer outro acesso recebe 401.
+
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+QUERY_OPERATIONS = ('select', 'insert', 'update', 'delete')
+
+
+class _NoopMetric:
+    """Substituto das métricas quando o prometheus_client não está instalado."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+
+def _metric(cls, name, documentation, labelnames=(), **kwargs):
+    if cls is None:
+        return _NoopMetric()
+    return cls(name, documentation, labelnames, **kwargs)
+
+
+HTTP_REQUEST_LATENCY = _metric(Histogram, 'http_request_duration_seconds',
+                               'Tempo de resposta por endpoint.', ('endpoint', 'method'), buckets=LATENCY_BUCKETS)
+HTTP_REQUESTS = _metric(Counter, 'http_requests', 'Requisições atendidas.', ('endpoint', 'method', 'status'))
+
+DB_QUERY_LATENCY = _metric(Histogram, 'db_query_duration_seconds',
+                           'Tempo de execução das consultas SQL.', ('operation',), buckets=QUERY_BUCKETS)
+DB_QUERIES_PER_REQUEST = _metric(Histogram, 'db_queries_per_request', 'Consultas SQL por requisição.',
+                                 buckets=(0, 1, 2, 5, 10, 20, 30, 50, 100))
+DB_POOL_WAIT = _metric(Histogram, 'db_pool_wait_seconds',
+                       'Espera por uma conexão livre no pool.', buckets=(0, 0.001, 0.01, 0.1, 0.5, 1, 5, 30))
+DB_CONNECTIONS_IN_USE = _metric(Gauge, 'db_connections_in_use',
+                                'Conexões emprestadas do pool.', multiprocess_mode='livesum')
+
+SOCKETIO_CLIENTS = _metric(Gauge, 'socketio_connected_clients',
+                           'Conexões Socket.IO abertas.', ('kind',), multiprocess_mode='livesum')
+SOCKETIO_EVENTS = _metric(Counter, 'socketio_events', 'Eventos Socket.IO recebidos e emitidos.', ('event', 'direction'))
+
+TELEGRAM_LATENCY = _metric(Histogram, 'telegram_request_duration_seconds',
+                           'Tempo das chamadas à API do Telegram.', ('outcome',), buckets=LATENCY_BUCKETS)
+
+CACHE_LOOKUPS = _metric(Counter, 'cache_lookups', 'Leituras dos caches em memória.', ('cache', 'result'))
+
+
+def observe_query(sql, elapsed):
+    words = sql.split(None, 1)
+    operation = words[0].lower() if words else ''
+    DB_QUERY_LATENCY.labels(operation if operation in QUERY_OPERATIONS else 'other').observe(elapsed)
+
+
+def count_cache(cache, result):
+    CACHE_LOOKUPS.labels(cache, result).inc()
+
+
+def count_socket_event(event, direction='out'):
+    SOCKETIO_EVENTS.labels(event, direction).inc()
+
+
+def _start_timer():
+    g._metrics_started = time.perf_counter()
+
+
+def _observe_request(response):
+    started = g.pop('_metrics_started', None)
+    if started is not None:
+        # Rotas inexistentes ficam juntas, para não criar uma série por URL.
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_REQUEST_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+    return response
+
+
+def _is_local_request():
+    # Atrás de um proxy na mesma máquina, o endereço é sempre local; o
+    # cabeçalho de encaminhamento denuncia que a requisição veio de fora.
+    if request.headers.get('X-Forwarded-For') or request.headers.get('Forwarded'):
+        return False
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+
+def _authorized():
+    if METRICS_TOKEN:
+        header = request.headers.get('Authorization', '')
+        return hmac.compare_digest(header.encode(), f'Bearer {METRICS_TOKEN}'.encode())
+    return bool(session.get('is_admin')) or _is_local_request()
+
+
+def metrics_view():
+    if prometheus_client is None:
+        return Response('prometheus_client não está instalado.\n', status=503, mimetype='text/plain')
+    if not _authorized():
+        return Response('Não autorizado.\n', status=401, mimetype='text/plain')
+
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return Response(prometheus_client.generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def init_app(app):
+    """Mede todas as requisições e registra a rota /metrics."""
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+
+def mark_process_dead(pid):
+    """Chamado pelo gunicorn quando um worker termina: descarta os medidores 'live' dele."""
+    if prometheus_client is not None and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,394 @@
+# Arquivo: app/migrations.py
+
+import json
+from datetime import datetime
+
+# Cada migração recebe (cursor, is_postgres) e roda dentro de uma transação
+# própria. Uma vez publicada, uma migração nunca deve ser editada: crie outra.
+# Pelo mesmo motivo, uma migração não importa funções do resto da aplicação:
+# o SQL fica escrito aqui, congelado no esquema da época. Se o código vivo
+# mudar (uma coluna nova no agregado, outro formato de índice), a migração
+# antiga continua fazendo exatamente o que fazia quando foi publicada.
+
+
+def _migration_cache_versions(cursor, is_postgres):
+    cursor.execute('CREATE TABLE IF NOT EXISTS cache_versions (name TEXT PRIMARY KEY NOT NULL, version INTEGER NOT NULL DEFAULT 0)')
+
+
+def _migration_commission_history(cursor, is_postgres):
+    """Move o histórico dos pedidos (eventos, comentários e prévias) dos blobs JSON para tabelas próprias."""
+    autoincrement_syntax = 'SERIAL PRIMARY KEY' if is_postgres else 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    placeholder = '%s' if is_postgres else '?'
+
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS commission_events (
+        id {autoincrement_syntax}, commission_id TEXT NOT NULL, timestamp TEXT NOT NULL, actor TEXT, message TEXT
+    )''')
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS commission_comments (
+        id {autoincrement_syntax}, commission_id TEXT NOT NULL, author TEXT, is_artist INTEGER NOT NULL DEFAULT 0,
+        date TEXT NOT NULL, text TEXT, is_revision_request INTEGER NOT NULL DEFAULT 0, phase_name TEXT
+    )''')
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS commission_previews (
+        id {autoincrement_syntax}, commission_id TEXT NOT NULL, version TEXT, date TEXT NOT NULL, url TEXT, comment TEXT
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_commission_events_commission ON commission_events (commission_id, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_commission_comments_commission ON commission_comments (commission_id, id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_commission_previews_commission ON commission_previews (commission_id, id)')
+
+    cursor.execute('SELECT id, event_log, comments, preview FROM comissoes')
+    rows = cursor.fetchall()
+
+    def parse(value):
+        try:
+            parsed = json.loads(value) if value else []
+        except (json.JSONDecodeError, TypeError):
+            return []
+        return parsed if isinstance(parsed, list) else []
+
+    events, comments, previews = [], [], []
+    for row in rows:
+        for event in parse(row['event_log']):
+            events.append((row['id'], event.get('timestamp') or datetime.now().isoformat(), event.get('actor'), event.get('message')))
+        for comment in parse(row['comments']):
+            comments.append((
+                row['id'], comment.get('author'), 1 if comment.get('is_artist') else 0,
+                comment.get('date') or datetime.now().isoformat(), comment.get('text'),
+                1 if comment.get('is_revision_request') else 0, comment.get('phase_name')
+            ))
+        for preview in parse(row['preview']):
+            previews.append((row['id'], preview.get('version'), preview.get('date') or datetime.now().isoformat(), preview.get('url'), preview.get('comment')))
+
+    if events:
+        cursor.executemany(f'INSERT INTO commission_events (commission_id, timestamp, actor, message) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})', events)
+    if comments:
+        cursor.executemany(f'INSERT INTO commission_comments (commission_id, author, is_artist, date, text, is_revision_request, phase_name) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})', comments)
+    if previews:
+        cursor.executemany(f'INSERT INTO commission_previews (commission_id, version, date, url, comment) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})', previews)
+
+    # As colunas antigas deixam de ser lidas; esvaziá-las evita carregar o histórico em todo SELECT *.
+    cursor.execute("UPDATE comissoes SET event_log = '[]', comments = '[]', preview = '[]'")
+    print(f"Histórico migrado: {len(events)} eventos, {len(comments)} comentários, {len(previews)} prévias.")
+
+
+def _migration_outbox(cursor, is_postgres):
+    """Fila persistente de envios externos (Telegram), entregue por um worker em segundo plano."""
+    autoincrement_syntax = 'SERIAL PRIMARY KEY' if is_postgres else 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    float_type = 'DOUBLE PRECISION' if is_postgres else 'REAL'
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS outbox (
+        id {autoincrement_syntax}, channel TEXT NOT NULL, destination TEXT, payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at {float_type} NOT NULL, last_error TEXT, created_at TEXT NOT NULL, sent_at TEXT
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_outbox_status_next_attempt ON outbox (status, next_attempt_at)')
+
+
+def _migration_hot_query_indexes(cursor, is_postgres):
+    """Índices para os filtros e ordenações das consultas mais frequentes (ver HOT_QUERIES)."""
+    indexes = [
+        'CREATE INDEX IF NOT EXISTS idx_comissoes_client_date ON comissoes (client_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_comissoes_status_date ON comissoes (status, date)',
+        'CREATE INDEX IF NOT EXISTS idx_comissoes_date_id ON comissoes (date, id)',
+        'CREATE INDEX IF NOT EXISTS idx_notifications_user_timestamp ON notifications (user_id, timestamp)',
+        # Parcial: só as não lidas, que é o que o contador e o "marcar como lidas" consultam.
+        'CREATE INDEX IF NOT EXISTS idx_notifications_unread ON notifications (user_id, related_commission_id) WHERE is_read = 0',
+        'CREATE INDEX IF NOT EXISTS idx_notifications_commission ON notifications (related_commission_id)',
+        'CREATE INDEX IF NOT EXISTS idx_gallery_lineart_artist ON gallery (lineart_artist_id)',
+        'CREATE INDEX IF NOT EXISTS idx_gallery_color_artist ON gallery (color_artist_id)',
+        'CREATE INDEX IF NOT EXISTS idx_gallery_created_at ON gallery (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_artist_services_artist_active ON artist_services (artist_id, is_active)',
+        # Índice de expressão para o login/cadastro, que comparam LOWER(username).
+        'CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users (LOWER(username))',
+    ]
+    for statement in indexes:
+        cursor.execute(statement)
+
+
+def _migration_revenue_daily(cursor, is_postgres):
+    """Agregado diário da receita dos pedidos concluídos, preenchido a partir do histórico."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS revenue_daily (
+        day TEXT NOT NULL, type TEXT NOT NULL DEFAULT '', client TEXT NOT NULL DEFAULT '',
+        total REAL NOT NULL DEFAULT 0, commissions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, type, client)
+    )''')
+    cursor.execute('''
+        INSERT INTO revenue_daily (day, type, client, total, commissions)
+        SELECT date, COALESCE(type, ''), COALESCE(client, ''), SUM(COALESCE(price, 0)), COUNT(*)
+        FROM comissoes WHERE status = 'completed' AND date IS NOT NULL
+        GROUP BY date, COALESCE(type, ''), COALESCE(client, '')
+    ''')
+    cursor.execute('SELECT COUNT(*) AS total FROM revenue_daily')
+    rows = cursor.fetchone()['total']
+    print(f"Agregado de receita preenchido: {rows} linha(s).")
+
+
+def _migration_uploads(cursor, is_postgres):
+    """Envios em partes (retomáveis) e os arquivos de referência ligados aos pedidos."""
+    autoincrement_syntax = 'SERIAL PRIMARY KEY' if is_postgres else 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS uploads (
+        id TEXT PRIMARY KEY NOT NULL, user_id INTEGER NOT NULL, filename TEXT NOT NULL, mime_type TEXT NOT NULL,
+        size INTEGER NOT NULL, received INTEGER NOT NULL DEFAULT 0, sha256 TEXT,
+        status TEXT NOT NULL DEFAULT 'uploading', commission_id TEXT, created_at TEXT NOT NULL, updated_at TEXT NOT NULL
+    )''')
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS commission_files (
+        id {autoincrement_syntax}, commission_id TEXT NOT NULL, sha256 TEXT NOT NULL, filename TEXT NOT NULL,
+        mime_type TEXT NOT NULL, size INTEGER NOT NULL, uploaded_by INTEGER, created_at TEXT NOT NULL
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_uploads_status_updated ON uploads (status, updated_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_commission_files_commission ON commission_files (commission_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_commission_files_sha256 ON commission_files (sha256)')
+
+
+def _migration_gallery_image_variants(cursor, is_postgres):
+    """Colunas com os derivados (miniaturas WebP/AVIF e placeholder) das imagens da galeria."""
+    cursor.execute('ALTER TABLE gallery ADD COLUMN image_variants TEXT')
+    cursor.execute('ALTER TABLE gallery ADD COLUMN image_placeholder TEXT')
+    cursor.execute('ALTER TABLE gallery ADD COLUMN image_status TEXT')
+
+
+def _migration_id_nodes(cursor, is_postgres):
+    """Reserva de nós do gerador de IDs dos pedidos, um por processo (ver app/ids.py)."""
+    autoincrement_syntax = 'SERIAL PRIMARY KEY' if is_postgres else 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS id_nodes (id {autoincrement_syntax}, host TEXT, pid INTEGER, created_at TEXT NOT NULL)')
+
+
+def _migration_gallery_artists(cursor, is_postgres):
+    """Vínculo artista-obra da galeria, para ler o portfólio de um artista por índice."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS gallery_artists (
+        artist_id INTEGER NOT NULL, gallery_id INTEGER NOT NULL, created_at TIMESTAMP,
+        PRIMARY KEY (artist_id, gallery_id)
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_gallery_artists_artist_recent ON gallery_artists (artist_id, created_at, gallery_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_gallery_artists_gallery ON gallery_artists (gallery_id)')
+    cursor.execute('''
+        INSERT INTO gallery_artists (artist_id, gallery_id, created_at)
+        SELECT lineart_artist_id, id, created_at FROM gallery WHERE lineart_artist_id IS NOT NULL
+        UNION
+        SELECT color_artist_id, id, created_at FROM gallery WHERE color_artist_id IS NOT NULL
+    ''')
+
+
+def _migration_commission_changes(cursor, is_postgres):
+    """Sequência de alterações dos pedidos e lápides das exclusões, para a sincronização incremental."""
+    cursor.execute('ALTER TABLE comissoes ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('CREATE TABLE IF NOT EXISTS change_sequences (name TEXT PRIMARY KEY NOT NULL, value INTEGER NOT NULL DEFAULT 0)')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS commission_tombstones (
+        commission_id TEXT PRIMARY KEY NOT NULL, client_id INTEGER, change_seq INTEGER NOT NULL, deleted_at TEXT NOT NULL
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comissoes_change_seq ON comissoes (change_seq)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comissoes_client_change_seq ON comissoes (client_id, change_seq)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_commission_tombstones_change_seq ON commission_tombstones (change_seq)')
+
+
+def _migration_search_index(cursor, is_postgres):
+    """Índice de busca textual (FTS5 no SQLite, tsvector + GIN no PostgreSQL), preenchido com os dados atuais."""
+    if is_postgres:
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS search_documents (
+            id SERIAL PRIMARY KEY, kind TEXT NOT NULL, ref_id TEXT NOT NULL, commission_id TEXT,
+            title TEXT NOT NULL DEFAULT '', body TEXT NOT NULL DEFAULT '', created_at TEXT,
+            document tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('portuguese', title), 'A') || setweight(to_tsvector('portuguese', body), 'B')
+            ) STORED,
+            UNIQUE (kind, ref_id)
+        )''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_documents_document ON search_documents USING GIN (document)')
+    else:
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS search_documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, ref_id TEXT NOT NULL, commission_id TEXT,
+            title TEXT NOT NULL DEFAULT '', body TEXT NOT NULL DEFAULT '', created_at TEXT,
+            UNIQUE (kind, ref_id)
+        )''')
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+            kind, title, body, content='search_documents', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_search_documents_commission ON search_documents (commission_id)')
+
+    backfill = [
+        "SELECT 'commission', id, id, COALESCE(client, '') || ' · ' || COALESCE(type, ''), COALESCE(description, ''), date FROM comissoes",
+        "SELECT 'comment', CAST(id AS TEXT), commission_id, COALESCE(author, ''), COALESCE(text, ''), date FROM commission_comments",
+        "SELECT 'event', CAST(id AS TEXT), commission_id, COALESCE(actor, ''), COALESCE(message, ''), timestamp FROM commission_events",
+        "SELECT 'message', CAST(id AS TEXT), NULL, sender_name || ' · ' || sender_email, message_content, CAST(received_at AS TEXT) FROM contact_messages",
+        "SELECT 'user', CAST(id AS TEXT), NULL, username, '', CAST(created_at AS TEXT) FROM users",
+    ]
+    for select in backfill:
+        cursor.execute(f'INSERT INTO search_documents (kind, ref_id, commission_id, title, body, created_at) {select}')
+    if not is_postgres:
+        cursor.execute("INSERT INTO search_fts (search_fts) VALUES ('rebuild')")
+    cursor.execute('SELECT COUNT(*) AS total FROM search_documents')
+    documents = cursor.fetchone()['total']
+    print(f"Índice de busca preenchido: {documents} documento(s).")
+
+
+def _migration_deadline_index(cursor, is_postgres):
+    """Índice para os atrasados do resumo do dashboard e os prazos do calendário."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_comissoes_deadline ON comissoes (deadline)')
+
+
+def _migration_commission_version(cursor, is_postgres):
+    """Versão de cada pedido, para as escritas com compare-and-swap (If-Match/ETag)."""
+    cursor.execute('ALTER TABLE comissoes ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+
+
+def _migration_upload_claims(cursor, is_postgres):
+    """Reserva da parte em gravação de cada envio, para que duas requisições não escrevam ao mesmo tempo."""
+    cursor.execute('ALTER TABLE uploads ADD COLUMN claim_token TEXT')
+    cursor.execute('ALTER TABLE uploads ADD COLUMN claimed_until REAL')
+
+
+def _migration_outbox_rate_limits(cursor, is_postgres):
+    """Intervalo mínimo entre envios por destino da outbox, compartilhado por todos os processos."""
+    float_type = 'DOUBLE PRECISION' if is_postgres else 'REAL'
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS outbox_rate_limits (
+        channel TEXT NOT NULL, destination TEXT NOT NULL, next_allowed_at {float_type} NOT NULL,
+        PRIMARY KEY (channel, destination)
+    )''')
+
+
+def _migration_id_node_slots(cursor, is_postgres):
+    """Nós do gerador de IDs como vagas com prazo, reaproveitadas quando o processo some (substitui 'id_nodes')."""
+    float_type = 'DOUBLE PRECISION' if is_postgres else 'REAL'
+    cursor.execute(f'''
+    CREATE TABLE IF NOT EXISTS id_node_slots (
+        slot INTEGER PRIMARY KEY NOT NULL, token TEXT NOT NULL, host TEXT, pid INTEGER,
+        expires_at {float_type} NOT NULL
+    )''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_id_node_slots_expires ON id_node_slots (expires_at)')
+    cursor.execute('DROP TABLE IF EXISTS id_nodes')
+
+
+MIGRATIONS = [
+    (1, 'Tabela de versões de cache', _migration_cache_versions),
+    (2, 'Tabelas de histórico dos pedidos', _migration_commission_history),
+    (3, 'Fila de envios externos (outbox)', _migration_outbox),
+    (4, 'Índices das consultas frequentes', _migration_hot_query_indexes),
+    (5, 'Agregado diário de receita', _migration_revenue_daily),
+    (6, 'Envios de arquivos de referência', _migration_uploads),
+    (7, 'Derivados das imagens da galeria', _migration_gallery_image_variants),
+    (8, 'Nós do gerador de IDs dos pedidos', _migration_id_nodes),
+    (9, 'Vínculos entre artistas e obras da galeria', _migration_gallery_artists),
+    (10, 'Sequência de alterações dos pedidos', _migration_commission_changes),
+    (11, 'Índice dos prazos dos pedidos', _migration_deadline_index),
+    (12, 'Índice de busca textual', _migration_search_index),
+    (13, 'Versão dos pedidos', _migration_commission_version),
+    (14, 'Reserva das partes dos envios', _migration_upload_claims),
+    (15, 'Limite de frequência da outbox por destino', _migration_outbox_rate_limits),
+    (16, 'Vagas com prazo para os nós do gerador de IDs', _migration_id_node_slots),
+]
+
+
+def run_migrations(conn):
+    """Aplica, em ordem, as migrações ainda não registradas na tabela 'schema_version'."""
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+
+    cursor.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER PRIMARY KEY NOT NULL, description TEXT, applied_at TEXT)')
+    conn.commit()
+
+    for version, description, migration in MIGRATIONS:
+        # Trava a migração para que vários workers iniciando juntos não a apliquem duas vezes.
+        if is_postgres:
+            cursor.execute('SELECT pg_advisory_xact_lock(7245001)')
+        else:
+            cursor.execute('BEGIN IMMEDIATE')
+
+        cursor.execute(f'SELECT 1 FROM schema_version WHERE version = {placeholder}', (version,))
+        if cursor.fetchone():
+            conn.rollback()
+            continue
+
+        try:
+            print(f"Aplicando migração {version}: {description}...")
+            migration(cursor, is_postgres)
+            cursor.execute(
+                f'INSERT INTO schema_version (version, description, applied_at) VALUES ({placeholder}, {placeholder}, {placeholder})',
+                (version, description, datetime.now().isoformat())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    cursor.close()
+
+
+def get_schema_version(conn):
+    cursor = conn.cursor()
+    cursor.execute('SELECT MAX(version) AS version FROM schema_version')
+    row = cursor.fetchone()
+    cursor.close()
+    if not row or row['version'] is None:
+        return 0
+    return row['version']
+
+
+# Consultas frequentes verificadas pelo modo EXPLAIN: (nome, SQL com '?', parâmetros de exemplo).
+HOT_QUERIES = [
+    ('Pedidos do cliente', 'SELECT * FROM comissoes WHERE client_id = ? ORDER BY date DESC', (1,)),
+    ('Listagem de pedidos do admin', 'SELECT id FROM comissoes ORDER BY date DESC, id DESC LIMIT 50', ()),
+    ('Pedidos alterados do cliente', 'SELECT * FROM comissoes WHERE change_seq > ? AND change_seq <= ? AND client_id = ? ORDER BY change_seq', (0, 10, 1)),
+    ('Pedidos por status', 'SELECT id FROM comissoes WHERE status = ? ORDER BY date DESC', ('in_progress',)),
+    ('Prazos do mês', 'SELECT id, deadline FROM comissoes WHERE deadline >= ? AND deadline <= ?', ('2024-01-01', '2024-01-31')),
+    ('Transações concluídas', "SELECT price, date FROM comissoes WHERE status = 'completed' AND date BETWEEN ? AND ?", ('2024-01-01', '2024-12-31')),
+    ('Receita por mês', 'SELECT SUBSTR(day, 1, 7) AS month, SUM(total) AS total FROM revenue_daily WHERE day BETWEEN ? AND ? GROUP BY SUBSTR(day, 1, 7)', ('2024-01-01', '2024-12-31')),
+    ('Histórico do pedido', 'SELECT timestamp, actor, message FROM commission_events WHERE commission_id IN (?) ORDER BY id', ('ART-1',)),
+    ('Notificações não lidas', 'SELECT COUNT(id) AS count FROM notifications WHERE is_read = 0 AND user_id = ?', (1,)),
+    ('Notificações do usuário', 'SELECT * FROM notifications WHERE user_id = ? ORDER BY timestamp DESC LIMIT 20', (1,)),
+    ('Não lidas do pedido', 'SELECT id FROM notifications WHERE user_id = ? AND related_commission_id = ? AND is_read = 0', (1, 'ART-1')),
+    ('Portfólio do artista', 'SELECT gallery_id FROM gallery_artists WHERE artist_id = ? ORDER BY created_at DESC, gallery_id DESC LIMIT 25', (1,)),
+    ('Galeria recente', 'SELECT id FROM gallery ORDER BY created_at DESC LIMIT 50', ()),
+    ('Serviços ativos do artista', 'SELECT * FROM artist_services WHERE artist_id = ? AND is_active = TRUE ORDER BY price', (1,)),
+    ('Login por nome de usuário', 'SELECT username FROM users WHERE LOWER(username) = LOWER(?)', ('admin',)),
+]
+
+
+def _collect_seq_scans(plan, found):
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        _collect_seq_scans(child, found)
+    return found
+
+
+def explain_hot_queries(conn):
+    """
+    Roda EXPLAIN nas consultas de HOT_QUERIES e aponta as que leem a tabela
+    inteira. No PostgreSQL o 'enable_seqscan' é desligado durante a checagem,
+    para que tabelas pequenas não mascarem a falta de um índice.
+    Retorna uma lista de {'name', 'plan', 'full_scans'}.
+    """
+    is_postgres = hasattr(conn, 'cursor_factory')
+    cursor = conn.cursor()
+    results = []
+    try:
+        if is_postgres:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for name, query, params in HOT_QUERIES:
+            if is_postgres:
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + query.replace('?', '%s'), params)
+                plan = cursor.fetchone()[0][0]['Plan']
+                full_scans = _collect_seq_scans(plan, [])
+                plan_text = json.dumps(plan)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + query, params)
+                details = [row['detail'] for row in cursor.fetchall()]
+                # 'SCAN tabela' sem 'USING ... INDEX' é leitura completa da tabela.
+                full_scans = [d.split()[1] for d in details if d.startswith('SCAN ') and 'INDEX' not in d]
+                plan_text = ' | '.join(details)
+            results.append({'name': name, 'plan': plan_text, 'full_scans': full_scans})
+    finally:
+        conn.rollback()
+        cursor.close()
+    return results
@@ -0,0 +1,53 @@
+# Arquivo: app/notifications.py
+
+from datetime import datetime
+
+
+def admin_notification(message, commission_id=None):
+    """Notificação para o painel dos administradores (user_id vazio)."""
+    return {'message': message, 'related_commission_id': commission_id, 'user_id': None}
+
+
+def client_notification(user_id, message, commission_id=None):
+    """Notificação para um cliente. Retorna None sem cliente, e 'notify' a ignora."""
+    if not user_id:
+        return None
+    return {'message': message, 'related_commission_id': commission_id, 'user_id': user_id}
+
+
+def notify(conn, notifications):
+    """
+    Grava várias notificações com um único INSERT, na transação do chamador
+    (o commit fica com a rota). Retorna as notificações gravadas, para serem
+    repassadas às salas do Socket.IO junto com o evento da rota.
+    """
+    notifications = [n for n in notifications if n]
+    if not notifications:
+        return []
+
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    rows = []
+    params = []
+    for notification in notifications:
+        notification.update({'timestamp': timestamp, 'is_read': 0})
+        rows.append(f'({placeholder}, {placeholder}, {placeholder}, 0, {placeholder})')
+        params.extend([notification['message'], timestamp, notification['related_commission_id'], notification['user_id']])
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f'INSERT INTO notifications (message, timestamp, related_commission_id, is_read, user_id) VALUES {", ".join(rows)}',
+        tuple(params)
+    )
+    cursor.close()
+    return notifications
+
+
+def for_admins(notifications):
+    return [n for n in notifications or [] if n['user_id'] is None]
+
+
+def for_user(notifications, user_id):
+    return [n for n in notifications or [] if user_id and n['user_id'] == user_id]
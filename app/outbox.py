@@ -0,0 +1,296 @@
+# Arquivo: app/outbox.py
+
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from .utils import get_db_connection
+
+# Fila persistente de envios externos. As rotas gravam a mensagem na tabela
+# 'outbox' na mesma transação da escrita principal e respondem na hora; um
+# worker em segundo plano (green thread do eventlet) faz a entrega, com novas
+# tentativas e limite de frequência por destino. O limite fica na tabela
+# 'outbox_rate_limits', compartilhada por todos os processos, e é reservado na
+# mesma transação que reserva a mensagem. Cada canal pertence a um
+# worker ('default' se não indicado): canais lentos, como a geração de imagens,
+# têm o seu próprio e não atrasam as notificações do Telegram.
+
+
+def _env_number(name, default, cast=float):
+    try:
+        return cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+MAX_ATTEMPTS = _env_number('OUTBOX_MAX_ATTEMPTS', 8, int)
+BACKOFF_BASE = _env_number('OUTBOX_BACKOFF_BASE', 5)
+BACKOFF_MAX = _env_number('OUTBOX_BACKOFF_MAX', 3600)
+POLL_INTERVAL = _env_number('OUTBOX_POLL_INTERVAL', 5)
+# Tempo de reserva de uma mensagem em entrega. Se o worker morrer no meio do
+# envio, a mensagem volta para a fila quando a reserva expira.
+LEASE_SECONDS = _env_number('OUTBOX_LEASE_SECONDS', 60)
+BATCH_SIZE = 20
+
+
+class DeliveryError(Exception):
+    """
+    Falha de entrega. 'retry_after' (segundos) sobrescreve o backoff padrão;
+    'permanent' indica que tentar de novo não adianta.
+    """
+
+    def __init__(self, message, retry_after=None, permanent=False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.permanent = permanent
+
+
+_handlers = {}
+_min_intervals = {}
+_workers = {}
+_wake = {}
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    'enqueued': 0,
+    'delivered': 0,
+    'retried': 0,
+    'failed': 0,
+    'rate_limited': 0,
+    'delivery_time_total': 0.0,
+    'last_error': None,
+    'last_delivery_at': None,
+}
+
+
+def register_handler(channel, handler, min_interval=0, worker='default'):
+    """
+    Registra a função de entrega de um canal: handler(destination, payload),
+    que deve levantar DeliveryError em caso de falha. 'min_interval' é o
+    intervalo mínimo, em segundos, entre dois envios para o mesmo destino.
+    'worker' é o nome do worker que entrega o canal; canais de workers
+    diferentes são processados em paralelo.
+    """
+    _handlers[channel] = handler
+    _min_intervals[channel] = min_interval
+    _workers[channel] = worker
+    _wake.setdefault(worker, threading.Event())
+
+
+def _count(key, amount=1):
+    with _metrics_lock:
+        _metrics[key] += amount
+
+
+def enqueue(conn, channel, destination, payload):
+    """
+    Grava uma mensagem na fila usando a transação do chamador.
+    Depois do commit, chame 'wake_worker()' para entregá-la sem esperar o próximo ciclo.
+    """
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    cursor.execute(
+        f'INSERT INTO outbox (channel, destination, payload, status, attempts, next_attempt_at, created_at) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})',
+        (channel, destination, json.dumps(payload), 'pending', 0, time.time(), datetime.now().isoformat())
+    )
+    cursor.close()
+    _count('enqueued')
+
+
+def wake_worker():
+    start_worker()
+    for event in _wake.values():
+        event.set()
+
+
+def start_worker():
+    """Inicia os workers de entrega deste processo (uma vez por processo, inclusive após um fork)."""
+    global _worker_pid
+    if os.environ.get('OUTBOX_WORKER', '1') == '0':
+        return
+    pid = os.getpid()
+    if _worker_pid == pid:
+        return
+    with _worker_lock:
+        if _worker_pid == pid:
+            return
+        _worker_pid = pid
+        # Garante que os entregadores dos canais estejam registrados antes de
+        # saber quais workers existem.
+        from . import telegram_utils, images
+        from app import socketio
+        for worker in sorted(_wake):
+            socketio.start_background_task(_run_worker, worker)
+
+
+def _run_worker(worker):
+    print(f"Worker '{worker}' da outbox iniciado (pid {os.getpid()}).")
+    wake = _wake[worker]
+    while True:
+        try:
+            delay = process_due(worker)
+        except Exception as e:
+            print(f"!!! ERRO no worker '{worker}' da outbox: {e}")
+            delay = POLL_INTERVAL
+        wake.wait(delay)
+        wake.clear()
+
+
+def _backoff(attempts):
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _reserve_rate(cursor, placeholder, channel, destination, allowed_at, free_at=None):
+    """
+    Grava até quando o destino fica bloqueado. Com 'free_at', só reserva se o
+    destino já estiver livre nesse instante (retorna False se outro processo
+    chegou antes); sem ele, só estende um bloqueio existente, nunca o encurta.
+    """
+    if free_at is not None:
+        condition, params = f'outbox_rate_limits.next_allowed_at <= {placeholder}', (free_at,)
+    else:
+        condition, params = 'outbox_rate_limits.next_allowed_at < excluded.next_allowed_at', ()
+    cursor.execute(
+        f'''INSERT INTO outbox_rate_limits (channel, destination, next_allowed_at) VALUES ({placeholder}, {placeholder}, {placeholder})
+            ON CONFLICT (channel, destination) DO UPDATE SET next_allowed_at = excluded.next_allowed_at WHERE {condition}''',
+        (channel, destination or '', allowed_at) + params
+    )
+    return cursor.rowcount == 1
+
+
+def process_due(worker='default'):
+    """
+    Entrega as mensagens vencidas dos canais do worker 'worker'. Retorna em
+    quantos segundos o worker deve olhar a fila de novo.
+    """
+    channels = tuple(channel for channel, name in _workers.items() if name == worker)
+    if not channels:
+        return POLL_INTERVAL
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    next_check = POLL_INTERVAL
+
+    try:
+        now = time.time()
+        channel_placeholders = ', '.join([placeholder] * len(channels))
+        cursor.execute(
+            f'''SELECT o.id, o.channel, o.destination, o.payload, o.attempts, r.next_allowed_at
+                FROM outbox o LEFT JOIN outbox_rate_limits r ON r.channel = o.channel AND r.destination = COALESCE(o.destination, '')
+                WHERE o.status = 'pending' AND o.next_attempt_at <= {placeholder} AND o.channel IN ({channel_placeholders})
+                ORDER BY o.id LIMIT {BATCH_SIZE}''',
+            (now,) + channels
+        )
+        rows = cursor.fetchall()
+        conn.commit()
+
+        for row in rows:
+            channel, destination = row['channel'], row['destination']
+            min_interval = _min_intervals.get(channel, 0)
+            wait = (row['next_allowed_at'] or 0) - time.time()
+            if wait > 0:
+                _count('rate_limited')
+                next_check = min(next_check, wait)
+                continue
+
+            # Reserva a mensagem; se outro worker já a pegou, ou se o destino foi
+            # bloqueado depois do SELECT, o UPDATE não altera nenhuma linha.
+            now = time.time()
+            cursor.execute(
+                f'''UPDATE outbox SET attempts = attempts + 1, next_attempt_at = {placeholder}
+                    WHERE id = {placeholder} AND status = 'pending' AND next_attempt_at <= {placeholder}
+                    AND NOT EXISTS (SELECT 1 FROM outbox_rate_limits r WHERE r.channel = outbox.channel
+                                    AND r.destination = COALESCE(outbox.destination, '') AND r.next_allowed_at > {placeholder})''',
+                (now + LEASE_SECONDS, row['id'], now, now)
+            )
+            claimed = cursor.rowcount == 1
+            # Na mesma transação, reserva o intervalo do destino. Se outro processo
+            # reservou o mesmo destino ao mesmo tempo, só um dos dois segue.
+            if claimed and min_interval:
+                claimed = _reserve_rate(cursor, placeholder, channel, destination, now + min_interval, free_at=now)
+            if claimed:
+                conn.commit()
+            else:
+                conn.rollback()
+                if min_interval:
+                    next_check = min(next_check, min_interval)
+                continue
+
+            attempts = row['attempts'] + 1
+            handler = _handlers.get(channel)
+            started = time.monotonic()
+            try:
+                if handler is None:
+                    raise DeliveryError(f"Canal '{channel}' sem entregador registrado.", permanent=True)
+                handler(destination, json.loads(row['payload']))
+            except Exception as e:
+                retry_after = getattr(e, 'retry_after', None)
+                permanent = getattr(e, 'permanent', False) or attempts >= MAX_ATTEMPTS
+                if retry_after:
+                    # O destino pediu uma pausa (HTTP 429): vale para todos os processos.
+                    _reserve_rate(cursor, placeholder, channel, destination, time.time() + retry_after)
+                with _metrics_lock:
+                    _metrics['last_error'] = str(e)
+                if permanent:
+                    cursor.execute(
+                        f"UPDATE outbox SET status = 'failed', last_error = {placeholder} WHERE id = {placeholder}",
+                        (str(e), row['id'])
+                    )
+                    _count('failed')
+                    print(f"!!! ERRO: mensagem #{row['id']} da outbox descartada após {attempts} tentativa(s): {e}")
+                else:
+                    delay = retry_after if retry_after else _backoff(attempts)
+                    cursor.execute(
+                        f'UPDATE outbox SET next_attempt_at = {placeholder}, last_error = {placeholder} WHERE id = {placeholder}',
+                        (time.time() + delay, str(e), row['id'])
+                    )
+                    _count('retried')
+                    print(f">>> AVISO: falha ao entregar a mensagem #{row['id']} da outbox ({e}). Nova tentativa em {delay:.0f}s.")
+                conn.commit()
+                continue
+
+            cursor.execute(
+                f"UPDATE outbox SET status = 'sent', sent_at = {placeholder}, last_error = NULL WHERE id = {placeholder}",
+                (datetime.now().isoformat(), row['id'])
+            )
+            conn.commit()
+            with _metrics_lock:
+                _metrics['delivered'] += 1
+                _metrics['delivery_time_total'] += time.monotonic() - started
+                _metrics['last_delivery_at'] = datetime.now().isoformat()
+
+        if len(rows) == BATCH_SIZE:
+            next_check = 0
+    finally:
+        cursor.close()
+        conn.close()
+    return next_check
+
+
+def get_outbox_stats():
+    """Métricas de entrega deste processo e a contagem da fila por status (compartilhada)."""
+    with _metrics_lock:
+        stats = dict(_metrics)
+    delivered = stats.pop('delivery_time_total')
+    stats['avg_delivery_time'] = round(delivered / stats['delivered'], 6) if stats['delivered'] else None
+    stats['pid'] = os.getpid()
+    stats['worker_running'] = _worker_pid == os.getpid()
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT status, COUNT(*) AS total FROM outbox GROUP BY status')
+    stats['queue'] = {row['status']: row['total'] for row in cursor.fetchall()}
+    cursor.execute("SELECT MIN(created_at) AS oldest FROM outbox WHERE status = 'pending'")
+    row = cursor.fetchone()
+    stats['oldest_pending'] = row['oldest'] if row else None
+    cursor.close()
+    conn.close()
+    return stats
@@ -0,0 +1,63 @@
+# Arquivo: app/passwords.py
+
+import os
+import threading
+from werkzeug.security import generate_password_hash, check_password_hash
+from .blocking import run_blocking
+
+# Hash de senhas fora do loop do eventlet. O PBKDF2/scrypt do Werkzeug ocupa a
+# CPU por centenas de milissegundos; rodando direto na requisição, ele congela
+# todas as green threads do worker (inclusive as conexões do Socket.IO). Aqui o
+# cálculo vai para o tpool, com um limite de cálculos simultâneos para que uma
+# rajada de logins não ocupe todas as threads nativas.
+
+# Método no formato do Werkzeug ('scrypt', 'scrypt:32768:8:1', 'pbkdf2:sha256:600000', ...).
+HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+MAX_CONCURRENT_HASHES = max(int(os.environ.get('PASSWORD_HASH_CONCURRENCY', '2')), 1)
+
+_slots = threading.BoundedSemaphore(MAX_CONCURRENT_HASHES)
+_method_prefix = None
+_dummy_hash = None
+
+
+def _run(func, *args):
+    with _slots:
+        return run_blocking(func, *args)
+
+
+def hash_password(password):
+    """Gera o hash de uma senha com o método configurado."""
+    return _run(generate_password_hash, password, HASH_METHOD)
+
+
+def _current_prefix():
+    """Parâmetros completos do método configurado (o trecho antes do primeiro '$' de um hash)."""
+    global _method_prefix, _dummy_hash
+    if _method_prefix is None:
+        _dummy_hash = hash_password('senha-de-referencia')
+        _method_prefix = _dummy_hash.split('$', 1)[0]
+    return _method_prefix
+
+
+def needs_rehash(password_hash):
+    return not password_hash or password_hash.split('$', 1)[0] != _current_prefix()
+
+
+def verify_password(password_hash, password):
+    """
+    Confere a senha. Retorna (ok, novo_hash): 'novo_hash' vem preenchido quando
+    a senha está correta mas foi gravada com outro método ou custo, e deve
+    substituir o hash salvo.
+    """
+    if password_hash is None:
+        # Usuário inexistente: faz o mesmo trabalho de uma senha errada, para
+        # que o tempo de resposta não revele quais nomes de usuário existem.
+        _current_prefix()
+        _run(check_password_hash, _dummy_hash, password)
+        return False, None
+
+    if not _run(check_password_hash, password_hash, password):
+        return False, None
+    if needs_rehash(password_hash):
+        return True, hash_password(password)
+    return True, None
@@ -0,0 +1,124 @@
+# Arquivo: app/portfolio.py
+
+import base64
+import json
+from .images import image_fields
+
+# Portfólio dos artistas. Uma obra da galeria pode ter dois artistas (lineart
+# e cor); a tabela 'gallery_artists' tem uma linha por (artista, obra), com a
+# data da obra copiada, então "as obras mais recentes do artista X" é uma
+# leitura direta do índice (artist_id, created_at, gallery_id) em vez de um
+# OR entre as duas colunas da galeria, que nenhum índice atende sozinho.
+
+DEFAULT_LIMIT = 24
+MAX_LIMIT = 100
+
+_ITEM_COLUMNS = ("g.id, g.title, g.image_url AS image, g.image_variants, g.image_placeholder, g.description, "
+                 "'fanart' AS type, ga.artist_id, ga.created_at AS sort_at")
+
+
+def rebuild_gallery_artists(cursor):
+    """
+    Recria os vínculos a partir das colunas da galeria (correção manual e
+    dados sintéticos). Retorna o número de vínculos.
+    """
+    cursor.execute('DELETE FROM gallery_artists')
+    cursor.execute('''
+        INSERT INTO gallery_artists (artist_id, gallery_id, created_at)
+        SELECT lineart_artist_id, id, created_at FROM gallery WHERE lineart_artist_id IS NOT NULL
+        UNION
+        SELECT color_artist_id, id, created_at FROM gallery WHERE color_artist_id IS NOT NULL
+    ''')
+    cursor.execute('SELECT COUNT(*) AS total FROM gallery_artists')
+    return cursor.fetchone()['total']
+
+
+def link_gallery_artists(conn, art_id, artist_ids):
+    """Grava os vínculos de uma obra recém-criada, na transação do chamador."""
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    for artist_id in sorted({int(a) for a in artist_ids if a}):
+        cursor.execute(
+            f'INSERT INTO gallery_artists (artist_id, gallery_id, created_at) SELECT {placeholder}, id, created_at FROM gallery WHERE id = {placeholder}',
+            (artist_id, art_id)
+        )
+    cursor.close()
+
+
+def unlink_gallery_artists(conn, art_id):
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    cursor.execute(f'DELETE FROM gallery_artists WHERE gallery_id = {placeholder}', (art_id,))
+    cursor.close()
+
+
+def encode_cursor(item):
+    raw = json.dumps([str(item['sort_at']), item['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor_value):
+    sort_at, art_id = json.loads(base64.urlsafe_b64decode(cursor_value.encode('ascii')))
+    return str(sort_at), int(art_id)
+
+
+def _to_item(row):
+    item = dict(row)
+    item.pop('sort_at')
+    item.update(image_fields(item.pop('image_variants'), item.pop('image_placeholder')))
+    return item
+
+
+def fetch_portfolios(conn, artist_ids, limit=None, cursors=None):
+    """
+    Obras de vários artistas em uma única consulta: um SELECT por artista,
+    cada um servido pelo índice e limitado a 'limit' + 1 linhas, unidos com
+    UNION ALL. 'cursors' mapeia artist_id -> cursor da página anterior.
+    Sem 'limit', devolve o portfólio inteiro.
+    Retorna {artist_id: {'items': [...], 'next_cursor': ...}}.
+    """
+    artist_ids = list(dict.fromkeys(int(a) for a in artist_ids))
+    portfolios = {artist_id: {'items': [], 'next_cursor': None} for artist_id in artist_ids}
+    if not artist_ids:
+        return portfolios
+
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursors = cursors or {}
+
+    branches, params = [], []
+    for index, artist_id in enumerate(artist_ids):
+        condition = f'ga.artist_id = {placeholder}'
+        params.append(artist_id)
+        after = cursors.get(artist_id)
+        if after:
+            condition += f' AND (ga.created_at < {placeholder} OR (ga.created_at = {placeholder} AND ga.gallery_id < {placeholder}))'
+            params.extend([after[0], after[0], after[1]])
+        limit_clause = ''
+        if limit:
+            limit_clause = f' LIMIT {placeholder}'
+            params.append(limit + 1)
+        branches.append(
+            f'SELECT * FROM (SELECT {_ITEM_COLUMNS} FROM gallery_artists ga JOIN gallery g ON g.id = ga.gallery_id '
+            f'WHERE {condition} ORDER BY ga.created_at DESC, ga.gallery_id DESC{limit_clause}) AS p{index}'
+        )
+
+    cursor = conn.cursor()
+    # A ordem entre ramos do UNION ALL não é garantida; ela é refeita abaixo.
+    cursor.execute(' UNION ALL '.join(branches), tuple(params))
+    rows = cursor.fetchall()
+    cursor.close()
+
+    grouped = {artist_id: [] for artist_id in artist_ids}
+    for row in rows:
+        grouped[row['artist_id']].append(row)
+    for artist_id, artist_rows in grouped.items():
+        artist_rows.sort(key=lambda r: (str(r['sort_at']), r['id']), reverse=True)
+        has_more = bool(limit) and len(artist_rows) > limit
+        page = artist_rows[:limit] if limit else artist_rows
+        portfolios[artist_id]['items'] = [_to_item(row) for row in page]
+        if has_more:
+            portfolios[artist_id]['next_cursor'] = encode_cursor(page[-1])
+    return portfolios
@@ -1,16 +1,23 @@
 # --- Código modificado para: app/public/routes.py ---
 
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
-from app.utils import get_db_connection, add_notification
-from app import socketio
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, send_from_directory
+from app.utils import get_db_connection
+from app.cache import get_site_settings
+from app.search import index_document
+from app.realtime import emit_to_admins
+from app.notifications import notify, admin_notification
 import json
-from app.telegram_utils import send_telegram_message
+from app.telegram_utils import queue_telegram_message
+from app.outbox import wake_worker
+from app.http_cache import cached_page
+from app.images import MEDIA_DIR, image_fields
 
 # Cria o Blueprint para as rotas públicas (MODIFICADO: 'template_folder' removido)
 public_bp = Blueprint('public', __name__)
 
 
 @public_bp.route('/')
+@cached_page('gallery', 'profiles')
 def home():
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -19,6 +26,7 @@ def home():
     query = """
         SELECT 
             g.id, g.title, g.description, g.image_url, g.is_nsfw,
+            g.image_variants, g.image_placeholder,
             g.lineart_artist_id, g.color_artist_id,
             u1.username AS lineart_artist_name,
             u1.social_links AS lineart_artist_socials,
@@ -51,6 +59,9 @@ def home():
             art['color_artist_socials'] = json.loads(art['color_artist_socials']) if art['color_artist_socials'] else []
         except (json.JSONDecodeError, TypeError):
             art['color_artist_socials'] = []
+
+        # Miniaturas (srcset por formato) e placeholder, quando já foram gerados
+        art['image'] = image_fields(art.pop('image_variants'), art.pop('image_placeholder'))
             
         arts.append(art)
 
@@ -58,19 +69,17 @@ def home():
 
 
 @public_bp.route('/artistas')
+@cached_page('profiles')
 def artistas():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT key, value FROM settings')
-    settings_db = cursor.fetchall()
-    settings = {row['key']: row['value'] for row in settings_db}
+    settings = get_site_settings()
     site_mode = settings.get('site_mode', 'individual')
     
     artists = []
     main_artist_profile = None
 
     if site_mode == 'studio':
+        conn = get_db_connection()
+        cursor = conn.cursor()
         cursor.execute(
             'SELECT username, artist_avatar, artist_portfolio_description, artist_specialties, social_links, artist_bio FROM users WHERE is_admin = TRUE AND is_public_artist = TRUE'
         )
@@ -89,11 +98,11 @@ def artistas():
                 artist_dict['social_links'] = []
 
             artists.append(artist_dict)
+
+        cursor.close()
+        conn.close()
     else:
         return redirect(url_for('public.sobre'))
-
-    cursor.close()
-    conn.close()
     
     return render_template('artistas.html', 
                            artists=artists, 
@@ -101,15 +110,13 @@ def artistas():
                            settings=settings)
 
 @public_bp.route('/sobre')
+@cached_page('profiles')
 def sobre():
     """ Rota 'Sobre' para o modo individual. """
+    settings = get_site_settings()
+
     conn = get_db_connection()
     cursor = conn.cursor()
-
-    cursor.execute('SELECT key, value FROM settings')
-    settings_db = cursor.fetchall()
-    settings = {row['key']: row['value'] for row in settings_db}
-
     cursor.execute('SELECT * FROM users WHERE id = 1')
     main_artist_db = cursor.fetchone()
     main_artist_profile = None
@@ -130,6 +137,7 @@ def sobre():
 
 # --- INÍCIO DA MODIFICAÇÃO: Nova rota para comissões do artista ---
 @public_bp.route('/artista/<string:username>/comissoes')
+@cached_page('profiles', 'services')
 def comissoes_artista(username):
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -170,6 +178,7 @@ def comissoes_artista(username):
 
 
 @public_bp.route('/contato')
+@cached_page()
 def contato():
     return render_template('contato.html')
 
@@ -191,32 +200,36 @@ def handle_contact_form():
         is_postgres = hasattr(conn, 'cursor_factory')
         placeholder = '%s' if is_postgres else '?'
         
-        query_insert = f'INSERT INTO contact_messages (sender_name, sender_email, message_content) VALUES ({placeholder}, {placeholder}, {placeholder})'
+        query_insert = f'INSERT INTO contact_messages (sender_name, sender_email, message_content) VALUES ({placeholder}, {placeholder}, {placeholder})' + (' RETURNING id' if is_postgres else '')
         cursor.execute(query_insert, (name, email, message))
-        
-        keys_to_fetch = ['TELEGRAM_ENABLED', 'TELEGRAM_TEMPLATE_CONTACT']
-        placeholders_settings = ','.join([placeholder] * len(keys_to_fetch))
-        query_settings = f"SELECT key, value FROM settings WHERE key IN ({placeholders_settings})"
-        cursor.execute(query_settings, tuple(keys_to_fetch))
-        settings_db = cursor.fetchall()
-        
-        settings = {row['key']: row['value'] for row in settings_db}
-        
+        message_id = cursor.fetchone()['id'] if is_postgres else cursor.lastrowid
+        index_document(conn, 'message', message_id, f'{name} · {email}', message)
+
+        # O aviso no Telegram vai para a outbox na mesma transação; o envio acontece em segundo plano.
+        telegram_queued = False
+        settings = get_site_settings()
+        if settings.get('TELEGRAM_ENABLED') == 'true':
+            template = settings.get('TELEGRAM_TEMPLATE_CONTACT')
+            if template:
+                try:
+                    message_body = template.format(name=name, email=email, message=message)
+                    telegram_queued = queue_telegram_message(conn, message_body)
+                except (KeyError, IndexError, ValueError) as e:
+                    # Um template inválido não pode impedir que a mensagem de contato seja salva.
+                    print(f"!!! ERRO no template de contato do Telegram: {e}")
+
+        notification_message = f"Nova mensagem de contato de {name}."
+        notifications = notify(conn, [admin_notification(notification_message)])
+
         conn.commit()
         cursor.close()
         conn.close()
+        if telegram_queued:
+            wake_worker()
         
-        notification_message = f"Nova mensagem de contato de {name}."
-        add_notification(notification_message)
-        socketio.emit('new_message', {
+        emit_to_admins('new_message', {
             'message_for_admin': notification_message
-        })
-
-        if settings.get('TELEGRAM_ENABLED') == 'true':
-            template = settings.get('TELEGRAM_TEMPLATE_CONTACT')
-            if template:
-                message_body = template.format(name=name, email=email, message=message)
-                send_telegram_message(message_body)
+        }, notifications=notifications)
         
         return jsonify({'success': True, 'message': 'Mensagem enviada com sucesso! Entraremos em contato em breve.'})
     
@@ -224,6 +237,11 @@ def handle_contact_form():
         print(f"Erro ao processar mensagem de contato: {e}")
         return jsonify({'success': False, 'message': 'Ocorreu um erro no servidor ao tentar enviar sua mensagem.'}), 500
 
+@public_bp.route('/media/<path:filename>')
+def media(filename):
+    """Derivados das imagens da galeria. O nome de cada arquivo muda junto com o conteúdo."""
+    return send_from_directory(MEDIA_DIR, filename, max_age=31536000)
+
 @public_bp.route('/ping')
 def ping():
     """Endpoint leve apenas para verificar se o servidor está no ar."""
@@ -0,0 +1,210 @@
+# Arquivo: app/query_stats.py
+
+import os
+import re
+import threading
+import time
+import warnings
+from collections import Counter, deque
+from flask import current_app, g, has_request_context, request, session
+from .metrics import DB_QUERIES_PER_REQUEST, observe_query
+
+# Instrumentação das consultas SQL por requisição. Os cursores entregues por
+# get_db_connection() passam por InstrumentedCursor, que mede cada execute e
+# anota em 'g' a quantidade de consultas, o tempo total, a mais lenta e quantas
+# vezes cada formato de consulta se repetiu. No fim da requisição:
+#
+# - o cabeçalho Server-Timing leva o tempo gasto no banco (visível no DevTools),
+#   só em modo debug, para administradores logados ou com SERVER_TIMING=on,
+#   e só quando houve consulta; para os demais visitantes ele revelaria quanto
+#   trabalho cada rota faz;
+# - consultas acima de SLOW_QUERY_MS vão para o log de consultas lentas;
+# - em modo debug/teste, uma requisição acima de QUERY_BUDGET consultas, ou com
+#   a mesma consulta repetida QUERY_REPEAT_THRESHOLD vezes (o padrão N+1 de um
+#   SELECT dentro de um laço), gera um QueryBudgetWarning.
+
+ENABLED = os.environ.get('QUERY_STATS', 'on').lower() not in ('off', '0', 'false')
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+QUERY_BUDGET = int(os.environ.get('QUERY_BUDGET', '30'))
+REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', '5'))
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'off').lower() in ('on', '1', 'true')
+SLOW_LOG_SIZE = 50
+
+_lock = threading.Lock()
+_slow_log = deque(maxlen=SLOW_LOG_SIZE)
+_totals = {'requests': 0, 'queries': 0, 'slow_queries': 0, 'over_budget': 0, 'repeated_patterns': 0}
+
+
+class QueryBudgetWarning(UserWarning):
+    """A requisição fez consultas demais ou repetiu a mesma consulta em um laço."""
+
+
+_WHITESPACE = re.compile(r'\s+')
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def normalize_sql(sql):
+    """
+    Formato da consulta, sem os valores: literais e placeholders viram '?' e
+    listas de IN com tamanhos diferentes ficam iguais. Duas execuções com o
+    mesmo formato são a mesma consulta repetida.
+    """
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    sql = _STRINGS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql).replace('%s', '?')
+    return _PLACEHOLDER_LISTS.sub('(?...)', sql)
+
+
+class RequestQueryStats:
+    """Consultas de uma requisição."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_sql = None
+        self.patterns = Counter()
+
+    def record(self, sql, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_sql = sql
+        self.patterns[normalize_sql(sql)] += 1
+
+    def repeated(self):
+        """Formatos executados pelo menos REPEAT_THRESHOLD vezes, do mais repetido ao menos."""
+        return [(sql, n) for sql, n in self.patterns.most_common() if n >= REPEAT_THRESHOLD]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'slowest_ms': round(self.slowest_ms, 3),
+            'slowest_sql': self.slowest_sql,
+            'repeated': [{'sql': sql, 'count': n} for sql, n in self.repeated()],
+        }
+
+
+def get_request_query_stats():
+    """Estatísticas da requisição atual (None fora de uma requisição)."""
+    if not has_request_context():
+        return None
+    stats = g.get('_query_stats')
+    if stats is None:
+        stats = g._query_stats = RequestQueryStats()
+    return stats
+
+
+def _record(sql, elapsed):
+    elapsed_ms = elapsed * 1000
+    sql = sql if isinstance(sql, str) else str(sql)
+    observe_query(sql, elapsed)
+    stats = get_request_query_stats()
+    if stats is not None:
+        stats.record(sql, elapsed_ms)
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        where = f'{request.method} {request.path}' if has_request_context() else 'fora de requisição'
+        with _lock:
+            _totals['slow_queries'] += 1
+            _slow_log.append({'ms': round(elapsed_ms, 3), 'where': where, 'sql': normalize_sql(sql), 'at': time.time()})
+        print(f"[SQL lenta] {elapsed_ms:.1f} ms ({where}): {normalize_sql(sql)[:500]}")
+
+
+class InstrumentedCursor:
+    """Cursor que mede o tempo de cada execute/executemany e repassa todo o resto."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, method, sql, args):
+        started = time.perf_counter()
+        try:
+            method(sql, *args)
+        finally:
+            _record(sql, time.perf_counter() - started)
+        return self
+
+    def execute(self, sql, *args):
+        return self._timed(self._cursor.execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return self._timed(self._cursor.executemany, sql, args)
+
+
+def instrument_cursor(cursor):
+    return InstrumentedCursor(cursor) if ENABLED else cursor
+
+
+def _server_timing(response):
+    stats = g.pop('_query_stats', None)
+    if stats is None:
+        return response
+
+    # Só consulta a sessão se a rota já a leu: ler aqui faria o Flask mandar
+    # 'Vary: Cookie' em toda resposta, inclusive /static e /media, e os caches
+    # compartilhados passariam a guardar uma cópia por cookie.
+    show = SERVER_TIMING or current_app.debug or (session.accessed and session.get('is_admin'))
+    if show and stats.count:
+        app_ms = (time.perf_counter() - stats.started) * 1000
+        timing = f'db;dur={stats.total_ms:.2f};desc="{stats.count} consultas", app;dur={app_ms:.2f}'
+        existing = response.headers.get('Server-Timing')
+        response.headers['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+    DB_QUERIES_PER_REQUEST.observe(stats.count)
+    repeated = stats.repeated()
+    over_budget = stats.count > QUERY_BUDGET
+    with _lock:
+        _totals['requests'] += 1
+        _totals['queries'] += stats.count
+        _totals['over_budget'] += over_budget
+        _totals['repeated_patterns'] += len(repeated)
+
+    if current_app.debug or current_app.testing:
+        where = f'{request.method} {request.path}'
+        if over_budget:
+            warnings.warn(QueryBudgetWarning(
+                f'{where} fez {stats.count} consultas (orçamento: {QUERY_BUDGET}); '
+                f'mais lenta ({stats.slowest_ms:.1f} ms): {normalize_sql(stats.slowest_sql)[:200]}'
+            ))
+        for sql, n in repeated:
+            warnings.warn(QueryBudgetWarning(f'{where} repetiu {n}x a mesma consulta (possível N+1): {sql[:200]}'))
+    return response
+
+
+def init_app(app):
+    """Registra o cabeçalho Server-Timing e as checagens de orçamento no fim de cada requisição."""
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _start_query_stats():
+        # Começa a contar o tempo da requisição antes da primeira consulta.
+        get_request_query_stats()
+
+    app.after_request(_server_timing)
+
+
+def get_query_stats():
+    """Totais deste worker e as últimas consultas lentas, para monitoramento."""
+    with _lock:
+        return {
+            'enabled': ENABLED,
+            'slow_query_ms': SLOW_QUERY_MS,
+            'query_budget': QUERY_BUDGET,
+            'repeat_threshold': REPEAT_THRESHOLD,
+            'totals': dict(_totals),
+            'slow_queries': list(reversed(_slow_log)),
+            'pid': os.getpid(),
+        }
@@ -0,0 +1,137 @@
+# Arquivo: app/realtime.py
+
+from flask import session
+from flask_socketio import join_room, leave_room
+from app import socketio
+from .metrics import SOCKETIO_CLIENTS, count_socket_event
+from .utils import get_db_connection
+from .notifications import for_admins, for_user
+
+# Salas do Socket.IO:
+# - 'admins': todas as abas de administradores; recebem os eventos de todos os pedidos.
+# - 'user_<id>': todas as abas de um usuário logado; recebem os eventos dos próprios pedidos.
+# - 'commission_<id>': abas de clientes que estão vendo um pedido específico.
+ADMIN_ROOM = 'admins'
+
+
+def user_room(user_id):
+    return f'user_{user_id}'
+
+
+def commission_room(commission_id):
+    return f'commission_{commission_id}'
+
+
+def _client_kind():
+    if session.get('is_admin'):
+        return 'admin'
+    return 'client' if session.get('user_id') else 'anonymous'
+
+
+def _emit(event, data, to):
+    count_socket_event(event)
+    socketio.emit(event, data, to=to)
+
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    """Coloca a conexão nas salas do usuário da sessão. Visitantes anônimos não entram em nenhuma sala."""
+    SOCKETIO_CLIENTS.labels(_client_kind()).inc()
+    user_id = session.get('user_id')
+    if not user_id:
+        return
+    join_room(user_room(user_id))
+    if session.get('is_admin'):
+        join_room(ADMIN_ROOM)
+
+
+@socketio.on('disconnect')
+def handle_disconnect(reason=None):
+    SOCKETIO_CLIENTS.labels(_client_kind()).dec()
+
+
+@socketio.on('join_commission')
+def handle_join_commission(data):
+    count_socket_event('join_commission', 'in')
+    commission_id = (data or {}).get('commission_id')
+    user_id = session.get('user_id')
+    if not commission_id or not user_id:
+        return {'success': False, 'message': 'Acesso negado.'}
+
+    # Administradores já recebem todos os pedidos pela sala 'admins'.
+    if session.get('is_admin'):
+        return {'success': True}
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor.execute(f'SELECT 1 FROM comissoes WHERE id = {placeholder} AND client_id = {placeholder}', (commission_id, user_id))
+    allowed = cursor.fetchone() is not None
+    cursor.close()
+    conn.close()
+
+    if not allowed:
+        return {'success': False, 'message': 'Acesso negado.'}
+    join_room(commission_room(commission_id))
+    return {'success': True}
+
+
+@socketio.on('leave_commission')
+def handle_leave_commission(data):
+    count_socket_event('leave_commission', 'in')
+    commission_id = (data or {}).get('commission_id')
+    if commission_id:
+        leave_room(commission_room(commission_id))
+
+
+def emit_commission_update(commission_id, client_id=None, changes=None, comments=None, events=None, previews=None,
+                           created=False, deleted=False, notifications=None, message_for_admin=None, message_for_client=None):
+    """
+    Envia 'commission_updated' apenas para quem pode ver o pedido: a sala dos
+    administradores, as abas do cliente dono e quem está vendo o pedido.
+    O evento carrega só o que mudou, para que as abas apliquem a alteração
+    localmente em vez de recarregar a lista inteira:
+      - 'changes': colunas alteradas e seus novos valores;
+      - 'append': itens novos de 'comments', 'event_log' e 'preview';
+      - 'created' / 'deleted': o pedido foi criado ou removido;
+      - 'notifications': as notificações gravadas para quem recebe o evento,
+        para que o contador seja atualizado sem nova consulta.
+    """
+    payload = {'commission_id': commission_id, 'changes': changes or {}, 'created': created, 'deleted': deleted}
+    append = {}
+    for key, items in (('comments', comments), ('event_log', events), ('preview', previews)):
+        # 'add_event_to_log' devolve None quando falha; esses itens não existem no banco.
+        items = [item for item in (items or []) if item]
+        if items:
+            append[key] = items
+    if append:
+        payload['append'] = append
+
+    admin_payload = dict(payload)
+    if message_for_admin:
+        admin_payload['message_for_admin'] = message_for_admin
+    admin_notifications = for_admins(notifications)
+    if admin_notifications:
+        admin_payload['notifications'] = admin_notifications
+    _emit('commission_updated', admin_payload, ADMIN_ROOM)
+
+    client_rooms = [commission_room(commission_id)]
+    if client_id:
+        client_rooms.append(user_room(client_id))
+    client_payload = dict(payload)
+    client_notifications = for_user(notifications, client_id)
+    if client_notifications:
+        client_payload['notifications'] = client_notifications
+        message_for_client = message_for_client or client_notifications[-1]['message']
+    if message_for_client:
+        client_payload['message_for_client'] = message_for_client
+    _emit('commission_updated', client_payload, client_rooms)
+
+
+def emit_to_admins(event, data, notifications=None):
+    """Eventos exclusivos do painel (ex.: mensagens de contato) vão só para a sala dos administradores."""
+    admin_notifications = for_admins(notifications)
+    if admin_notifications:
+        data = dict(data, notifications=admin_notifications)
+    _emit(event, data, ADMIN_ROOM)
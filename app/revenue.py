@@ -0,0 +1,83 @@
+# Arquivo: app/revenue.py
+
+# Agregado diário da receita dos pedidos concluídos, por dia, tipo e cliente.
+# É mantido junto com cada escrita que muda o status (ou o valor) de um
+# pedido concluído, então os relatórios leem poucas linhas já somadas em vez
+# de percorrer todos os pedidos.
+
+_SNAPSHOT_FIELDS = ('status', 'date', 'type', 'client', 'price')
+
+
+def revenue_snapshot(conn, commission_id):
+    """
+    Lê os campos do pedido que afetam a receita. No PostgreSQL a linha fica
+    travada até o fim da transação, para que duas escritas simultâneas não
+    contem o mesmo pedido duas vezes.
+    """
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    lock = ' FOR UPDATE' if is_postgres else ''
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT {", ".join(_SNAPSHOT_FIELDS)} FROM comissoes WHERE id = {placeholder}{lock}', (commission_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    return {key: row[key] for key in _SNAPSHOT_FIELDS} if row else None
+
+
+def snapshot_from_row(row):
+    """O mesmo que revenue_snapshot(), a partir de uma linha de 'comissoes' já lida (SELECT *)."""
+    return {key: row[key] for key in _SNAPSHOT_FIELDS} if row else None
+
+
+def _apply(conn, snapshot, sign):
+    if not snapshot or snapshot['status'] != 'completed' or not snapshot['date']:
+        return
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    cursor.execute(
+        f'''INSERT INTO revenue_daily (day, type, client, total, commissions) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
+            ON CONFLICT (day, type, client) DO UPDATE SET total = revenue_daily.total + excluded.total, commissions = revenue_daily.commissions + excluded.commissions''',
+        (snapshot['date'], snapshot['type'] or '', snapshot['client'] or '', sign * float(snapshot['price'] or 0), sign)
+    )
+    if sign < 0:
+        cursor.execute(
+            f'DELETE FROM revenue_daily WHERE day = {placeholder} AND type = {placeholder} AND client = {placeholder} AND commissions <= 0',
+            (snapshot['date'], snapshot['type'] or '', snapshot['client'] or '')
+        )
+    cursor.close()
+
+
+def update_revenue(conn, before, **changes):
+    """
+    Ajusta o agregado depois de uma alteração no pedido, na transação do chamador.
+    'before' é o revenue_snapshot de antes da escrita; 'changes' são os campos alterados.
+    """
+    if not before:
+        return
+    after = dict(before, **{key: value for key, value in changes.items() if key in _SNAPSHOT_FIELDS})
+    if before == after:
+        return
+    _apply(conn, before, -1)
+    _apply(conn, after, 1)
+
+
+def remove_revenue(conn, before):
+    """Retira do agregado um pedido que foi excluído."""
+    _apply(conn, before, -1)
+
+
+def rebuild_revenue(conn):
+    """Recalcula o agregado inteiro a partir da tabela 'comissoes' (correção manual). Retorna o número de linhas."""
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM revenue_daily')
+    cursor.execute('''
+        INSERT INTO revenue_daily (day, type, client, total, commissions)
+        SELECT date, COALESCE(type, ''), COALESCE(client, ''), SUM(COALESCE(price, 0)), COUNT(*)
+        FROM comissoes WHERE status = 'completed' AND date IS NOT NULL
+        GROUP BY date, COALESCE(type, ''), COALESCE(client, '')
+    ''')
+    cursor.execute('SELECT COUNT(*) AS total FROM revenue_daily')
+    rows = cursor.fetchone()['total']
+    cursor.close()
+    return rows
@@ -0,0 +1,262 @@
+# Arquivo: app/search.py
+
+import html
+import re
+from datetime import datetime
+
+# Busca textual do painel: pedidos (cliente, tipo e descrição), comentários,
+# eventos do histórico, mensagens de contato e nomes de usuário.
+#
+# Todos os documentos ficam em 'search_documents' (tipo, id de origem, pedido
+# relacionado, título e corpo). O índice depende do banco:
+# - SQLite: tabela FTS5 'search_fts' com conteúdo externo (os textos ficam só
+#   em 'search_documents'), ordenada por bm25;
+# - PostgreSQL: coluna gerada 'document' (tsvector) com índice GIN, ordenada
+#   por ts_rank_cd.
+#
+# As tabelas são criadas pela migração 12. O índice é mantido pelas próprias
+# escritas, na transação do chamador (ver index_document / remove_document /
+# remove_commission_documents), e pode ser refeito do zero com
+# rebuild_search_index().
+
+KINDS = ('commission', 'comment', 'event', 'message', 'user')
+TS_CONFIG = 'portuguese'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 8
+# A relevância é calculada entre as RANK_WINDOW ocorrências mais recentes.
+# Para termos raros isso não muda nada; para um termo presente em boa parte
+# dos documentos, evita pontuar centenas de milhares de linhas a cada busca.
+# As ocorrências mais antigas não somem: vêm depois da janela, por data.
+RANK_WINDOW = 2000
+
+# Marcadores dos trechos encontrados. Os textos são escapados antes de virarem
+# <mark>, para que um comentário com HTML não seja interpretado no painel.
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+_TERMS = re.compile(r'\w+', re.UNICODE)
+
+
+def _is_postgres(conn):
+    return hasattr(conn, 'cursor_factory')
+
+
+def rebuild_search_index(cursor, is_postgres):
+    """Recria todos os documentos a partir das tabelas de origem (correção manual e dados sintéticos)."""
+    if not is_postgres:
+        cursor.execute("INSERT INTO search_fts (search_fts) VALUES ('delete-all')")
+    cursor.execute('DELETE FROM search_documents')
+    separator = "' · '"
+    cursor.execute(f'''
+        INSERT INTO search_documents (kind, ref_id, commission_id, title, body, created_at)
+        SELECT 'commission', id, id, COALESCE(client, '') || {separator} || COALESCE(type, ''), COALESCE(description, ''), date FROM comissoes
+    ''')
+    cursor.execute('''
+        INSERT INTO search_documents (kind, ref_id, commission_id, title, body, created_at)
+        SELECT 'comment', CAST(id AS TEXT), commission_id, COALESCE(author, ''), COALESCE(text, ''), date FROM commission_comments
+    ''')
+    cursor.execute('''
+        INSERT INTO search_documents (kind, ref_id, commission_id, title, body, created_at)
+        SELECT 'event', CAST(id AS TEXT), commission_id, COALESCE(actor, ''), COALESCE(message, ''), timestamp FROM commission_events
+    ''')
+    cursor.execute(f'''
+        INSERT INTO search_documents (kind, ref_id, commission_id, title, body, created_at)
+        SELECT 'message', CAST(id AS TEXT), NULL, sender_name || {separator} || sender_email, message_content, CAST(received_at AS TEXT) FROM contact_messages
+    ''')
+    cursor.execute('''
+        INSERT INTO search_documents (kind, ref_id, commission_id, title, body, created_at)
+        SELECT 'user', CAST(id AS TEXT), NULL, username, '', CAST(created_at AS TEXT) FROM users
+    ''')
+    if not is_postgres:
+        cursor.execute("INSERT INTO search_fts (search_fts) VALUES ('rebuild')")
+    cursor.execute('SELECT COUNT(*) AS total FROM search_documents')
+    return cursor.fetchone()['total']
+
+
+def _remove_where(conn, condition, params):
+    cursor = conn.cursor()
+    if not _is_postgres(conn):
+        # Conteúdo externo: o FTS5 precisa dos valores antigos para apagar os termos.
+        cursor.execute(
+            f"INSERT INTO search_fts (search_fts, rowid, kind, title, body) SELECT 'delete', id, kind, title, body FROM search_documents WHERE {condition}",
+            params
+        )
+    cursor.execute(f'DELETE FROM search_documents WHERE {condition}', params)
+    cursor.close()
+
+
+def remove_document(conn, kind, ref_id):
+    placeholder = '%s' if _is_postgres(conn) else '?'
+    _remove_where(conn, f'kind = {placeholder} AND ref_id = {placeholder}', (kind, str(ref_id)))
+
+
+def remove_commission_documents(conn, commission_id):
+    """Remove o pedido e todo o seu histórico do índice."""
+    placeholder = '%s' if _is_postgres(conn) else '?'
+    _remove_where(conn, f'commission_id = {placeholder}', (commission_id,))
+
+
+def index_document(conn, kind, ref_id, title, body='', commission_id=None, created_at=None):
+    """Grava (ou substitui) um documento no índice, na transação do chamador."""
+    is_postgres = _is_postgres(conn)
+    placeholder = '%s' if is_postgres else '?'
+    values = (kind, str(ref_id), commission_id, title or '', body or '', created_at or datetime.now().isoformat())
+    cursor = conn.cursor()
+    if is_postgres:
+        cursor.execute(
+            f'''INSERT INTO search_documents (kind, ref_id, commission_id, title, body, created_at)
+                VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
+                ON CONFLICT (kind, ref_id) DO UPDATE SET commission_id = excluded.commission_id, title = excluded.title, body = excluded.body''',
+            values
+        )
+    else:
+        remove_document(conn, kind, ref_id)
+        cursor.execute(
+            f'INSERT INTO search_documents (kind, ref_id, commission_id, title, body, created_at) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})',
+            values
+        )
+        cursor.execute(
+            f'INSERT INTO search_fts (rowid, kind, title, body) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})',
+            (cursor.lastrowid, kind, values[3], values[4])
+        )
+    cursor.close()
+
+
+def index_new_documents(conn, documents):
+    """
+    Grava de uma vez documentos recém-criados, que ainda não estão no índice
+    (ex.: os eventos de uma transição de status), na transação do chamador.
+    'documents' é uma lista de (kind, ref_id, title, body, commission_id, created_at).
+    """
+    if not documents:
+        return
+    is_postgres = _is_postgres(conn)
+    placeholder = '%s' if is_postgres else '?'
+    row = '(' + ', '.join([placeholder] * 6) + ')'
+    params = []
+    for kind, ref_id, title, body, commission_id, created_at in documents:
+        params.extend((kind, str(ref_id), commission_id, title or '', body or '', created_at or datetime.now().isoformat()))
+    cursor = conn.cursor()
+    cursor.execute(
+        f'INSERT INTO search_documents (kind, ref_id, commission_id, title, body, created_at) VALUES {", ".join([row] * len(documents))}',
+        params
+    )
+    if not is_postgres:
+        # Um único INSERT no SQLite grava ids consecutivos, terminando em lastrowid.
+        last_id = cursor.lastrowid
+        cursor.execute(
+            f'INSERT INTO search_fts (rowid, kind, title, body) SELECT id, kind, title, body FROM search_documents WHERE id > {placeholder} AND id <= {placeholder}',
+            (last_id - len(documents), last_id)
+        )
+    cursor.close()
+
+
+def index_commission(conn, commission_id, client, type_, description):
+    index_document(conn, 'commission', commission_id, f'{client or ""} · {type_ or ""}', description, commission_id)
+
+
+def index_user(conn, user_id, username):
+    index_document(conn, 'user', user_id, username)
+
+
+def parse_terms(query):
+    """Palavras da busca, sem a sintaxe de cada banco; o texto digitado nunca vai cru para o MATCH."""
+    return _TERMS.findall(query.lower())[:MAX_TERMS]
+
+
+def _highlight(text):
+    text = html.escape(text or '')
+    return text.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def _search_postgres(cursor, terms, kinds, limit, offset, past_window):
+    kind_filter = f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})" if kinds else ''
+    headline = f'StartSel={_MARK_START}, StopSel={_MARK_END}'
+    ts_query = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+    if past_window:
+        # Além da janela: as ocorrências mais antigas, por data, sem pontuação.
+        page = f'''SELECT d.id, d.kind, d.ref_id, d.commission_id, d.title, d.body, d.created_at, 0 AS rank
+                FROM search_documents d, q
+                WHERE d.document @@ q.query{kind_filter} AND d.id < (SELECT MIN(id) FROM recent)
+                ORDER BY d.id DESC LIMIT %s OFFSET %s'''
+        page_params = (*kinds, limit, offset)
+    else:
+        page = '''SELECT d.id, d.kind, d.ref_id, d.commission_id, d.title, d.body, d.created_at, ts_rank_cd(d.document, q.query) AS rank
+                FROM search_documents d JOIN recent ON recent.id = d.id, q
+                ORDER BY rank DESC, d.id DESC LIMIT %s OFFSET %s'''
+        page_params = (limit, offset)
+    cursor.execute(f'''
+        WITH q AS (SELECT to_tsquery('{TS_CONFIG}', %s) AS query),
+        recent AS (
+            SELECT d.id FROM search_documents d, q
+            WHERE d.document @@ q.query{kind_filter}
+            ORDER BY d.id DESC LIMIT %s
+        ),
+        page AS ({page})
+        SELECT page.kind, page.ref_id, page.commission_id, page.created_at, page.rank,
+               ts_headline('{TS_CONFIG}', page.title, q.query, %s) AS title,
+               ts_headline('{TS_CONFIG}', page.body, q.query, %s) AS snippet
+        FROM page, q ORDER BY page.rank DESC, page.id DESC
+    ''', (ts_query, *kinds, RANK_WINDOW, *page_params,
+          f'HighlightAll=true, {headline}', f'MaxFragments=2, MaxWords=24, MinWords=8, {headline}'))
+    return cursor.fetchall()
+
+
+def _search_sqlite(cursor, terms, kinds, limit, offset, past_window):
+    # O tipo também é uma coluna do FTS5; as palavras buscadas ficam restritas a título e corpo.
+    phrases = [f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*']
+    match = '{title body} : (' + ' AND '.join(phrases) + ')'
+    if kinds:
+        match = '(' + ' OR '.join(f'kind : "{kind}"' for kind in kinds) + f') AND {match}'
+    window = 'SELECT MIN(rowid) FROM (SELECT rowid FROM search_fts WHERE search_fts MATCH ? ORDER BY rowid DESC LIMIT ?)'
+    if past_window:
+        # Além da janela: as ocorrências mais antigas, por data, sem pontuação.
+        condition, order = f'search_fts.rowid < ({window})', 'search_fts.rowid DESC'
+    else:
+        condition, order = f"search_fts.rank MATCH 'bm25(0.0, 10.0, 1.0)' AND search_fts.rowid >= ({window})", 'search_fts.rank'
+    cursor.execute(f'''
+        SELECT d.kind, d.ref_id, d.commission_id, d.created_at,
+               highlight(search_fts, 1, ?, ?) AS title, snippet(search_fts, 2, ?, ?, '…', 24) AS snippet
+        FROM search_fts JOIN search_documents d ON d.id = search_fts.rowid
+        WHERE search_fts MATCH ? AND {condition}
+        ORDER BY {order} LIMIT ? OFFSET ?
+    ''', (_MARK_START, _MARK_END, _MARK_START, _MARK_END, match, match, RANK_WINDOW, limit, offset))
+    return cursor.fetchall()
+
+
+def search(conn, query, kinds=None, limit=DEFAULT_LIMIT, offset=0):
+    """
+    Busca os documentos que contêm todas as palavras de 'query'. A última
+    palavra vale também como prefixo ('pedido retr' encontra 'retrato'), para
+    a busca enquanto se digita.
+
+    As RANK_WINDOW ocorrências mais recentes vêm primeiro, da mais relevante à
+    menos relevante; as mais antigas continuam depois delas, por data. Retorna
+    (itens, próximo_offset ou None, ranked); 'ranked' é False quando a página
+    já inclui ocorrências de fora da janela, que não foram ordenadas por relevância.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return [], None, True
+    kinds = [k for k in (kinds or []) if k in KINDS]
+    run = _search_postgres if _is_postgres(conn) else _search_sqlite
+    cursor = conn.cursor()
+
+    # Uma linha a mais que o pedido indica se existe próxima página.
+    rows = run(cursor, terms, kinds, limit + 1, offset, False) if offset < RANK_WINDOW else []
+    ranked_count = len(rows)
+    # A janela só tem continuação se estiver cheia; com menos ocorrências que
+    # RANK_WINDOW, todas já foram pontuadas e a consulta abaixo é desnecessária.
+    if len(rows) <= limit and (offset >= RANK_WINDOW or offset + len(rows) >= RANK_WINDOW):
+        rows += run(cursor, terms, kinds, limit + 1 - len(rows), max(offset - RANK_WINDOW, 0), True)
+    cursor.close()
+
+    items = [{
+        'kind': row['kind'],
+        'id': row['ref_id'],
+        'commission_id': row['commission_id'],
+        'title': _highlight(row['title']),
+        'snippet': _highlight(row['snippet']),
+        'created_at': row['created_at'],
+    } for row in rows[:limit]]
+    return items, (offset + limit if len(rows) > limit else None), ranked_count >= len(items)
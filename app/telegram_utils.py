@@ -1,86 +1,93 @@
 # --- Conteúdo do arquivo: app/telegram_utils.py ---
 
-import sqlite3
-import requests
 import os
-import psycopg2
-from psycopg2.extras import DictCursor
-# from flask import current_app  <-- REMOVIDO DAQUI
-
-def get_db_connection_for_utils():
-    """Cria uma conexão de DB específica para este utilitário."""
- 
-    database_url = os.environ.get('DATABASE_URL')
-    if database_url:
-        conn = psycopg2.connect(database_url)
-        conn.cursor_factory = DictCursor
-    else:
-        conn = sqlite3.connect('database.db')
-        conn.row_factory = sqlite3.Row
-    return conn
-
-def send_telegram_message(message_body):
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from .cache import get_site_settings
+from .metrics import TELEGRAM_LATENCY
+from .outbox import enqueue, register_handler, DeliveryError
+
+# (conexão, leitura) em segundos: uma API lenta não pode segurar o worker para sempre.
+REQUEST_TIMEOUT = (5, 15)
+# O Telegram aceita cerca de uma mensagem por segundo no mesmo chat.
+MIN_INTERVAL_PER_CHAT = float(os.environ.get('TELEGRAM_MIN_INTERVAL', '1'))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """Sessão HTTP do processo, reaproveitando as conexões TLS com a API do Telegram."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+                _session = session
+    return _session
+
+
+def queue_telegram_message(conn, message_body):
     """
-    Busca as configurações do Telegram no banco de dados e envia uma mensagem.
+    Coloca uma mensagem do Telegram na outbox, dentro da transação do chamador.
+    Retorna False se o envio estiver desabilitado ou sem configuração.
     """
-    # IMPORTADO AQUI DENTRO para evitar a falha de monkey-patching
-    from app import create_app 
-    
-    try: # <--- O BLOCO TRY COMEÇA AQUI
-        # Trocar current_app.app_context() por uma criação explícita da app
-        app = create_app() 
-        with app.app_context(): 
-            conn = get_db_connection_for_utils()
-            # --- INÍCIO DA CORREÇÃO ---
- 
-            cursor = conn.cursor()
-            cursor.execute('SELECT key, value FROM settings')
-            settings_db = cursor.fetchall()
-            cursor.close()
-            # --- FIM DA CORREÇÃO ---
-    
-            conn.close()
-            settings = {row['key']: row['value'] for row in settings_db}
-
-        if settings.get('TELEGRAM_ENABLED') != 'true':
-            print(">>> AVISO: Envio via Telegram desabilitado nas configurações.")
-            return False
-
-      
-        bot_token = settings.get('TELEGRAM_BOT_TOKEN')
-        chat_id = settings.get('TELEGRAM_CHAT_ID')
-
-        if not all([bot_token, chat_id]):
- 
-            print("!!! ERRO: O Token do Bot ou o Chat ID do Telegram estão faltando no banco de dados.")
-            return False
-        
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        payload = {
-   
-            'chat_id': chat_id,
-            'text': message_body,
-            'parse_mode': 'Markdown'
-        }
-  
-        print(f">>> Tentando enviar mensagem para o Telegram Chat ID: {chat_id}...")
-       
-        response = requests.post(url, data=payload)
-        response_data = response.json()
-
-        if response.status_code == 200 and response_data.get('ok'):
-            
-            print(">>> Mensagem de Telegram enviada com sucesso!")
-            return True
-        else:
-          
-            print(f"!!! ERRO ao enviar mensagem para o Telegram. Resposta da API: {response_data}")
-            return False
-
-    except requests.exceptions.RequestException as e: # <--- O PRIMEIRO EXCEPT TEM QUE ESTAR LIGADO AO PRIMEIRO TRY
-        print(f"!!! ERRO DE CONEXÃO ao tentar contatar a API do Telegram: {e}")
+    settings = get_site_settings()
+    if settings.get('TELEGRAM_ENABLED') != 'true':
+        print(">>> AVISO: Envio via Telegram desabilitado nas configurações.")
         return False
-        
-    except Exception as e:
-        print(f"!!! ERRO INESPERADO ao enviar mensagem via Telegram: {e}")
+
+    chat_id = settings.get('TELEGRAM_CHAT_ID')
+    if not all([settings.get('TELEGRAM_BOT_TOKEN'), chat_id]):
+        print("!!! ERRO: O Token do Bot ou o Chat ID do Telegram estão faltando no banco de dados.")
         return False
+
+    enqueue(conn, 'telegram', chat_id, {'text': message_body})
+    return True
+
+
+def deliver_telegram_message(chat_id, payload):
+    """Entrega uma mensagem da outbox. Chamada pelo worker; levanta DeliveryError em caso de falha."""
+    bot_token = get_site_settings().get('TELEGRAM_BOT_TOKEN')
+    if not bot_token:
+        # A configuração pode ser corrigida no painel; a mensagem continua na fila.
+        raise DeliveryError("Token do Bot do Telegram ausente nas configurações.")
+
+    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    data = {
+        'chat_id': chat_id,
+        'text': payload['text'],
+        'parse_mode': 'Markdown'
+    }
+
+    started = time.perf_counter()
+    try:
+        response = _get_session().post(url, data=data, timeout=REQUEST_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        TELEGRAM_LATENCY.labels('connection_error').observe(time.perf_counter() - started)
+        raise DeliveryError(f"Erro de conexão com a API do Telegram: {e}")
+    TELEGRAM_LATENCY.labels(str(response.status_code)).observe(time.perf_counter() - started)
+
+    try:
+        response_data = response.json()
+    except ValueError:
+        response_data = {}
+
+    if response.status_code == 200 and response_data.get('ok'):
+        print(f">>> Mensagem de Telegram enviada com sucesso para o Chat ID: {chat_id}.")
+        return
+
+    description = response_data.get('description') or f"HTTP {response.status_code}"
+    if response.status_code == 429:
+        retry_after = (response_data.get('parameters') or {}).get('retry_after', 30)
+        raise DeliveryError(f"Limite de envio do Telegram atingido: {description}", retry_after=retry_after)
+    if 400 <= response.status_code < 500:
+        # Token inválido, chat inexistente, Markdown malformado: repetir não resolve.
+        raise DeliveryError(f"A API do Telegram recusou a mensagem: {description}", permanent=True)
+    raise DeliveryError(f"A API do Telegram respondeu com erro: {description}")
+
+
+register_handler('telegram', deliver_telegram_message, min_interval=MIN_INTERVAL_PER_CHAT)
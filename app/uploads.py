@@ -0,0 +1,385 @@
+# Arquivo: app/uploads.py
+
+import hashlib
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from .blocking import run_blocking
+from .utils import get_db_connection
+
+# Envio em partes dos arquivos de referência dos pedidos.
+#
+# O cliente abre um envio (tamanho e tipo declarados), manda o arquivo em
+# partes com o deslocamento de cada uma e, se a conexão cair, consulta quantos
+# bytes já chegaram e continua dali. Cada parte é copiada do socket para o
+# disco em blocos pequenos, sem passar inteira pela memória. Ao receber o
+# último byte, o arquivo é identificado pelo SHA-256 e movido para um
+# armazenamento endereçado por conteúdo: o mesmo arquivo enviado duas vezes
+# ocupa espaço uma vez só.
+#
+# Antes de escrever, a requisição reserva o envio no banco (claim_token e
+# claimed_until): duas partes com o mesmo deslocamento, ou duas últimas partes
+# ao mesmo tempo, não chegam a tocar o arquivo parcial juntas.
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', os.path.join(_PROJECT_ROOT, 'uploads'))
+PARTIAL_DIR = os.path.join(UPLOAD_DIR, 'partial')
+BLOB_DIR = os.path.join(UPLOAD_DIR, 'blobs')
+
+MAX_FILE_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', 10 * 1024 * 1024))
+# Tamanho de parte sugerido ao cliente e o máximo aceito por requisição.
+CHUNK_SIZE = 1024 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+# Bloco de cópia do socket para o disco.
+COPY_BLOCK = 64 * 1024
+# Validade da reserva de uma parte. Se a requisição morrer no meio da cópia,
+# o envio volta a aceitar partes quando ela expira.
+CLAIM_SECONDS = int(os.environ.get('UPLOAD_CLAIM_SECONDS', 300))
+
+ALLOWED_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'application/pdf'}
+# Assinaturas (primeiros bytes) de cada formato aceito. O tipo declarado pelo
+# cliente só vale para a validação inicial; o que fica gravado é o detectado.
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+)
+MAX_FILES_PER_COMMISSION = 10
+
+
+class UploadError(Exception):
+    """Erro de validação do envio; 'status' é o código HTTP da resposta."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _partial_path(upload_id):
+    return os.path.join(PARTIAL_DIR, upload_id)
+
+
+def blob_path(sha256):
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+def create_upload(conn, user_id, filename, size, mime_type):
+    """Abre um envio e reserva o arquivo parcial. Retorna o id do envio."""
+    filename = os.path.basename(filename or '').strip()
+    if not filename:
+        raise UploadError('O nome do arquivo é obrigatório.')
+    if mime_type not in ALLOWED_TYPES:
+        raise UploadError('Formato não aceito. Envie JPG, PNG, GIF, WEBP ou PDF.', 415)
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError('Tamanho do arquivo inválido.')
+    if size <= 0:
+        raise UploadError('O arquivo está vazio.')
+    if size > MAX_FILE_SIZE:
+        raise UploadError(f'O arquivo passa do limite de {MAX_FILE_SIZE // (1024 * 1024)}MB.', 413)
+
+    upload_id = uuid.uuid4().hex
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    open(_partial_path(upload_id), 'wb').close()
+
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    now = _now()
+    cursor = conn.cursor()
+    cursor.execute(
+        f'INSERT INTO uploads (id, user_id, filename, mime_type, size, received, status, created_at, updated_at) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, 0, {placeholder}, {placeholder}, {placeholder})',
+        (upload_id, user_id, filename[:255], mime_type, size, 'uploading', now, now)
+    )
+    cursor.close()
+    return upload_id
+
+
+def get_upload(conn, upload_id, user_id):
+    """Retorna o envio do usuário, ou None se não existir (ou for de outra pessoa)."""
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT * FROM uploads WHERE id = {placeholder} AND user_id = {placeholder}', (upload_id, user_id))
+    row = cursor.fetchone()
+    cursor.close()
+    return dict(row) if row else None
+
+
+def upload_to_dict(upload):
+    return {
+        'upload_id': upload['id'],
+        'filename': upload['filename'],
+        'size': upload['size'],
+        'received': upload['received'],
+        'status': upload['status'],
+        'sha256': upload['sha256'],
+        'chunk_size': CHUNK_SIZE,
+    }
+
+
+def _copy_to_partial(upload_id, offset, stream, length):
+    """Copia 'length' bytes do stream da requisição para o arquivo parcial, a partir de 'offset'."""
+    copied = 0
+    with open(_partial_path(upload_id), 'r+b') as f:
+        f.seek(offset)
+        while copied < length:
+            block = stream.read(min(COPY_BLOCK, length - copied))
+            if not block:
+                break
+            f.write(block)
+            copied += len(block)
+    return copied
+
+
+def sniff_mime_type(head):
+    """Tipo do arquivo pelos primeiros bytes, ou None se não for um dos formatos aceitos."""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, mime_type in SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return None
+
+
+def _hash_and_store(upload_id):
+    """
+    Confere o formato do arquivo completo, calcula o SHA-256 e o move para o
+    armazenamento por conteúdo. Retorna (sha256, tipo detectado).
+    """
+    source = _partial_path(upload_id)
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        mime_type = sniff_mime_type(f.read(16))
+        if mime_type is None:
+            os.remove(source)
+            raise UploadError('O conteúdo do arquivo não é JPG, PNG, GIF, WEBP ou PDF.', 415)
+        f.seek(0)
+        for block in iter(lambda: f.read(COPY_BLOCK), b''):
+            digest.update(block)
+    sha256 = digest.hexdigest()
+
+    target = blob_path(sha256)
+    if os.path.exists(target):
+        # Conteúdo já armazenado: descarta a cópia recebida.
+        os.remove(source)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+    return sha256, mime_type
+
+
+def _claim(upload_id, user_id, offset):
+    """
+    Reserva o envio para gravar a parte que começa em 'offset'. Só uma
+    requisição por vez consegue: as outras recebem 409 sem tocar no arquivo.
+    Retorna o token da reserva.
+    """
+    token = uuid.uuid4().hex
+    now = time.time()
+    conn = get_db_connection()
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    cursor.execute(
+        f"UPDATE uploads SET claim_token = {placeholder}, claimed_until = {placeholder} WHERE id = {placeholder} AND user_id = {placeholder} AND status = 'uploading' AND received = {placeholder} AND (claimed_until IS NULL OR claimed_until < {placeholder})",
+        (token, now + CLAIM_SECONDS, upload_id, user_id, offset, now)
+    )
+    claimed = cursor.rowcount == 1
+    conn.commit()
+    cursor.close()
+    conn.close()
+    if not claimed:
+        raise UploadError('Outra parte deste envio está sendo gravada agora. Consulte o envio e retome.', 409)
+    return token
+
+
+def _release(upload_id, token, status='uploading'):
+    """Desfaz a reserva sem avançar o envio (parte incompleta ou recusada)."""
+    conn = get_db_connection()
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    cursor.execute(
+        f'UPDATE uploads SET claim_token = NULL, claimed_until = NULL, status = {placeholder}, updated_at = {placeholder} WHERE id = {placeholder} AND claim_token = {placeholder}',
+        (status, _now(), upload_id, token)
+    )
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def write_chunk(upload_id, user_id, offset, stream, length):
+    """
+    Grava uma parte do envio e, se for a última, finaliza o arquivo.
+    A parte precisa começar exatamente no total já recebido; caso contrário o
+    cliente deve consultar o envio e retomar do deslocamento correto.
+    Retorna o envio atualizado.
+    """
+    conn = get_db_connection()
+    upload = get_upload(conn, upload_id, user_id)
+    # Devolve a conexão ao pool durante a cópia: um cliente lento não pode
+    # segurar uma conexão do banco enquanto o corpo da requisição chega.
+    conn.release()
+
+    if upload is None:
+        raise UploadError('Envio não encontrado.', 404)
+    if upload['status'] == 'rejected':
+        raise UploadError('O conteúdo deste envio foi recusado. Comece um novo envio.', 415)
+    if upload['status'] != 'uploading':
+        raise UploadError('Este envio já foi concluído.', 409)
+    if offset != upload['received']:
+        raise UploadError(f"Deslocamento inválido: o servidor já recebeu {upload['received']} bytes.", 409)
+    if length is None:
+        raise UploadError('Informe o Content-Length da parte.', 411)
+    if length <= 0 or length > MAX_CHUNK_SIZE:
+        raise UploadError(f'Cada parte deve ter entre 1 byte e {MAX_CHUNK_SIZE // (1024 * 1024)}MB.', 413)
+    if offset + length > upload['size']:
+        raise UploadError('A parte ultrapassa o tamanho declarado do arquivo.', 413)
+    if not os.path.exists(_partial_path(upload['id'])):
+        raise UploadError('O arquivo parcial deste envio não existe mais. Comece um novo envio.', 410)
+
+    token = _claim(upload['id'], user_id, offset)
+    received = offset + length
+    mime_type = upload['mime_type']
+    try:
+        copied = _copy_to_partial(upload['id'], offset, stream, length)
+        if copied != length:
+            # Conexão interrompida: nada é contabilizado e o cliente reenvia a partir de 'received'.
+            raise UploadError('A parte chegou incompleta. Reenvie a partir do último deslocamento confirmado.')
+        if received == upload['size']:
+            # Hash e movimentação do arquivo completo ficam fora do loop do eventlet.
+            sha256, mime_type = run_blocking(_hash_and_store, upload['id'])
+            status = 'complete'
+        else:
+            sha256, status = None, 'uploading'
+    except FileNotFoundError:
+        # O arquivo parcial sumiu no meio da gravação (envio expirado e limpo).
+        _release(upload['id'], token)
+        raise UploadError('O arquivo parcial deste envio não existe mais. Comece um novo envio.', 409)
+    except UploadError as e:
+        # Conteúdo recusado: o arquivo parcial já foi removido e o envio não tem volta.
+        _release(upload['id'], token, 'rejected' if e.status == 415 else 'uploading')
+        raise
+
+    conn = get_db_connection()
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    # Só avança se a reserva ainda é desta requisição (não expirou nem foi tomada).
+    cursor.execute(
+        f"UPDATE uploads SET received = {placeholder}, status = {placeholder}, sha256 = {placeholder}, mime_type = {placeholder}, claim_token = NULL, claimed_until = NULL, updated_at = {placeholder} WHERE id = {placeholder} AND claim_token = {placeholder} AND received = {placeholder} AND status = 'uploading'",
+        (received, status, sha256, mime_type, _now(), upload['id'], token, offset)
+    )
+    advanced = cursor.rowcount == 1
+    conn.commit()
+    cursor.close()
+    conn.close()
+    if not advanced:
+        raise UploadError('A reserva desta parte expirou antes do fim da gravação. Consulte o envio e retome.', 409)
+    return dict(upload, received=received, status=status, sha256=sha256, mime_type=mime_type)
+
+
+def attach_uploads(conn, commission_id, user_id, upload_ids):
+    """
+    Liga envios concluídos do usuário a um pedido, na transação do chamador.
+    Retorna os metadados para a coluna 'reference_files' do pedido.
+    """
+    upload_ids = list(dict.fromkeys(upload_ids or []))
+    if not upload_ids:
+        return []
+    if len(upload_ids) > MAX_FILES_PER_COMMISSION:
+        raise UploadError(f'Envie no máximo {MAX_FILES_PER_COMMISSION} arquivos por pedido.')
+
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    placeholders = ', '.join([placeholder] * len(upload_ids))
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT * FROM uploads WHERE id IN ({placeholders}) AND user_id = {placeholder} AND status = 'complete' AND commission_id IS NULL",
+        tuple(upload_ids) + (user_id,)
+    )
+    uploads = {row['id']: dict(row) for row in cursor.fetchall()}
+    missing = [upload_id for upload_id in upload_ids if upload_id not in uploads]
+    if missing:
+        cursor.close()
+        raise UploadError('Um ou mais arquivos de referência não foram enviados por completo.')
+
+    now = _now()
+    files = []
+    for upload_id in upload_ids:
+        upload = uploads[upload_id]
+        cursor.execute(
+            f'INSERT INTO commission_files (commission_id, sha256, filename, mime_type, size, uploaded_by, created_at) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})' + (' RETURNING id' if is_postgres else ''),
+            (commission_id, upload['sha256'], upload['filename'], upload['mime_type'], upload['size'], user_id, now)
+        )
+        file_id = cursor.fetchone()['id'] if is_postgres else cursor.lastrowid
+        files.append({
+            'id': file_id,
+            'filename': upload['filename'],
+            'mime_type': upload['mime_type'],
+            'size': upload['size'],
+            'url': f'/api/client/orders/{commission_id}/files/{file_id}',
+        })
+    cursor.execute(
+        f'UPDATE uploads SET commission_id = {placeholder}, updated_at = {placeholder} WHERE id IN ({placeholders})',
+        (commission_id, now) + tuple(upload_ids)
+    )
+    cursor.close()
+    return files
+
+
+def get_commission_file(conn, commission_id, file_id):
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cursor = conn.cursor()
+    cursor.execute(
+        f'SELECT f.*, c.client_id FROM commission_files f JOIN comissoes c ON c.id = f.commission_id WHERE f.id = {placeholder} AND f.commission_id = {placeholder}',
+        (file_id, commission_id)
+    )
+    row = cursor.fetchone()
+    cursor.close()
+    return dict(row) if row else None
+
+
+def purge_stale_uploads(conn, max_age_hours=24):
+    """
+    Remove envios abandonados (parciais sem atividade e concluídos que nunca
+    foram ligados a um pedido) e os arquivos do armazenamento por conteúdo que
+    nenhum pedido ou envio referencia mais. Retorna quantos envios saíram.
+    """
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    cutoff = datetime.now() - timedelta(hours=max_age_hours)
+    cursor = conn.cursor()
+    cursor.execute(
+        f'SELECT id, status FROM uploads WHERE commission_id IS NULL AND updated_at < {placeholder}',
+        (cutoff.isoformat(),)
+    )
+    stale = cursor.fetchall()
+    for row in stale:
+        if row['status'] == 'uploading':
+            try:
+                os.remove(_partial_path(row['id']))
+            except FileNotFoundError:
+                pass
+        cursor.execute(f'DELETE FROM uploads WHERE id = {placeholder}', (row['id'],))
+
+    cursor.execute('SELECT sha256 FROM commission_files UNION SELECT sha256 FROM uploads WHERE sha256 IS NOT NULL')
+    in_use = {row['sha256'] for row in cursor.fetchall()}
+    cursor.close()
+
+    for root, _, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            # Arquivos recentes podem pertencer a um envio que está terminando agora.
+            if name not in in_use and os.path.getmtime(path) < cutoff.timestamp():
+                os.remove(path)
+    return len(stale)
@@ -1,33 +1,22 @@
 # --- Código modificado para: app/utils.py ---
 
-import sqlite3
-import json
-import os
-import psycopg2
-from psycopg2.extras import DictCursor
 from datetime import datetime
 from functools import wraps
 from flask import flash, session, redirect, url_for
+from .db_pool import get_connection
+from .search import index_document, index_new_documents
 
 # --- Funções Auxiliares e Decorators ---
 
 def get_db_connection():
     """
-    Cria e retorna uma conexão com o banco de dados.
+    Retorna uma conexão com o banco de dados, emprestada do pool do processo.
     Conecta-se ao PostgreSQL se a DATABASE_URL estiver definida (no Render),
     caso contrário, usa o SQLite local.
+    Dentro de uma requisição, todas as chamadas recebem a mesma conexão, que
+    volta ao pool no teardown; 'conn.close()' continua seguro de chamar.
     """
-    database_url = os.environ.get('DATABASE_URL')
-    if database_url:
-        # Conexão com o PostgreSQL no Render
-        conn = psycopg2.connect(database_url)
-        # Usa DictCursor para que as linhas se comportem como dicionários (ex: row['id'])
-        conn.cursor_factory = DictCursor
-    else:
-        # Conexão com o SQLite para desenvolvimento local
-        conn = sqlite3.connect('database.db')
-        conn.row_factory = sqlite3.Row
-    return conn
+    return get_connection()
 
 def translate_status(status_key):
     """Traduz uma chave de status do sistema para um texto em português."""
@@ -42,24 +31,57 @@ def translate_status(status_key):
     return status_map.get(status_key, status_key.replace('_', ' ').capitalize())
 
 def add_event_to_log(conn, commission_id, actor, message):
-    """Busca o log de eventos atual, adiciona um novo evento e o salva de volta no banco."""
+    """
+    Registra um novo evento no histórico do pedido (apenas um INSERT, sem reescrever o histórico).
+    Retorna o evento no formato da API, ou None se o registro falhar.
+    """
     try:
         cursor = conn.cursor()
-        cursor.execute('SELECT event_log FROM comissoes WHERE id = %s', (commission_id,))
-        log_row = cursor.fetchone()
-        
-        event_log = json.loads(log_row['event_log']) if log_row and log_row['event_log'] else []
-        new_event = {
-            "timestamp": datetime.now().isoformat(),
-            "actor": actor,
-            "message": message
-        }
-        event_log.append(new_event)
-        
-        # PostgreSQL usa %s como placeholder
-        cursor.execute('UPDATE comissoes SET event_log = %s WHERE id = %s', (json.dumps(event_log), commission_id))
+        is_postgres = hasattr(conn, 'cursor_factory')
+        placeholder = '%s' if is_postgres else '?'
+        event = {"timestamp": datetime.now().isoformat(), "actor": actor, "message": message}
+        cursor.execute(
+            f'INSERT INTO commission_events (commission_id, timestamp, actor, message) VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder})' + (' RETURNING id' if is_postgres else ''),
+            (commission_id, event['timestamp'], actor, message)
+        )
+        event_id = cursor.fetchone()['id'] if is_postgres else cursor.lastrowid
+        index_document(conn, 'event', event_id, actor, message, commission_id, event['timestamp'])
+        return event
     except Exception as e:
         print(f"Erro inesperado no log: {e}")
+        return None
+
+def add_events_to_log(conn, commission_id, entries):
+    """
+    Registra vários eventos no histórico do pedido com um único INSERT (e uma
+    única gravação no índice de busca), na transação do chamador.
+    'entries' é uma lista de (ator, mensagem). Retorna os eventos no formato da API.
+    """
+    if not entries:
+        return []
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+    timestamp = datetime.now().isoformat()
+    events = [{"timestamp": timestamp, "actor": actor, "message": message} for actor, message in entries]
+    row = f'({placeholder}, {placeholder}, {placeholder}, {placeholder})'
+    params = [value for event in events for value in (commission_id, event['timestamp'], event['actor'], event['message'])]
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f'INSERT INTO commission_events (commission_id, timestamp, actor, message) VALUES {", ".join([row] * len(events))}' + (' RETURNING id' if is_postgres else ''),
+        params
+    )
+    if is_postgres:
+        event_ids = sorted(r['id'] for r in cursor.fetchall())
+    else:
+        # Um único INSERT no SQLite grava ids consecutivos, terminando em lastrowid.
+        event_ids = range(cursor.lastrowid - len(events) + 1, cursor.lastrowid + 1)
+    cursor.close()
+    index_new_documents(conn, [
+        ('event', event_id, event['actor'], event['message'], commission_id, event['timestamp'])
+        for event_id, event in zip(event_ids, events)
+    ])
+    return events
 
 def admin_required(f):
     """Decorator para proteger rotas que só administradores podem acessar."""
@@ -80,20 +102,3 @@ def login_required(f):
             return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return decorated_function
-
-def add_notification(message, commission_id=None, user_id=None):
-    """Adiciona uma nova notificação ao banco de dados."""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # PostgreSQL usa %s como placeholder
-        query = 'INSERT INTO notifications (message, timestamp, related_commission_id, is_read, user_id) VALUES (%s, %s, %s, 0, %s)'
-        cursor.execute(query, (message, timestamp, commission_id, user_id))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-    except Exception as e:
-        print(f"Erro ao adicionar notificação: {e}")
\ No newline at end of file
@@ -0,0 +1,234 @@
+# Arquivo: benchmarks/endpoints.py
+
+# Benchmark das rotas mais usadas, pelo test client do Flask.
+#
+# Uso (na raiz do projeto):
+#   python -m benchmarks.endpoints --users 200 --output resultado.json
+#   python -m benchmarks.endpoints --compare resultado-anterior.json
+#   python -m benchmarks.endpoints --database-url postgresql://localhost/bench
+#
+# Sem --database-url, a aplicação é criada sobre um SQLite temporário. Com ele,
+# o banco PostgreSQL informado deve ser descartável: o schema é criado nele e
+# recebe os dados sintéticos de benchmarks/seed.py.
+#
+# O resultado é um JSON com os tempos (ms) de cada rota e a quantidade de
+# consultas SQL por requisição (lida do cabeçalho Server-Timing), para que dois
+# commits possam ser comparados com --compare.
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN_CREDENTIALS = {'username': 'Artista Principal', 'password': 'Admin@123'}
+# Diferença (em %) da mediana a partir da qual --compare aponta uma regressão.
+REGRESSION_THRESHOLD = 10.0
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark das rotas principais com dados sintéticos.')
+    parser.add_argument('--users', type=int, default=100, help='Quantidade de clientes gerados (padrão: 100).')
+    parser.add_argument('--seed', type=int, default=42, help='Semente dos dados sintéticos.')
+    parser.add_argument('--iterations', type=int, default=50, help='Repetições medidas por rota.')
+    parser.add_argument('--warmup', type=int, default=5, help='Repetições descartadas antes da medição.')
+    parser.add_argument('--database-url', help='PostgreSQL descartável a usar no lugar do SQLite temporário.')
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: imprime na tela).')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para comparar as medianas.')
+    return parser.parse_args()
+
+
+def _prepare_environment(args, workdir):
+    """Configura o ambiente antes de importar 'app': vários módulos leem as variáveis na importação."""
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        os.environ.pop('DATABASE_URL', None)
+    os.environ['OUTBOX_WORKER'] = '0'
+    # O Server-Timing, de onde sai a contagem de consultas, fica desligado para visitantes.
+    os.environ['SERVER_TIMING'] = 'on'
+    os.environ['UPLOAD_DIR'] = os.path.join(workdir, 'uploads')
+    os.environ['MEDIA_DIR'] = os.path.join(workdir, 'media')
+    os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    # O SQLite usa 'database.db' no diretório atual.
+    os.chdir(workdir)
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _query_count(response):
+    # Com SERVER_TIMING ligado, a ausência do cabeçalho significa nenhuma consulta.
+    match = re.search(r'desc="(\d+) consultas"', response.headers.get('Server-Timing', ''))
+    return int(match.group(1)) if match else 0
+
+
+def _login(client, credentials):
+    response = client.post('/login', data=credentials)
+    if response.status_code != 302:
+        raise RuntimeError(f"Falha no login de {credentials['username']} (HTTP {response.status_code}).")
+    return response
+
+
+def _measure(name, request, iterations, warmup):
+    """
+    Executa 'request' (que devolve a resposta, ou a lista de respostas de um
+    fluxo com várias requisições) e resume os tempos em ms.
+    """
+    for _ in range(warmup):
+        request()
+
+    timings, queries, sizes = [], [], []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        responses = request()
+        timings.append((time.perf_counter() - started) * 1000)
+        if not isinstance(responses, list):
+            responses = [responses]
+        for response in responses:
+            if response.status_code >= 400:
+                raise RuntimeError(f'{name}: HTTP {response.status_code}')
+        counts = [_query_count(response) for response in responses]
+        queries.append(None if None in counts else sum(counts))
+        sizes.append(sum(len(response.get_data()) for response in responses))
+
+    timings.sort()
+    result = {
+        'iterations': iterations,
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p95_ms': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 3),
+        'max_ms': round(timings[-1], 3),
+        'queries': max((q for q in queries if q is not None), default=None),
+        'response_bytes': sizes[-1],
+    }
+    print(f"{name:<28} mediana {result['median_ms']:>9.2f} ms   p95 {result['p95_ms']:>9.2f} ms   {result['queries']} consultas")
+    return result
+
+
+def run_benchmarks(args):
+    from app import create_app
+    from app.utils import get_db_connection
+    from benchmarks.seed import seed_database, CLIENT_PASSWORD
+
+    app = create_app()
+    with app.app_context():
+        conn = get_db_connection()
+        started = time.perf_counter()
+        dataset = seed_database(conn, users=args.users, seed=args.seed)
+        conn.close()
+        seed_seconds = time.perf_counter() - started
+    print(f"Dados gerados em {seed_seconds:.1f}s: {dataset}")
+
+    admin = app.test_client()
+    _login(admin, ADMIN_CREDENTIALS)
+    client = app.test_client()
+    client_credentials = {'username': 'cliente00000', 'password': CLIENT_PASSWORD}
+    _login(client, client_credentials)
+    anonymous = app.test_client()
+
+    home_counter = iter(range(10 ** 9))
+
+    def login_flow():
+        # Login completo de um navegador novo: POST do formulário e a página de destino.
+        browser = app.test_client()
+        response = _login(browser, client_credentials)
+        return [response, browser.get(response.headers['Location'])]
+
+    cases = [
+        ('admin.get_comissoes', lambda: admin.get('/admin/api/comissoes')),
+        ('client.client_get_orders', lambda: client.get('/api/client/orders')),
+        ('public.home', lambda: anonymous.get('/')),
+        # Query string única a cada vez: mede a renderização, sem o cache de páginas.
+        ('public.home (sem cache)', lambda: anonymous.get(f'/?bench={next(home_counter)}')),
+        ('admin.get_relatorios_dados', lambda: admin.get('/admin/api/relatorios/dados')),
+        ('admin.get_dados_financeiros', lambda: admin.get('/admin/api/financeiro/dados')),
+        ('auth.login', login_flow),
+    ]
+
+    results = {}
+    for name, request in cases:
+        # O login é dominado pelo hash da senha; poucas repetições bastam.
+        iterations = min(args.iterations, 10) if name == 'auth.login' else args.iterations
+        warmup = min(args.warmup, 1) if name == 'auth.login' else args.warmup
+        results[name] = _measure(name, request, iterations, warmup)
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': 'postgres' if args.database_url else 'sqlite',
+            'users': args.users,
+            'seed': args.seed,
+            'dataset': dataset,
+            'seed_seconds': round(seed_seconds, 3),
+        },
+        'results': results,
+    }
+
+
+def compare(previous, current):
+    """Imprime a variação das medianas e retorna quantas rotas pioraram além do limite."""
+    print(f"\nComparação com {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')}):")
+    regressions = 0
+    for name, result in current['results'].items():
+        before = previous['results'].get(name)
+        if not before:
+            print(f"  {name:<28} (nova)")
+            continue
+        change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0.0
+        flag = ''
+        if change > REGRESSION_THRESHOLD:
+            regressions += 1
+            flag = '  <-- REGRESSÃO'
+        queries = '' if before.get('queries') == result.get('queries') else f"   consultas {before.get('queries')} -> {result.get('queries')}"
+        print(f"  {name:<28} {before['median_ms']:>9.2f} -> {result['median_ms']:>9.2f} ms ({change:+.1f}%){queries}{flag}")
+    return regressions
+
+
+def main():
+    args = _parse_args()
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    try:
+        _prepare_environment(args, workdir)
+        report = run_benchmarks(args)
+    finally:
+        os.chdir(PROJECT_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado gravado em {output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if baseline and compare(baseline, report):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# Arquivo: benchmarks/seed.py
+
+import json
+import random
+from datetime import datetime, timedelta
+from app.passwords import hash_password
+from app.portfolio import rebuild_gallery_artists
+from app.revenue import rebuild_revenue
+from app.search import rebuild_search_index
+
+# Gerador de dados sintéticos para os benchmarks. Tudo é derivado de uma
+# semente, então duas execuções com os mesmos parâmetros produzem o mesmo
+# banco e os números dos benchmarks podem ser comparados entre commits.
+#
+# Proporções por cliente, escolhidas para lembrar o uso real do site: cada
+# pedido tem um histórico de eventos e uma conversa de tamanho variado, e os
+# clientes acumulam notificações ao longo do tempo.
+
+CLIENT_PASSWORD = 'Senha@123'
+
+ORDERS_PER_CLIENT = 5
+COMMENTS_PER_ORDER = (2, 25)
+EVENTS_PER_ORDER = (3, 18)
+PREVIEWS_PER_ORDER = (0, 4)
+NOTIFICATIONS_PER_CLIENT = (5, 40)
+COMMENT_WORDS = (5, 80)
+GALLERY_PER_CLIENT = 0.5
+HISTORY_DAYS = 400
+
+STATUSES = (
+    ('pending_payment', 10), ('in_progress', 25), ('waiting_approval', 10),
+    ('completed', 45), ('cancelled', 10),
+)
+TYPES = ('Ilustração', 'Ilustração Básica', 'Retrato', 'Personagem', 'Cenário')
+PHASES = ['Esboço', 'Arte-final', 'Cores']
+WORDS = (
+    'arte cor traço esboço cabelo fundo luz sombra personagem roupa pose cena '
+    'prazo ajuste detalhe olhos rosto paleta versão final referência estilo'
+).split()
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(*words))).capitalize() + '.'
+
+
+def _timestamp(day, rng):
+    return (day + timedelta(seconds=rng.randint(0, 86399))).isoformat()
+
+
+def seed_database(conn, users=100, seed=42):
+    """
+    Popula um banco recém-criado por initialize_database(). 'users' é o número
+    de clientes; pedidos, histórico, notificações e obras crescem na mesma
+    proporção. Retorna a contagem de linhas gravadas por tabela.
+    """
+    rng = random.Random(seed)
+    is_postgres = hasattr(conn, 'cursor_factory')
+    placeholder = '%s' if is_postgres else '?'
+
+    def values(n):
+        return ', '.join([placeholder] * n)
+
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) AS total FROM comissoes')
+    if cursor.fetchone()['total']:
+        raise RuntimeError('O banco já tem pedidos; os benchmarks precisam de um banco descartável e vazio.')
+
+    cursor.execute('SELECT id FROM users WHERE is_public_artist = ' + ('TRUE' if is_postgres else '1'))
+    artist_ids = [row['id'] for row in cursor.fetchall()]
+
+    # Um único hash para todos: gerar um por cliente levaria minutos no scrypt.
+    password_hash = hash_password(CLIENT_PASSWORD)
+    usernames = [f'cliente{i:05d}' for i in range(users)]
+    cursor.executemany(
+        f'INSERT INTO users (username, password_hash, is_admin) VALUES ({values(3)})',
+        [(name, password_hash, False) for name in usernames]
+    )
+    cursor.execute(f'SELECT id, username FROM users WHERE username LIKE {placeholder}', ('cliente%',))
+    clients = [(row['id'], row['username']) for row in cursor.fetchall()]
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    status_names = [s for s, _ in STATUSES]
+    status_weights = [w for _, w in STATUSES]
+    orders, events, comments, previews, notifications = [], [], [], [], []
+    sequence = 0
+
+    for client_id, username in clients:
+        for _ in range(ORDERS_PER_CLIENT):
+            sequence += 1
+            day = today - timedelta(days=rng.randint(0, HISTORY_DAYS))
+            status = rng.choices(status_names, status_weights)[0]
+            # Mesmo formato de app.ids; a sequência ocupa o nó e o contador, então nunca se repete.
+            order_id = f'ART-{int(day.timestamp() * 1000):013d}{sequence // 1000 % 10000:04d}{sequence % 1000:03d}'
+            paid = status not in ('pending_payment', 'cancelled')
+            orders.append((
+                order_id, username, rng.choice(TYPES), day.strftime('%Y-%m-%d'),
+                (day + timedelta(days=rng.randint(7, 60))).strftime('%Y-%m-%d'), float(rng.randrange(50, 1500, 10)),
+                status, _text(rng, (20, 120)), '[]', '[]', '[]', client_id, json.dumps(PHASES),
+                rng.randint(0, len(PHASES) - 1), rng.randint(0, 3), '[]',
+                'paid' if paid else 'unpaid', json.dumps([rng.choice(artist_ids)]) if artist_ids else '[]'
+            ))
+            for _ in range(rng.randint(*EVENTS_PER_ORDER)):
+                events.append((order_id, _timestamp(day, rng), rng.choice(('Cliente', 'Artista Principal')), _text(rng, (4, 12))))
+            for _ in range(rng.randint(*COMMENTS_PER_ORDER)):
+                is_artist = rng.random() < 0.5
+                comments.append((
+                    order_id, 'Artista Principal' if is_artist else username, 1 if is_artist else 0,
+                    _timestamp(day, rng), _text(rng, COMMENT_WORDS), 1 if rng.random() < 0.1 else 0, rng.choice(PHASES)
+                ))
+            for version in range(rng.randint(*PREVIEWS_PER_ORDER)):
+                previews.append((order_id, f'v{version + 1}', _timestamp(day, rng), f'https://placehold.co/800x600?text={sequence}-{version}', _text(rng, (3, 15))))
+
+        for _ in range(rng.randint(*NOTIFICATIONS_PER_CLIENT)):
+            order = orders[-rng.randint(1, ORDERS_PER_CLIENT)]
+            notifications.append((client_id, _text(rng, (6, 16)), 1 if rng.random() < 0.7 else 0, _timestamp(today - timedelta(days=rng.randint(0, 60)), rng), order[0]))
+        # Notificações do painel (user_id vazio) na mesma proporção.
+        notifications.append((None, _text(rng, (6, 16)), 0, _timestamp(today, rng), orders[-1][0]))
+
+    cursor.executemany(
+        f'INSERT INTO comissoes (id, client, type, date, deadline, price, status, description, preview, comments, reference_files, client_id, phases, current_phase_index, revisions_used, event_log, payment_status, assigned_artist_ids) VALUES ({values(18)})',
+        orders
+    )
+    cursor.executemany(f'INSERT INTO commission_events (commission_id, timestamp, actor, message) VALUES ({values(4)})', events)
+    cursor.executemany(f'INSERT INTO commission_comments (commission_id, author, is_artist, date, text, is_revision_request, phase_name) VALUES ({values(7)})', comments)
+    cursor.executemany(f'INSERT INTO commission_previews (commission_id, version, date, url, comment) VALUES ({values(5)})', previews)
+    cursor.executemany(f'INSERT INTO notifications (user_id, message, is_read, timestamp, related_commission_id) VALUES ({values(5)})', notifications)
+
+    gallery = []
+    for i in range(int(users * GALLERY_PER_CLIENT)):
+        gallery.append((
+            f'Obra {i}', _text(rng, (5, 30)), f'https://placehold.co/1200x900?text=obra-{i}',
+            rng.choice(artist_ids) if artist_ids else None, rng.choice(artist_ids) if artist_ids and rng.random() < 0.5 else None
+        ))
+    cursor.executemany(f'INSERT INTO gallery (title, description, image_url, lineart_artist_id, color_artist_id) VALUES ({values(5)})', gallery)
+    rebuild_gallery_artists(cursor)
+    rebuild_search_index(cursor, is_postgres)
+    cursor.close()
+
+    rebuild_revenue(conn)
+    conn.commit()
+    return {
+        'users': len(clients),
+        'commissions': len(orders),
+        'commission_events': len(events),
+        'commission_comments': len(comments),
+        'commission_previews': len(previews),
+        'notifications': len(notifications),
+        'gallery': len(gallery),
+    }
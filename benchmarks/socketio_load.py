@@ -0,0 +1,411 @@
+# Arquivo: benchmarks/socketio_load.py
+
+# Teste de carga do tempo real: centenas de abas simuladas (clientes e
+# administradores), cada uma com sessão autenticada e conexão Socket.IO
+# própria, contra uma instância do site já em execução.
+#
+# Uso (com o servidor rodando, de preferência sobre um banco descartável):
+#   python -m benchmarks.socketio_load --url http://localhost:5000 --clients 200 --admins 5 \
+#       --duration 60 --rate 20 --server-pid <pid do servidor> --output carga.json
+#
+# Os clientes 'carga00000', 'carga00001', ... são registrados por /registro na
+# primeira execução e cada um abre um pedido. Durante o teste, as ações são
+# sorteadas conforme --mix e feitas pela API, como o navegador faria:
+#   comment  - comentário do cliente ou do artista;
+#   status   - mudança de status pelo painel;
+#   revision - o artista envia uma prévia e o cliente pede revisão;
+#   create   - o cliente abre um pedido novo.
+#
+# Para cada ação o relatório traz a latência do HTTP e a latência entre o
+# início da ação e a chegada do 'commission_updated' em cada aba que deve
+# recebê-lo (administradores e a aba do dono do pedido). As abas reproduzem a
+# regra de static/js/admin_js/main.js e static/js/client/main.js: um pedido
+# desconhecido anunciado como 'created' faz o painel buscar o pedido e o
+# cliente buscar a lista; essas buscas são contadas por evento recebido.
+# Com --server-pid, o uso de CPU do servidor é lido de /proc (Linux).
+#
+# Sem o pacote 'websocket-client' as conexões usam long-polling.
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import requests
+import socketio
+
+CLIENT_PREFIX = 'carga'
+CLIENT_PASSWORD = 'Carga@2024'
+DEFAULT_MIX = 'comment=45,status=20,revision=25,create=10'
+SETUP_WORKERS = 16
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description='Teste de carga do Socket.IO com clientes e administradores simulados.')
+    parser.add_argument('--url', default='http://localhost:5000', help='Endereço do site em execução.')
+    parser.add_argument('--clients', type=int, default=100, help='Abas de clientes (uma por cliente).')
+    parser.add_argument('--admins', type=int, default=3, help='Abas do painel administrativo.')
+    parser.add_argument('--admin-user', default='Artista Principal')
+    parser.add_argument('--admin-password', default='Admin@123')
+    parser.add_argument('--duration', type=float, default=30, help='Duração da fase de carga, em segundos.')
+    parser.add_argument('--rate', type=float, default=10, help='Ações por segundo.')
+    parser.add_argument('--workers', type=int, default=32, help='Ações simultâneas no máximo.')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Pesos das ações (padrão: {DEFAULT_MIX}).')
+    parser.add_argument('--event-timeout', type=float, default=10, help='Espera máxima pelos eventos de uma ação.')
+    parser.add_argument('--server-pid', type=int, help='PID do servidor, para medir o uso de CPU.')
+    parser.add_argument('--transport', choices=('websocket', 'polling'), help='Força um transporte do Socket.IO.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: imprime na tela).')
+    return parser.parse_args()
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ('comment', 'status', 'revision', 'create'):
+            raise SystemExit(f'Ação desconhecida em --mix: {name}')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def pick(p):
+        return round(values[min(int(len(values) * p), len(values) - 1)] * 1000, 3)
+
+    return {'count': len(values), 'p50_ms': pick(0.5), 'p90_ms': pick(0.9), 'p95_ms': pick(0.95),
+            'p99_ms': pick(0.99), 'max_ms': round(values[-1] * 1000, 3)}
+
+
+class CpuSampler(threading.Thread):
+    """Lê o tempo de CPU do servidor em /proc/<pid>/stat uma vez por segundo."""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.samples = []
+        self._finished = threading.Event()
+        self._ticks = os.sysconf('SC_CLK_TCK')
+        self.started = (self.cpu_seconds(), time.monotonic())
+
+    def cpu_seconds(self):
+        with open(f'/proc/{self.pid}/stat') as f:
+            # O nome do processo pode ter espaços; os campos começam depois do ')'.
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def run(self):
+        last_cpu, last_time = self.started
+        while not self._finished.wait(1):
+            cpu, now = self.cpu_seconds(), time.monotonic()
+            self.samples.append((cpu - last_cpu) / (now - last_time) * 100)
+            last_cpu, last_time = cpu, now
+
+    def stop(self):
+        self._finished.set()
+        self.join()
+        cpu, now = self.cpu_seconds(), time.monotonic()
+        return {
+            'cpu_seconds': round(cpu - self.started[0], 3),
+            'cpu_percent_mean': round((cpu - self.started[0]) / (now - self.started[1]) * 100, 1),
+            'cpu_percent_max': round(max(self.samples), 1) if self.samples else None,
+        }
+
+
+class Stats:
+    """Contadores compartilhados entre as threads do teste."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.http = defaultdict(list)
+        self.http_status = defaultdict(lambda: defaultdict(int))
+        self.event_latency = defaultdict(list)
+        self.deliveries = defaultdict(lambda: {'expected': 0, 'delivered': 0})
+        self.events_received = defaultdict(int)
+        self.unattributed_events = 0
+        self.refetches = defaultdict(int)
+        self.refetch_latency = []
+
+    def http_result(self, action, elapsed, status):
+        with self.lock:
+            self.http[action].append(elapsed)
+            self.http_status[action][str(status)] += 1
+
+
+class PendingAction:
+    def __init__(self, action, expected):
+        self.action = action
+        self.expected = expected
+        self.delivered = 0
+        self.started = time.perf_counter()
+        self.done = threading.Event()
+
+
+class Tab:
+    """Uma aba do navegador: sessão HTTP autenticada mais a conexão Socket.IO."""
+
+    def __init__(self, test, kind, http):
+        self.test = test
+        self.kind = kind
+        self.http = http
+        self.known = set()
+        self.sio = socketio.Client(http_session=http, reconnection=False)
+        self.sio.on('commission_updated', self.on_commission_updated)
+
+    def connect(self):
+        transports = [self.test.args.transport] if self.test.args.transport else None
+        self.sio.connect(self.test.args.url, transports=transports, wait_timeout=30)
+
+    def on_commission_updated(self, data):
+        received = time.perf_counter()
+        test = self.test
+        commission_id = data.get('commission_id')
+        with test.stats.lock:
+            test.stats.events_received[self.kind] += 1
+            pending = test.pending.get(commission_id)
+            if pending is not None:
+                test.stats.event_latency[pending.action].append(received - pending.started)
+                pending.delivered += 1
+                if pending.delivered >= pending.expected:
+                    pending.done.set()
+            else:
+                test.stats.unattributed_events += 1
+
+        # Mesma regra das telas: só um pedido desconhecido e recém-criado provoca nova busca.
+        if commission_id in self.known or data.get('deleted') or not data.get('created'):
+            return
+        self.known.add(commission_id)
+        path = f'/admin/api/comissoes/{commission_id}' if self.kind == 'admin' else '/api/client/orders'
+        started = time.perf_counter()
+        self.http.get(test.args.url + path)
+        with test.stats.lock:
+            test.stats.refetches[self.kind] += 1
+            test.stats.refetch_latency.append(time.perf_counter() - started)
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.mix = _parse_mix(args.mix)
+        self.stats = Stats()
+        self.pending = {}
+        self.admin_tabs = []
+        self.client_tabs = []
+        # Pedido -> aba do dono; pedidos com uma ação em andamento ficam fora do sorteio.
+        self.orders = {}
+        self.busy = set()
+        self.orders_lock = threading.Lock()
+
+    # --- Preparação -------------------------------------------------------
+
+    def _session(self, username, password, register=False):
+        http = requests.Session()
+        if register:
+            # Já registrado em uma execução anterior: o formulário só exibe o aviso.
+            http.post(self.args.url + '/registro', data={'username': username, 'password': password})
+        response = http.post(self.args.url + '/login', data={'username': username, 'password': password}, allow_redirects=False)
+        if response.status_code != 302:
+            raise RuntimeError(f'Falha no login de {username} (HTTP {response.status_code}).')
+        return http
+
+    def _new_order(self, tab):
+        response = tab.http.post(self.args.url + '/api/client/commissions', json={
+            'title': 'Pedido de carga', 'type': 'Ilustração', 'description': 'Pedido gerado pelo teste de carga.',
+            'price': 100, 'assigned_artist_ids': [1],
+        })
+        response.raise_for_status()
+        return response.json()['id']
+
+    def _prepare_client(self, index):
+        tab = Tab(self, 'client', self._session(f'{CLIENT_PREFIX}{index:05d}', CLIENT_PASSWORD, register=True))
+        order_id = self._new_order(tab)
+        # Pagamento confirmado: o pedido entra em produção e aceita prévias e revisões.
+        self.admin_tabs[0].http.post(f'{self.args.url}/admin/api/comissoes/{order_id}/confirm_payment').raise_for_status()
+        orders = tab.http.get(self.args.url + '/api/client/orders').json()
+        tab.known.update(order['id'] for order in orders)
+        with self.orders_lock:
+            self.orders[order_id] = tab
+        return tab
+
+    def prepare(self):
+        print(f'Preparando {self.args.admins} administradores e {self.args.clients} clientes...')
+        for _ in range(self.args.admins):
+            self.admin_tabs.append(Tab(self, 'admin', self._session(self.args.admin_user, self.args.admin_password)))
+        with ThreadPoolExecutor(SETUP_WORKERS) as pool:
+            self.client_tabs = list(pool.map(self._prepare_client, range(self.args.clients)))
+        for tab in self.admin_tabs:
+            tab.known.update(self.orders)
+
+        failed = 0
+        with ThreadPoolExecutor(SETUP_WORKERS) as pool:
+            for result in pool.map(self._connect, self.admin_tabs + self.client_tabs):
+                failed += not result
+        print(f'{len(self.admin_tabs) + len(self.client_tabs) - failed} conexões Socket.IO abertas, {failed} falhas.')
+        return failed
+
+    def _connect(self, tab):
+        try:
+            tab.connect()
+            return True
+        except socketio.exceptions.ConnectionError as e:
+            print(f'Falha ao conectar uma aba ({tab.kind}): {e}')
+            return False
+
+    # --- Ações ------------------------------------------------------------
+
+    def _request(self, action, http, method, path, **kwargs):
+        started = time.perf_counter()
+        response = http.request(method, self.args.url + path, **kwargs)
+        self.stats.http_result(action, time.perf_counter() - started, response.status_code)
+        return response
+
+    def _tracked(self, action, order_id, owner, method, path, http, **kwargs):
+        """Faz a requisição e espera os eventos dela chegarem em todas as abas que devem recebê-los."""
+        pending = PendingAction(action, len(self.admin_tabs) + (1 if owner.sio.connected else 0))
+        with self.stats.lock:
+            self.pending[order_id] = pending
+        response = self._request(action, http, method, path, **kwargs)
+        if response.status_code < 400:
+            pending.done.wait(self.args.event_timeout)
+            with self.stats.lock:
+                self.stats.deliveries[action]['expected'] += pending.expected
+                self.stats.deliveries[action]['delivered'] += min(pending.delivered, pending.expected)
+        with self.stats.lock:
+            self.pending.pop(order_id, None)
+        return response
+
+    def _run_action(self, action, order_id, owner):
+        admin = self.rng.choice(self.admin_tabs).http
+        text = f'Mensagem de carga {self.rng.randint(0, 10 ** 6)}'
+        try:
+            if action == 'comment':
+                if self.rng.random() < 0.5:
+                    self._tracked('comment_client', order_id, owner, 'POST', f'/api/client/orders/{order_id}/comment', owner.http, json={'text': text})
+                else:
+                    self._tracked('comment_admin', order_id, owner, 'POST', f'/admin/api/comissoes/{order_id}/comment', admin, json={'text': text})
+            elif action == 'status':
+                self._tracked('status', order_id, owner, 'POST', f'/admin/api/comissoes/{order_id}/update_status', admin, json={'status': 'in_progress'})
+            elif action == 'revision':
+                preview = self._tracked('preview', order_id, owner, 'POST', f'/admin/api/comissoes/{order_id}/preview', admin,
+                                        json={'url': 'https://placehold.co/800x600', 'comment': text})
+                if preview.status_code < 400:
+                    self._tracked('revision', order_id, owner, 'POST', f'/api/client/orders/{order_id}/request_revision', owner.http, json={'comment': text})
+            elif action == 'create':
+                # O ID só é conhecido na resposta, então só o HTTP e as buscas decorrentes são medidos.
+                response = self._request('create', owner.http, 'POST', '/api/client/commissions', json={
+                    'title': 'Pedido de carga', 'type': 'Ilustração', 'description': text, 'price': 100, 'assigned_artist_ids': [1],
+                })
+                if response.status_code < 400:
+                    with self.orders_lock:
+                        self.orders[response.json()['id']] = owner
+        except requests.exceptions.RequestException as e:
+            self.stats.http_result(action, 0.0, type(e).__name__)
+        finally:
+            with self.orders_lock:
+                self.busy.discard(order_id)
+
+    def _pick_order(self):
+        with self.orders_lock:
+            free = [order_id for order_id in self.orders if order_id not in self.busy]
+            if not free:
+                return None, None
+            order_id = self.rng.choice(free)
+            self.busy.add(order_id)
+            return order_id, self.orders[order_id]
+
+    def run(self):
+        actions, weights = zip(*self.mix.items())
+        interval = 1 / self.args.rate
+        skipped = 0
+        print(f'Carga por {self.args.duration:.0f}s a {self.args.rate} ações/s...')
+        started = time.monotonic()
+        next_at = started
+        with ThreadPoolExecutor(self.args.workers) as pool:
+            while time.monotonic() - started < self.args.duration:
+                order_id, owner = self._pick_order()
+                if order_id is None:
+                    skipped += 1
+                else:
+                    pool.submit(self._run_action, self.rng.choices(actions, weights)[0], order_id, owner)
+                next_at += interval
+                time.sleep(max(next_at - time.monotonic(), 0))
+        return time.monotonic() - started, skipped
+
+    def close(self):
+        for tab in self.admin_tabs + self.client_tabs:
+            if tab.sio.connected:
+                tab.sio.disconnect()
+
+
+def main():
+    args = _parse_args()
+    test = LoadTest(args)
+    connect_failures = test.prepare()
+
+    sampler = CpuSampler(args.server_pid) if args.server_pid else None
+    if sampler:
+        sampler.start()
+    driver_cpu = os.times()
+    try:
+        elapsed, skipped = test.run()
+        # Espera os últimos eventos antes de medir.
+        time.sleep(1)
+    finally:
+        server_cpu = sampler.stop() if sampler else None
+        driver_times = os.times()
+        test.close()
+
+    stats = test.stats
+    events_total = sum(stats.events_received.values())
+    refetch_total = sum(stats.refetches.values())
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'url': args.url, 'clients': args.clients, 'admins': args.admins, 'duration_s': round(elapsed, 3),
+            'rate': args.rate, 'mix': test.mix, 'transport': args.transport or 'auto',
+            'connect_failures': connect_failures, 'skipped_ticks': skipped,
+        },
+        'http': {action: dict(_percentiles(values) or {}, status=dict(stats.http_status[action]))
+                 for action, values in stats.http.items()},
+        'event_latency': {action: _percentiles(values) for action, values in stats.event_latency.items()},
+        'deliveries': {action: dict(d, ratio=round(d['delivered'] / d['expected'], 4) if d['expected'] else None)
+                       for action, d in stats.deliveries.items()},
+        'events_received': dict(stats.events_received, total=events_total, unattributed=stats.unattributed_events),
+        'refetches': dict(stats.refetches, total=refetch_total,
+                          per_event=round(refetch_total / events_total, 4) if events_total else None,
+                          latency=_percentiles(stats.refetch_latency)),
+        'server_cpu': server_cpu,
+        # Se o próprio driver estiver perto de 100%, as latências medidas incluem a fila dele.
+        'driver_cpu_percent': round(((driver_times.user - driver_cpu.user) + (driver_times.system - driver_cpu.system)) / elapsed * 100, 1),
+    }
+
+    print('\nLatência do evento (início da ação -> chegada na aba):')
+    for action, result in report['event_latency'].items():
+        if result:
+            print(f"  {action:<16} p50 {result['p50_ms']:>8.1f}  p95 {result['p95_ms']:>8.1f}  p99 {result['p99_ms']:>8.1f}  ({result['count']} entregas)")
+    print(f"Buscas HTTP disparadas pelos eventos: {refetch_total} ({report['refetches']['per_event']} por evento recebido)")
+    if server_cpu:
+        print(f"CPU do servidor: média {server_cpu['cpu_percent_mean']}%, pico {server_cpu['cpu_percent_max']}%")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f'\nResultado gravado em {args.output}')
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    if connect_failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+# Arquivo: gunicorn.conf.py
+
+import glob
+import os
+
+# Lido automaticamente pelo gunicorn quando iniciado na raiz do projeto. Só
+# define os ganchos das métricas e do pool de imagens; workers, classe e porta
+# continuam vindo da linha de comando.
+
+
+def on_starting(server):
+    # Arquivos de métricas de uma execução anterior somariam valores antigos aos novos.
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, '*.db')):
+            os.remove(path)
+
+
+def worker_exit(server, worker):
+    # Encerra os processos que geram os derivados das imagens junto com o worker.
+    from app.images import shutdown
+    shutdown()
+
+
+def child_exit(server, worker):
+    from app.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
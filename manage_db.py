@@ -0,0 +1,139 @@
+import sys
+from app.utils import get_db_connection
+from app.migrations import MIGRATIONS, run_migrations, get_schema_version, explain_hot_queries
+from app.revenue import rebuild_revenue
+from app.uploads import purge_stale_uploads
+from app.images import backfill_gallery_images, shutdown as shutdown_image_pool
+from app.search import rebuild_search_index
+from app.portfolio import rebuild_gallery_artists
+from app.cache import bump_version
+
+# Usa o mesmo banco da aplicação: PostgreSQL se DATABASE_URL estiver definida, senão o 'database.db' local.
+
+USAGE = "Uso: python manage_db.py [migrate|status|explain|rebuild-revenue|rebuild-search|rebuild-portfolio|purge-uploads|gallery-images]"
+
+
+def migrate():
+    conn = get_db_connection()
+    try:
+        run_migrations(conn)
+        print(f"Banco na versão {get_schema_version(conn)} do schema.")
+    finally:
+        conn.close()
+
+
+def status():
+    conn = get_db_connection()
+    try:
+        current = get_schema_version(conn)
+    except Exception:
+        # A tabela 'schema_version' ainda não existe.
+        conn.rollback()
+        current = 0
+    finally:
+        conn.close()
+
+    print(f"Versão atual do schema: {current}")
+    for version, description, _ in MIGRATIONS:
+        mark = 'aplicada' if version <= current else 'PENDENTE'
+        print(f"  {version:>3}  [{mark}]  {description}")
+
+
+def explain():
+    """Mostra o plano das consultas frequentes e termina com erro se alguma ler a tabela inteira."""
+    conn = get_db_connection()
+    try:
+        results = explain_hot_queries(conn)
+    finally:
+        conn.close()
+
+    problems = 0
+    for result in results:
+        if result['full_scans']:
+            problems += 1
+            print(f"[LEITURA COMPLETA] {result['name']}: {', '.join(result['full_scans'])}")
+        else:
+            print(f"[ok] {result['name']}")
+        print(f"      {result['plan']}")
+
+    if problems:
+        print(f"\n{problems} consulta(s) sem índice adequado.")
+        sys.exit(1)
+    print("\nTodas as consultas frequentes usam índices.")
+
+
+def rebuild_revenue_rollup():
+    """Recalcula o agregado 'revenue_daily' a partir dos pedidos concluídos."""
+    conn = get_db_connection()
+    try:
+        rows = rebuild_revenue(conn)
+        conn.commit()
+        print(f"Agregado de receita reconstruído: {rows} linha(s).")
+    finally:
+        conn.close()
+
+
+def rebuild_search():
+    """Recria o índice de busca do painel a partir dos pedidos, históricos, mensagens e usuários."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        documents = rebuild_search_index(cursor, hasattr(conn, 'cursor_factory'))
+        cursor.close()
+        conn.commit()
+        print(f"Índice de busca reconstruído: {documents} documento(s).")
+    finally:
+        conn.close()
+
+
+def rebuild_portfolio():
+    """Recria os vínculos artista-obra ('gallery_artists') a partir das colunas da galeria."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        links = rebuild_gallery_artists(cursor)
+        cursor.close()
+        # As páginas públicas em cache mostram os portfólios.
+        bump_version(conn, 'gallery')
+        conn.commit()
+        print(f"Vínculos do portfólio reconstruídos: {links} linha(s).")
+    finally:
+        conn.close()
+
+
+def purge_uploads():
+    """Apaga os envios de arquivos abandonados há mais de um dia."""
+    conn = get_db_connection()
+    try:
+        removed = purge_stale_uploads(conn)
+        conn.commit()
+        print(f"Envios abandonados removidos: {removed}.")
+    finally:
+        conn.close()
+
+
+def gallery_images():
+    """Gera miniaturas, variantes WebP/AVIF e placeholders das obras que ainda não os têm."""
+    try:
+        done, failed = backfill_gallery_images()
+    finally:
+        shutdown_image_pool()
+    print(f"Imagens da galeria processadas: {done}; falhas: {failed}.")
+
+
+COMMANDS = {
+    'migrate': migrate,
+    'status': status,
+    'explain': explain,
+    'rebuild-revenue': rebuild_revenue_rollup,
+    'rebuild-search': rebuild_search,
+    'rebuild-portfolio': rebuild_portfolio,
+    'purge-uploads': purge_uploads,
+    'gallery-images': gallery_images,
+}
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        print(USAGE)
+        sys.exit(1)
+    COMMANDS[sys.argv[1]]()
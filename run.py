@@ -3,7 +3,11 @@ eventlet.monkey_patch(all=True, psycopg=True)
 
 # Agora importe o resto
 from app import create_app, socketio
-app = create_app()
+
+# Os processos do pool de imagens (multiprocessing 'spawn') reimportam este
+# arquivo como '__mp_main__'; eles não devem subir a aplicação.
+if __name__ != '__mp_main__':
+    app = create_app()
 
 if __name__ == '__main__':
     socketio.run(app, debug=True, port=5000)
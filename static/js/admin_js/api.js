@@ -2,26 +2,89 @@
 
 // Responsável por todas as comunicações com o backend (API).
 
-async function fetchComissoes() {
+/**
+ * Busca uma página da listagem de comissões.
+ * @param {object} params - Filtros da API (status, client, q, date_from, date_to, fields, limit, cursor).
+ * @returns {Promise<{items: Array, next_cursor: string|null}>}
+ */
+async function fetchComissoesPage(params = {}) {
+    const query = new URLSearchParams(params);
+    const response = await fetch(`/admin/api/comissoes?${query.toString()}`);
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return await response.json();
+}
+
+/**
+ * Busca todas as comissões que atendem aos filtros, percorrendo as páginas da API.
+ * Só para consultas já limitadas pelos filtros (ex.: prazos de um mês); a tabela de
+ * comissões carrega uma página por vez com fetchComissoesPage.
+ */
+async function fetchComissoes(params = {}) {
     try {
-        const response = await fetch('/admin/api/comissoes');
+        let comissoes = [];
+        let cursor = null;
+        do {
+            const pageParams = { ...params, limit: 200 };
+            if (cursor) pageParams.cursor = cursor;
+            const page = await fetchComissoesPage(pageParams);
+            comissoes = comissoes.concat(page.items);
+            cursor = page.next_cursor;
+        } while (cursor);
+        return comissoes;
+    } catch (error) {
+        console.error("Erro ao buscar comissões:", error);
+        return [];
+    }
+}
+
+/**
+ * Busca o resumo do dashboard (contagens por status, totais, atrasados e pedidos recentes).
+ * O tamanho da resposta não depende de quantos pedidos existem.
+ */
+async function fetchDashboardSummary() {
+    try {
+        const response = await fetch('/admin/api/dashboard/summary');
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         return await response.json();
     } catch (error) {
-        console.error("Erro ao buscar comissões:", error);
-        return [];
+        console.error("Erro ao buscar o resumo do dashboard:", error);
+        return null;
     }
 }
 
-async function updateComissaoStatus(comissaoId, novoStatus) {
+/**
+ * Busca só os prazos (id e deadline) das comissões que vencem no mês informado.
+ * @param {number} month - Mês de 0 a 11.
+ * @param {number} year - Ano com quatro dígitos.
+ */
+async function fetchDeadlinesForMonth(month, year) {
+    const mes = String(month + 1).padStart(2, '0');
+    return fetchComissoes({ fields: 'id,deadline', deadline_from: `${year}-${mes}-01`, deadline_to: `${year}-${mes}-31` });
+}
+
+/**
+ * Cabeçalhos das escritas em uma comissão. Com a versão lida (ETag), o servidor
+ * só grava se ninguém alterou o pedido desde então; senão responde 412.
+ * @param {number} [version] - Versão da comissão exibida na tela.
+ */
+function versionHeaders(version) {
+    const headers = { 'Content-Type': 'application/json' };
+    if (version) headers['If-Match'] = `"${version}"`;
+    return headers;
+}
+
+async function updateComissaoStatus(comissaoId, novoStatus, version) {
     try {
         const response = await fetch(`/admin/api/comissoes/${comissaoId}/update_status`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: versionHeaders(version),
             body: JSON.stringify({ status: novoStatus }),
         });
+        if (response.status === 412) return await response.json();
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
@@ -75,13 +138,14 @@ async function fetchSingleComissao(comissaoId) {
     }
 }
 
-async function updateComissao(comissaoId, comissaoData) {
+async function updateComissao(comissaoId, comissaoData, version) {
     try {
         const response = await fetch(`/admin/api/comissoes/${comissaoId}/update`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: versionHeaders(version),
             body: JSON.stringify(comissaoData)
         });
+        if (response.status === 412) return await response.json();
         if (!response.ok) throw new Error('Erro ao atualizar comissão');
         return await response.json();
     } catch (error) {
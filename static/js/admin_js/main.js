@@ -91,6 +91,19 @@ async function updateNotificationBadge() {
     }
 }
 
+/**
+ * Soma ao badge as notificações recebidas pelo Socket.IO, sem consultar a API.
+ * Eventos sem a lista 'notifications' não geraram notificação para esta aba.
+ * @param {Array} notifications - As notificações que chegaram com o evento.
+ */
+function applyIncomingNotifications(notifications) {
+    const badge = document.getElementById('notification-badge');
+    if (!badge || !notifications || notifications.length === 0) return;
+    const current = badge.style.display === 'flex' ? (parseInt(badge.textContent, 10) || 0) : 0;
+    badge.textContent = current + notifications.length;
+    badge.style.display = 'flex';
+}
+
 /**
  * Configura os listeners do Socket.IO para o painel de administração.
  */
@@ -103,19 +116,33 @@ function setupSocketIOListeners() {
         console.log('Evento de atualização de comissão recebido no admin:', data);
         const notificationMessage = data.message_for_admin || `O pedido #${data.commission_id} foi atualizado.`;
         showNotification(notificationMessage, 'info');
-        updateNotificationBadge();
-
-        const comissoesData = await fetchComissoes();
-        allComissoesParaCalendario = comissoesData;
+        applyIncomingNotifications(data.notifications);
 
         const comissoesTableBody = document.getElementById('comissoes-table-body');
         const dashboardCards = document.getElementById('card-total-comissoes');
 
+        // Aplica o delta na lista já carregada; só busca o pedido se ele ainda não é conhecido.
+        // O dashboard não mantém a lista: ele relê o resumo abaixo.
+        const index = allComissoesParaCalendario.findIndex(c => c.id === data.commission_id);
+        if (data.deleted) {
+            if (index !== -1) allComissoesParaCalendario.splice(index, 1);
+        } else if (index !== -1) {
+            applyCommissionDelta(allComissoesParaCalendario[index], data);
+        } else if (data.created && !dashboardCards) {
+            const novaComissao = await fetchSingleComissao(data.commission_id);
+            if (novaComissao) allComissoesParaCalendario.unshift(novaComissao);
+        }
+
         if (dashboardCards) {
-            updateDashboardCards(comissoesData);
-            renderComissoesTable(comissoesData.slice(0, 5));
+            // O resumo vem do cache do servidor, invalidado pela própria escrita que gerou o evento.
+            const summary = await fetchDashboardSummary();
+            if (summary) {
+                updateDashboardCards(summary);
+                renderComissoesTable(summary.recent);
+            }
+            if (window.refreshDashboardCalendar) await window.refreshDashboardCalendar();
         } else if (comissoesTableBody) {
-            renderComissoesTable(comissoesData);
+            renderComissoesTable(allComissoesParaCalendario);
         }
         
         const orderDetailsModal = document.getElementById('orderDetailsModal');
@@ -125,12 +152,8 @@ function setupSocketIOListeners() {
         if (isModalVisible && modalCommissionId === data.commission_id) {
             if (data.deleted) {
                 orderDetailsModal.style.display = 'none';
-                renderComissoesTable(comissoesData);
-            } else {
-                const updatedData = await fetchSingleComissao(data.commission_id);
-                if (updatedData) {
-                    renderModalDetails(updatedData);
-                }
+            } else if (window.currentModalComissao && window.currentModalComissao.id === data.commission_id) {
+                renderModalDetails(applyCommissionDelta(window.currentModalComissao, data));
             }
         }
     });
@@ -141,7 +164,7 @@ function setupSocketIOListeners() {
             showNotification(data.message_for_admin, 'info');
         }
 
-        updateNotificationBadge();
+        applyIncomingNotifications(data.notifications);
 
         if (window.location.pathname.includes('/admin/mensagens')) {
             console.log("Na página de mensagens, recarregando para exibir a nova mensagem.");
@@ -207,17 +230,23 @@ document.addEventListener('DOMContentLoaded', async () => {
         let currentMonth = currentDate.getMonth();
         let currentYear = currentDate.getFullYear();
 
+        // O calendário busca apenas os prazos do mês exibido.
+        const showCalendarMonth = async () => {
+            const prazos = await fetchDeadlinesForMonth(currentMonth, currentYear);
+            renderCalendar(currentMonth, currentYear, prazos);
+        };
+        window.refreshDashboardCalendar = showCalendarMonth;
+
         console.log("Página do Dashboard detetada. A carregar dados...");
-        const [comissoesData, notificationsData] = await Promise.all([
-            fetchComissoes(),
-            fetchAllNotifications()
+        const [summary, notificationsData] = await Promise.all([
+            fetchDashboardSummary(),
+            fetchAllNotifications(),
+            showCalendarMonth()
         ]);
-        allComissoesParaCalendario = comissoesData;
 
-        if (allComissoesParaCalendario) {
-            renderComissoesTable(allComissoesParaCalendario.slice(0, 5));
-            updateDashboardCards(allComissoesParaCalendario);
-            renderCalendar(currentMonth, currentYear, allComissoesParaCalendario);
+        if (summary) {
+            renderComissoesTable(summary.recent);
+            updateDashboardCards(summary);
             renderActivityFeed(notificationsData);
         } else {
             console.log("Não foi possível carregar os dados do dashboard.");
@@ -232,7 +261,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                     currentMonth = 11;
                     currentYear--;
                 }
-                renderCalendar(currentMonth, currentYear, allComissoesParaCalendario);
+                showCalendarMonth();
             });
             nextMonthBtn.addEventListener('click', () => {
                 currentMonth++;
@@ -240,7 +269,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                     currentMonth = 0;
                     currentYear++;
                 }
-                renderCalendar(currentMonth, currentYear, allComissoesParaCalendario);
+                showCalendarMonth();
             });
         }
     }
@@ -64,6 +64,7 @@ function addEditModalListeners() {
         editCommissionForm.addEventListener('submit', async (event) => {
             event.preventDefault();
             const comissaoId = document.getElementById('edit-id').value;
+            const version = document.getElementById('edit-id').dataset.version;
             
             const updatedData = {
                 client: document.getElementById('edit-client').value,
@@ -73,7 +74,7 @@ function addEditModalListeners() {
                 description: document.getElementById('edit-description').value,
             };
 
-            const result = await updateComissao(comissaoId, updatedData);
+            const result = await updateComissao(comissaoId, updatedData, version);
 
             if (result.success) {
                 editModal.style.display = 'none';
@@ -97,7 +98,7 @@ function addDetailsModalListeners() {
             const statusSelect = document.getElementById('modal-status-select');
             const novoStatus = statusSelect.value;
             
-            const result = await updateComissaoStatus(comissaoId, novoStatus);
+            const result = await updateComissaoStatus(comissaoId, novoStatus, window.currentModalComissao?.version);
             
             if (result.success) {
                 orderDetailsModal.style.display = 'none';
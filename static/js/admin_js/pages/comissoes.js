@@ -1,32 +1,81 @@
 // Arquivo: static/js/admin_js/pages/comissoes.js
 // Script específico para a página de gerenciamento de comissões.
 
+// Tamanho da página da tabela; as demais são buscadas pelo botão "Carregar mais".
+const COMISSOES_PAGE_SIZE = 50;
+
 document.addEventListener('DOMContentLoaded', async () => {
-    // Declara e busca a variável 'allComissoes' no escopo desta página.
-    let allComissoes = [];
-    
-    console.log("Buscando comissões para a página de comissões.");
-    allComissoes = await fetchComissoes();
-    
-    // A função renderComissoesTable (de render.js) já anexa os listeners aos botões da tabela.
-    // Passamos a lista completa de comissões para ela.
-    renderComissoesTable(allComissoes);
+    // Comissões já carregadas, na ordem da tabela. O listener de tempo real (main.js)
+    // aplica os deltas nesta mesma lista, por isso ela nunca é substituída, só esvaziada.
+    const allComissoes = [];
+    allComissoesParaCalendario = allComissoes;
 
-    // Adiciona listener para o campo de busca
+    const loadMoreBtn = document.getElementById('load-more-btn');
+    const statusFilter = document.getElementById('filter-status');
+    const clientFilter = document.getElementById('filter-client');
+    const dateFromFilter = document.getElementById('filter-date-from');
+    const dateToFilter = document.getElementById('filter-date-to');
     const searchInput = document.getElementById('search-input');
-    if (searchInput) {
-        searchInput.addEventListener('input', (event) => {
-            const searchTerm = event.target.value.toLowerCase().trim();
-            if (!allComissoes) return;
-            
-            const comissoesFiltradas = allComissoes.filter(comissao => {
-                const id = String(comissao.id).toLowerCase();
-                const client = comissao.client.toLowerCase();
-                const type = comissao.type.toLowerCase();
-                return id.includes(searchTerm) || client.includes(searchTerm) || type.includes(searchTerm);
-            });
-            // Renderiza a tabela novamente com a lista filtrada
-            renderComissoesTable(comissoesFiltradas);
-        });
+
+    let nextCursor = null;
+    // Identifica a busca mais recente; respostas de buscas anteriores são descartadas.
+    let requestId = 0;
+
+    // Monta os filtros da API a partir dos campos da página. Campos vazios não são enviados.
+    function currentFilters() {
+        const filters = {
+            status: statusFilter ? statusFilter.value : '',
+            client: clientFilter ? clientFilter.value.trim() : '',
+            date_from: dateFromFilter ? dateFromFilter.value : '',
+            date_to: dateToFilter ? dateToFilter.value : '',
+            q: searchInput ? searchInput.value.trim() : ''
+        };
+        Object.keys(filters).forEach(key => { if (!filters[key]) delete filters[key]; });
+        return filters;
     }
+
+    // Busca uma página no servidor. Com 'reset', recomeça a lista (filtros alterados).
+    async function loadComissoes(reset) {
+        const currentRequest = ++requestId;
+        const params = { ...currentFilters(), limit: COMISSOES_PAGE_SIZE };
+        if (!reset && nextCursor) params.cursor = nextCursor;
+        if (loadMoreBtn) loadMoreBtn.disabled = true;
+
+        try {
+            const page = await fetchComissoesPage(params);
+            if (currentRequest !== requestId) return;
+            if (reset) allComissoes.length = 0;
+            allComissoes.push(...page.items);
+            nextCursor = page.next_cursor;
+        } catch (error) {
+            console.error("Erro ao buscar comissões:", error);
+            if (currentRequest !== requestId) return;
+            showNotification('Não foi possível carregar as comissões.', 'error');
+        }
+
+        // A função renderComissoesTable (de render.js) já anexa os listeners aos botões da tabela.
+        renderComissoesTable(allComissoes);
+        if (loadMoreBtn) {
+            loadMoreBtn.disabled = false;
+            loadMoreBtn.style.display = nextCursor ? '' : 'none';
+        }
+    }
+
+    // Campos de texto esperam o usuário parar de digitar antes de consultar o servidor.
+    let debounceTimer = null;
+    function reloadSoon() {
+        clearTimeout(debounceTimer);
+        debounceTimer = setTimeout(() => loadComissoes(true), 300);
+    }
+
+    [statusFilter, dateFromFilter, dateToFilter].forEach(field => {
+        if (field) field.addEventListener('change', () => loadComissoes(true));
+    });
+    [clientFilter, searchInput].forEach(field => {
+        if (field) field.addEventListener('input', reloadSoon);
+    });
+    if (loadMoreBtn) loadMoreBtn.addEventListener('click', () => loadComissoes(false));
+
+    console.log("Buscando comissões para a página de comissões.");
+    await loadComissoes(true);
 });
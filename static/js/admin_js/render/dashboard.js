@@ -2,31 +2,16 @@
 
 /**
  * Atualiza os cards de KPI na página do dashboard.
- * @param {Array} comissoes - A lista completa de comissões.
+ * @param {object} summary - O resumo de /admin/api/dashboard/summary.
  */
-function updateDashboardCards(comissoes) {
+function updateDashboardCards(summary) {
     const cardTotal = document.getElementById('card-total-comissoes');
     if (!cardTotal) return;
 
-    const totalComissoes = comissoes.length;
-    const emAndamento = comissoes.filter(c => c.status === 'in_progress').length;
-    const aguardandoAprovacao = comissoes.filter(c => c.status === 'waiting_approval').length;
-    
-    const hoje = new Date(); 
-    const mesAtual = hoje.getMonth();
-    const anoAtual = hoje.getFullYear();
-    
-    const receitaMensal = comissoes
-        .filter(c => {
-            const dataComissao = new Date(c.date + 'T00:00:00');
-            return c.status === 'completed' && dataComissao.getMonth() === mesAtual && dataComissao.getFullYear() === anoAtual;
-        })
-        .reduce((total, c) => total + c.price, 0);
-
-    cardTotal.textContent = totalComissoes;
-    document.getElementById('card-em-andamento').textContent = emAndamento; 
-    document.getElementById('card-aguardando-aprovacao').textContent = aguardandoAprovacao;
-    document.getElementById('card-receita-mensal').textContent = receitaMensal.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' });
+    cardTotal.textContent = summary.total;
+    document.getElementById('card-em-andamento').textContent = summary.status_counts.in_progress || 0;
+    document.getElementById('card-aguardando-aprovacao').textContent = summary.status_counts.waiting_approval || 0;
+    document.getElementById('card-receita-mensal').textContent = summary.monthly_revenue.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' });
 }
 
 /**
@@ -200,6 +200,9 @@ function renderModalDetails(comissao) {
     const modalBody = document.getElementById('modal-content-placeholder');
     if (!modalBody) return;
 
+    // Guarda o pedido exibido para que os eventos em tempo real possam atualizá-lo sem nova busca.
+    window.currentModalComissao = comissao;
+
     document.getElementById('modal-save-button').dataset.id = comissao.id;
     document.getElementById('modal-title').textContent = `Detalhes da Comissão #${comissao.id}`;
 
@@ -108,6 +108,7 @@ function addTableButtonListeners(comissoes) {
             if (comissaoData) {
                 document.getElementById('edit-modal-title').textContent = `Editar Comissão #${comissaoData.id}`;
                 document.getElementById('edit-id').value = comissaoData.id;
+                document.getElementById('edit-id').dataset.version = comissaoData.version;
                 document.getElementById('edit-client').value = comissaoData.client;
                 document.getElementById('edit-type').value = comissaoData.type;
                 document.getElementById('edit-price').value = comissaoData.price;
@@ -23,6 +23,7 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // --- Estado do Chat ---
     let currentChatCommissionId = null;
+    let currentChatCommission = null;
     let unreadNotifications = new Map();
 
     // --- Funções Auxiliares ---
@@ -31,6 +32,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const closeChatWidget = () => {
         widget.classList.remove('visible');
         currentChatCommissionId = null; 
+        currentChatCommission = null;
     };
 
     const openChatWidget = async (commissionId) => {
@@ -58,6 +60,7 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             if (!commission) throw new Error("Comissão não encontrada");
+            currentChatCommission = commission;
 
             widgetTitle.textContent = `Chat: ${commission.title || commission.client}`;
             renderChatBubbles(commission);
@@ -226,9 +229,15 @@ document.addEventListener('DOMContentLoaded', () => {
     socket.on('commission_updated', async (data) => {
         if (!data.commission_id) return;
         
-        // Se o chat para esta comissão estiver aberto, atualiza o conteúdo
+        // Se o chat para esta comissão estiver aberto, aplica o delta no pedido já carregado
         if (widget.classList.contains('visible') && currentChatCommissionId === data.commission_id) {
-            openChatWidget(data.commission_id);
+            if (data.deleted) {
+                closeChatWidget();
+            } else if (currentChatCommission) {
+                renderChatBubbles(applyCommissionDelta(currentChatCommission, data));
+            } else {
+                openChatWidget(data.commission_id);
+            }
         } 
         // Se for cliente e o chat estiver fechado, atualiza o contador de mensagens não lidas
         else if (isClientPage && data.message_for_client) {
@@ -11,6 +11,7 @@ window.fetchOrders = async function() {
         }
         const data = await response.json();
         console.log("Pedidos do cliente carregados da API:", data);
+        state.ordersCursor = response.headers.get('X-Sync-Cursor');
         return data;
     } catch (error) {
         console.error("Erro ao buscar pedidos:", error);
@@ -19,6 +20,34 @@ window.fetchOrders = async function() {
     }
 }
 
+/**
+ * Traz para 'state.orders' só os pedidos alterados ou excluídos desde a última
+ * busca (ex.: ao reconectar o Socket.IO). Sem cursor, recarrega a lista inteira.
+ */
+window.syncOrders = async function() {
+    if (state.ordersCursor === null) {
+        state.orders = await window.fetchOrders();
+        return;
+    }
+    try {
+        const response = await fetch(`/api/client/orders?since=${encodeURIComponent(state.ordersCursor)}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data = await response.json();
+        const changed = new Map(data.items.map(order => [order.id, order]));
+        const deleted = new Set(data.deleted);
+        state.orders = state.orders
+            .filter(order => !deleted.has(order.id) && !changed.has(order.id))
+            .concat(data.items)
+            .sort((a, b) => (a.date < b.date ? 1 : a.date > b.date ? -1 : 0));
+        state.ordersCursor = data.cursor;
+    } catch (error) {
+        console.error("Erro ao sincronizar pedidos:", error);
+        state.orders = await window.fetchOrders();
+    }
+}
+
 /**
  * Busca os itens da galeria do artista na API.
  */
@@ -84,6 +113,53 @@ window.createOrder = async function(orderData) {
     }
 }
 
+/**
+ * Envia um arquivo de referência em partes. Se uma parte falhar, consulta o
+ * servidor para saber quantos bytes já chegaram e continua dali.
+ * @param {File} file - O arquivo selecionado pelo cliente.
+ * @param {function} [onProgress] - Recebe a fração enviada (0 a 1).
+ * @returns {Promise<string>} O id do envio, para ser mandado junto com o pedido.
+ */
+window.uploadReferenceFile = async function(file, onProgress) {
+    const startResponse = await fetch('/api/client/uploads', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name, size: file.size, mime_type: file.type })
+    });
+    const upload = await startResponse.json();
+    if (!startResponse.ok) throw new Error(upload.message || `Falha ao enviar ${file.name}.`);
+
+    let offset = upload.received;
+    let failures = 0;
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + upload.chunk_size);
+        try {
+            const response = await fetch(`/api/client/uploads/${upload.upload_id}`, {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/octet-stream', 'Upload-Offset': String(offset) },
+                body: chunk
+            });
+            const result = await response.json();
+            if (response.ok) {
+                offset = result.received;
+                failures = 0;
+                if (onProgress) onProgress(offset / file.size);
+                continue;
+            }
+            if (response.status !== 409) throw new Error(result.message || `Falha ao enviar ${file.name}.`);
+        } catch (error) {
+            if (++failures > 3) throw error;
+            await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+        }
+        // Retoma do que o servidor confirmou ter recebido.
+        const statusResponse = await fetch(`/api/client/uploads/${upload.upload_id}`);
+        const status = await statusResponse.json();
+        if (!statusResponse.ok) throw new Error(status.message || `Falha ao enviar ${file.name}.`);
+        offset = status.received;
+    }
+    return upload.upload_id;
+}
+
 /**
  * Adiciona um novo comentário a um pedido.
  * @param {string} orderId - O ID do pedido.
@@ -103,19 +179,41 @@ window.addComment = async function(orderId, text) {
     }
 }
 
+/**
+ * Cabeçalhos das ações sobre um pedido. Com a versão exibida, o servidor
+ * recusa (412) a ação se o pedido mudou desde então, em vez de aplicá-la
+ * sobre um estado que o cliente não viu.
+ * @param {number} [version] - Versão do pedido em 'state.orders'.
+ */
+function orderHeaders(version) {
+    const headers = { 'Content-Type': 'application/json' };
+    if (version) headers['If-Match'] = `"${version}"`;
+    return headers;
+}
+
+/**
+ * Lê a resposta de uma ação; 'conflict' indica que o pedido mudou (412).
+ */
+async function orderActionResult(response) {
+    const result = await response.json();
+    if (response.status === 412) result.conflict = true;
+    return result;
+}
+
 /**
  * MODIFICADO: Envia um pedido de revisão para a fase atual, incluindo o comentário.
  * @param {string} orderId - O ID do pedido.
  * @param {string} commentText - O comentário obrigatório da revisão.
+ * @param {number} [version] - Versão do pedido exibida ao cliente.
  */
-window.requestRevision = async function(orderId, commentText) {
+window.requestRevision = async function(orderId, commentText, version) {
     try {
         const response = await fetch(`/api/client/orders/${orderId}/request_revision`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: orderHeaders(version),
             body: JSON.stringify({ comment: commentText }) // Envia o comentário
         });
-        return await response.json();
+        return await orderActionResult(response);
     } catch (error) {
         console.error("Erro ao solicitar revisão:", error);
         return { success: false, message: 'Erro de conexão.' };
@@ -125,14 +223,15 @@ window.requestRevision = async function(orderId, commentText) {
 /**
  * Aprova a fase atual do pedido.
  * @param {string} orderId - O ID do pedido.
+ * @param {number} [version] - Versão do pedido exibida ao cliente.
  */
-window.approvePhase = async function(orderId) {
+window.approvePhase = async function(orderId, version) {
     try {
         const response = await fetch(`/api/client/orders/${orderId}/approve_phase`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: orderHeaders(version),
         });
-        return await response.json();
+        return await orderActionResult(response);
     } catch (error) {
         console.error("Erro ao aprovar a fase:", error);
         return { success: false, message: 'Erro de conexão.' };
@@ -259,6 +358,22 @@ window.fetchArtistPortfolio = async function(artistId) {
     }
 }
 
+/**
+ * Busca os artistas e o portfólio de cada um em uma única requisição.
+ * Cada artista vem com 'portfolio.items' e 'portfolio.next_cursor'.
+ * @param {number[]} [artistIds] - Restringe a busca a esses artistas.
+ */
+window.fetchArtistsWithPortfolios = async function(artistIds = []) {
+    const params = new URLSearchParams({ limit: 100 });
+    if (artistIds.length) params.set('artist_ids', artistIds.join(','));
+    const response = await fetch(`/api/client/artists/portfolios?${params}`);
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data = await response.json();
+    return data.artists;
+}
+
 /**
  * Atualiza o perfil do usuário (nome de usuário, email e avatar).
  * @param {object} profileData - Objeto com { username, email, avatar_url }.
@@ -6,6 +6,7 @@ window.state = {
         avatar: 'JS'
     },
     orders: [], // Armazenará os pedidos carregados
+    ordersCursor: null, // Cursor de sincronização dos pedidos (ver syncOrders)
     portfolio: [], // Armazenará o portfólio carregado
     currentTab: 'details',
     selectedFiles: [],
@@ -168,6 +168,8 @@ function handleCancelOrder(orderId) {
 function handleViewDetails(orderId, focusComment = false) {
     renderOrderDetails(orderId, focusComment);
     showModal(DOM.orderDetailsModal);
+    // Acompanha o pedido aberto na sala própria dele no servidor de tempo real.
+    if (window.clientSocket) window.clientSocket.emit('join_commission', { commission_id: orderId });
 }
 
 async function handleSubmitOrder() {
@@ -223,14 +225,10 @@ function setupEventListeners() {
         DOM.viewPortfolioBtn.addEventListener('click', async () => {
             toggleLoading(true);
             try {
-                // Busca a lista de artistas para popular o filtro
-                const artists = await window.fetchArtists();
+                // Artistas (para o filtro) e o portfólio de todos eles em uma única requisição
+                const artists = await window.fetchArtistsWithPortfolios();
                 state.artists = artists;
-
-                // Busca o portfólio de todos os artistas para a visualização inicial
-                const portfolioPromises = artists.map(artist => window.fetchArtistPortfolio(artist.id));
-                const portfolioResults = await Promise.all(portfolioPromises);
-                state.portfolio = portfolioResults.flat(); // Junta os resultados de todos os portfólios
+                state.portfolio = artists.flatMap(artist => artist.portfolio.items);
 
                 renderPortfolio(state.artists); // Renderiza o modal com os dados e a lista de artistas
                 showModal(DOM.portfolioModal);
@@ -251,9 +249,8 @@ function setupEventListeners() {
             try {
                 if (selectedArtistId === 'all') {
                     // Se "Todos" for selecionado, busca o portfólio de todos novamente
-                    const portfolioPromises = state.artists.map(artist => window.fetchArtistPortfolio(artist.id));
-                    const portfolioResults = await Promise.all(portfolioPromises);
-                    state.portfolio = portfolioResults.flat();
+                    const artists = await window.fetchArtistsWithPortfolios();
+                    state.portfolio = artists.flatMap(artist => artist.portfolio.items);
                 } else {
                     // Se um artista específico for selecionado, busca apenas o dele
                     state.portfolio = await window.fetchArtistPortfolio(selectedArtistId);
@@ -375,8 +372,15 @@ function setupEventListeners() {
         if (button.classList.contains('approve-phase-btn')) {
             showConfirmModal('Aprovar Fase', 'Você tem certeza que deseja aprovar a prévia atual e avançar para a próxima fase do projeto? Esta ação não pode ser desfeita.', async () => {
                 toggleLoading(true);
-                const result = await window.approvePhase(orderId);
-                 if (result.success) {
+                const version = state.orders.find(o => o.id === orderId)?.version;
+                const result = await window.approvePhase(orderId, version);
+                if (result.conflict) {
+                    // O pedido mudou (ex.: nova prévia): mostra o estado atual antes de uma nova tentativa.
+                    showNotification(result.message, 'error');
+                    state.orders = await window.fetchOrders();
+                    renderOrders();
+                    renderOrderDetails(orderId);
+                } else if (result.success) {
                     showNotification('Fase aprovada com sucesso!', 'success');
                     state.orders = await window.fetchOrders();
                     renderOrders();
@@ -389,8 +393,14 @@ function setupEventListeners() {
         } else if (button.classList.contains('request-revision-btn')) {
             showRevisionModal(orderId, async (commentText) => {
                 toggleLoading(true);
-                const result = await window.requestRevision(orderId, commentText);
-                if (result.success) {
+                const version = state.orders.find(o => o.id === orderId)?.version;
+                const result = await window.requestRevision(orderId, commentText, version);
+                if (result.conflict) {
+                    showNotification(result.message, 'error');
+                    state.orders = await window.fetchOrders();
+                    renderOrders();
+                    renderOrderDetails(orderId);
+                } else if (result.success) {
                     showNotification('Pedido de revisão enviado!', 'success');
                      const updatedOrders = await window.fetchOrders();
                     state.orders = updatedOrders;
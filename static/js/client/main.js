@@ -19,6 +19,19 @@ window.updateClientNotificationBadge = async function() {
     }
 }
 
+/**
+ * Soma ao badge as notificações recebidas pelo Socket.IO, sem consultar a API.
+ * Eventos sem a lista 'notifications' não geraram notificação para esta aba.
+ * @param {Array} notifications - As notificações que chegaram com o evento.
+ */
+window.applyIncomingClientNotifications = function(notifications) {
+    if (!DOM.clientNotificationBadge || !notifications || notifications.length === 0) return;
+    const badge = DOM.clientNotificationBadge;
+    const current = badge.style.display === 'flex' ? (parseInt(badge.textContent, 10) || 0) : 0;
+    badge.textContent = current + notifications.length;
+    badge.style.display = 'flex';
+}
+
 /**
  * Renderiza a lista de notificações no dropdown do cliente.
  * @param {Array} notifications - A lista de notificações.
@@ -60,8 +73,17 @@ window.renderClientNotifications = function(notifications) {
  */
 function setupSocketIOListeners() {
     const socket = io();
-    socket.on('connect', () => {
+    window.clientSocket = socket;
+    let connectedBefore = false;
+    socket.on('connect', async () => {
         console.log('Conectado ao servidor de tempo real (Painel do Cliente).');
+        // Numa reconexão, os eventos perdidos enquanto a aba estava desconectada
+        // chegam pela sincronização incremental, sem baixar todos os pedidos de novo.
+        if (connectedBefore && DOM.orderList) {
+            await window.syncOrders();
+            renderOrders();
+        }
+        connectedBefore = true;
     });
     socket.on('commission_updated', async (data) => {
         console.log('Evento de atualização de comissão recebido:', data);
@@ -70,11 +92,19 @@ function setupSocketIOListeners() {
             showNotification(data.message_for_client, 'info');
         }
 
-        window.updateClientNotificationBadge();
+        window.applyIncomingClientNotifications(data.notifications);
+
+        // Aplica o delta no pedido já carregado; só busca a lista se o pedido ainda não é conhecido.
+        const index = state.orders.findIndex(o => o.id === data.commission_id);
+        if (data.deleted) {
+            if (index !== -1) state.orders.splice(index, 1);
+        } else if (index !== -1) {
+            applyCommissionDelta(state.orders[index], data);
+        } else if (data.created) {
+            await window.syncOrders();
+        }
 
         if (DOM.orderList) {
-            const updatedOrders = await window.fetchOrders();
-            state.orders = updatedOrders;
             renderOrders();
         }
         
@@ -237,6 +267,8 @@ function initializeStepperModal() {
 
     async function openModal() {
         form.reset();
+        window.state.selectedFiles = [];
+        if (DOM.filePreview) renderFilePreview();
         showNotification('Carregando artistas...', 'info');
         toggleLoading(true);
         
@@ -291,8 +323,18 @@ function initializeStepperModal() {
             description: modal.querySelector(`#stepper-description`).value,
             price: state.totalPrice,
             assigned_artist_ids: JSON.parse(modal.querySelector(`input[name="stepper-artist-selection"]:checked`).value),
-            deadline: null
+            deadline: null,
+            reference_uploads: []
         };
+
+        try {
+            for (const file of window.state.selectedFiles) {
+                orderData.reference_uploads.push(await window.uploadReferenceFile(file));
+            }
+        } catch (error) {
+            toggleLoading(false);
+            return showNotification(error.message || 'Erro ao enviar os arquivos de referência.', 'error');
+        }
         
         const result = await window.createOrder(orderData);
         toggleLoading(false);
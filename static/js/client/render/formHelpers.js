@@ -34,6 +34,7 @@ function renderFilePreview() {
         }
         
         const removeBtn = document.createElement('button');
+        removeBtn.type = 'button';
         removeBtn.className = 'remove-file';
         removeBtn.innerHTML = '&times;';
         removeBtn.dataset.index = index; 
@@ -47,8 +47,13 @@ function renderPortfolio(artists = []) {
             artCard.dataset.title = item.title;
             artCard.dataset.description = item.description || '';
 
+            // Miniaturas geradas no servidor (quando existirem); o original fica para o visualizador.
+            const sources = Object.entries(item.srcset || {})
+                .map(([format, srcset]) => `<source type="image/${format}" srcset="${srcset}" sizes="220px">`).join('');
+            const placeholderStyle = item.placeholder ? `style="background-image: url('${item.placeholder}'); background-size: cover;"` : '';
+
             artCard.innerHTML = `
-                <img src="${item.image}" alt="${item.title}" loading="lazy" referrerpolicy="no-referrer" onerror="this.onerror=null;this.src='https://placehold.co/220x180/ff0000/ffffff?text=Erro!';">
+                <picture>${sources}<img src="${item.image}" alt="${item.title}" loading="lazy" decoding="async" referrerpolicy="no-referrer" ${placeholderStyle} onerror="this.onerror=null;this.src='https://placehold.co/220x180/ff0000/ffffff?text=Erro!';"></picture>
                 <div class="art-card-info">
                     <h3>${item.title}</h3>
                     ${item.description ? `<p>${item.description}</p>` : ''}
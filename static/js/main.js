@@ -47,6 +47,29 @@ function showNotification(message, type = 'success') {
     }, 3500);
 }
 
+/**
+ * Aplica em um pedido já carregado o delta enviado pelo evento 'commission_updated'
+ * (campos alterados em 'changes' e itens novos em 'append'), sem buscar o pedido de novo.
+ * @param {object} commission - O pedido a ser atualizado (modificado no lugar).
+ * @param {object} data - O payload do evento.
+ * @returns {object} O próprio pedido atualizado.
+ */
+function applyCommissionDelta(commission, data) {
+    if (!commission || !data) return commission;
+    Object.assign(commission, data.changes || {});
+    const append = data.append || {};
+    ['comments', 'event_log', 'preview'].forEach(key => {
+        // Listas ausentes (ex.: listagem sem histórico) continuam ausentes.
+        if (!append[key] || !Array.isArray(commission[key])) return;
+        // O pedido pode ter sido recarregado depois do evento; evita itens duplicados.
+        const known = new Set(commission[key].map(item => JSON.stringify(item)));
+        append[key].forEach(item => {
+            if (!known.has(JSON.stringify(item))) commission[key].push(item);
+        });
+    });
+    return commission;
+}
+
 /**
  * Verifica o sessionStorage por uma notificação pendente, a exibe e a remove.
  * Útil para mostrar feedback de uma ação após um redirecionamento ou recarga de página.